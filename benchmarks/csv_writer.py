@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Throughput of writing extracted listings to the CSV: the per-row append_to_csv of
+earlier versions (two file opens and a header parse per row) against
+extract_data.CsvWriter (header read once, rows appended in batches).
+
+The same records - parse_details results of synthetic listing pages (mock_server.py),
+or of saved listings, repeated with new IDs up to --rows - are written to a fresh
+CSV per path; every file must be byte-identical to the legacy one. Prints rows/s,
+MB/s and the speedup for the legacy path and each CsvWriter batch size.
+
+Usage:
+    python benchmarks/csv_writer.py                            # 10000 rows
+    python benchmarks/csv_writer.py --rows 50000 --batches 1,100,500,5000
+    python benchmarks/csv_writer.py --source listings
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import extract_data
+import mock_server
+
+EXCHANGE_RATES = {"USD": 37.8646, "EUR": 41.8133, "GBP": 48.7317}
+
+def legacy_append_to_csv(result, exchange_rates, path):
+    # extract_data.append_to_csv before CsvWriter (messages left out)
+    if "price" in result and "currency" in result and result["price"] is not None and result["currency"] is not None:
+        result["price_tl_14x"] = extract_data.calculate_tl_price(result["price"], result["currency"], exchange_rates)
+    else:
+        result["price_tl_14x"] = None
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'r', encoding='utf-8') as f:
+            headers = next(csv.reader(f))
+    else:
+        headers = list(extract_data.CSV_HEADERS)
+    row_data = [result[header] if header in result else None for header in headers]
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            writer.writerow(headers)
+        writer.writerow(row_data)
+    return True
+
+def sample_results(source, count):
+    # parse_details results of count pages, saved or synthetic
+    with contextlib.redirect_stdout(io.StringIO()):
+        if source:
+            extract_data.HTML_FOLDER = source
+            html_files = extract_data.find_html_files()[:count]
+            return [extract_data.parse_details(extract_data.read_html_file(name), name) for name in html_files]
+        return [
+            extract_data.parse_details(mock_server.synthetic_listing_page(100000 + n, config.BASE_DOMAIN, 20), f"{100000 + n}.html")
+            for n in range(count)
+        ]
+
+def make_records(samples, rows):
+    # rows records cycling through the samples, each with its own ID
+    records = []
+    for n in range(rows):
+        record = dict(samples[n % len(samples)])
+        record["property_id"] = str(1000000 + n)
+        record["source_file"] = f"{1000000 + n}.html"
+        records.append(record)
+    return records
+
+def write_legacy(records, path):
+    for record in records:
+        legacy_append_to_csv(dict(record), EXCHANGE_RATES, path)
+
+def write_batched(records, path, flush_rows):
+    with extract_data.CsvWriter(EXCHANGE_RATES, path, flush_rows=flush_rows, flush_interval=float("inf")) as writer:
+        for record in records:
+            writer.write(dict(record))
+
+def timed(write, path):
+    # Seconds for writing into a new CSV with the header row already in place, like
+    # setup_csv_file leaves it
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerow(extract_data.CSV_HEADERS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        write(path)
+        return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV writing throughput: per-row appends vs CsvWriter")
+    parser.add_argument('--rows', type=int, default=10000, help='Rows to write')
+    parser.add_argument('--batches', default='1,100,500,5000', help='Comma-separated CsvWriter batch sizes (flush_rows)')
+    parser.add_argument('--source', default=None, help='Take records from this saved listings folder instead of synthetic pages')
+    parser.add_argument('--samples', type=int, default=20, help='Distinct pages to parse for the records')
+    args = parser.parse_args()
+
+    samples = sample_results(args.source, args.samples)
+    if not samples:
+        print(f"No listing pages found in '{args.source}'.")
+        return
+    records = make_records(samples, args.rows)
+    workdir = tempfile.mkdtemp(prefix="csv_writer_")
+    try:
+        legacy_path = os.path.join(workdir, "legacy.csv")
+        legacy_seconds = timed(lambda path: write_legacy(records, path), legacy_path)
+        size = os.path.getsize(legacy_path)
+        with open(legacy_path, 'rb') as f:
+            expected = f.read()
+        print(f"{args.rows} rows, {size / 1e6:.1f} MB of CSV\n")
+        print(f"{'path':<24} {'seconds':>8} {'rows/s':>9} {'MB/s':>7} {'speedup':>8} {'output':>9}")
+        print(f"{'append_to_csv (legacy)':<24} {legacy_seconds:>8.2f} {args.rows / legacy_seconds:>9.0f} "
+              f"{size / 1e6 / legacy_seconds:>7.1f} {1:>7.2f}x {'-':>9}")
+        for flush_rows in [int(value) for value in args.batches.split(",")]:
+            path = os.path.join(workdir, f"batched_{flush_rows}.csv")
+            seconds = timed(lambda path: write_batched(records, path, flush_rows), path)
+            with open(path, 'rb') as f:
+                identical = "identical" if f.read() == expected else "DIFFERS"
+            print(f"{'CsvWriter, batch ' + str(flush_rows):<24} {seconds:>8.2f} {args.rows / seconds:>9.0f} "
+                  f"{size / 1e6 / seconds:>7.1f} {legacy_seconds / seconds:>7.2f}x {identical:>9}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+End-to-end crawl benchmark against the offline mock site (mock_server.py).
+
+Starts the mock site, then runs main.py's whole pipeline (search API, listing
+workers, frontier, storage, optionally --stream extraction) against it in a
+fresh temporary folder and reports listing pages/s, p50/p99 request latency as
+the crawler saw it, CPU time and peak memory. Every run is its own subprocess, so
+CPU and peak memory are the crawler's alone (the mock runs in this process).
+
+Politeness delays are lowered (see BENCHMARK_SETTINGS) so the numbers show what
+the crawler can do, not the configured pacing; any config value can be set with
+--set, and --sweep runs one crawl per value to compare settings side by side.
+
+Usage:
+    python benchmarks/e2e_crawl.py                                  # 600 synthetic listings
+    python benchmarks/e2e_crawl.py --total 3000 --latency 0.2 --error-rate 0.02
+    python benchmarks/e2e_crawl.py --sweep MAX_CONCURRENCY=2,4,8,16
+    python benchmarks/e2e_crawl.py --set ADAPTIVE_RATE=False --sweep BATCH_SIZE=2,4
+    python benchmarks/e2e_crawl.py --stream --no-archive
+    python benchmarks/e2e_crawl.py --pages pages --listings listings   # saved corpus
+
+Note: needs the scraper's own dependencies (crawl4ai is imported, but no browser
+is started: search pages come from the API and listings from the HTTP fetcher).
+"""
+
+import argparse
+import ast
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import mock_server
+
+# Config values for every run (before --set / --sweep)
+BENCHMARK_SETTINGS = {
+    "SEARCH_BACKEND": "api",
+    "LISTING_FETCHER": "http",
+    "SEARCH_PAGE_DELAY": 0,
+    "SEARCH_CONCURRENCY": 4,
+    "DELAY_BETWEEN_REQUESTS": 0.05,
+    "DELAY_BETWEEN_BATCHES": 0.05,
+    "MAX_REQUESTS_PER_SECOND": 200.0,
+    "MAX_CONCURRENCY": 16,
+    "BATCH_SIZE": 4,
+    "BLOCK_COOLDOWN_SECONDS": 5,
+    "RETRY_BASE_DELAY": 0.5,
+    "RETRY_MAX_DELAY": 2,
+    "RETRY_MAX_WAIT": 5,
+}
+
+def parse_value(text):
+    # Python literal if it is one ("8", "0.5", "False"), the plain string otherwise
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def parse_setting(text):
+    name, _, value = text.partition("=")
+    if not name or not value or not hasattr(config, name):
+        raise argparse.ArgumentTypeError(f"expected CONFIG_NAME=value with a name from config.py, got '{text}'")
+    return name, value
+
+def percentile(values, q):
+    # Nearest-rank percentile of an unsorted list (None if empty)
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))]
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+def cpu_seconds():
+    try:
+        import resource
+    except ImportError:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def run_crawl(base_url, settings, main_args, workdir):
+    # Child process: one crawl of the mock site in workdir, returns the measurements
+    import extract_data
+    import fetchers
+    import main
+
+    for name, value in settings.items():
+        setattr(config, name, value)
+    config.BASE_DOMAIN = base_url
+    config.API_URL = f"{base_url}/ac/arama-sonucu"
+    # Exchange rates (--stream) fall back to the built-in ones instead of a network call
+    extract_data.EXCHANGE_RATES_URL = f"{base_url}/_exchange_rates"
+
+    # Every request of the crawl goes through HttpFetcher; time them as the crawler sees them
+    samples = []
+    original_fetch = fetchers.HttpFetcher.fetch
+
+    async def timed_fetch(self, url, *args, **kwargs):
+        started = time.perf_counter()
+        status = None
+        try:
+            result = await original_fetch(self, url, *args, **kwargs)
+            status = result.status_code
+            return result
+        finally:
+            kind = "api" if url == config.API_URL else "listing"
+            samples.append((kind, time.perf_counter() - started, status))
+
+    fetchers.HttpFetcher.fetch = timed_fetch
+
+    os.chdir(workdir)
+    sys.argv = ["main.py"] + main_args
+    cpu_started = cpu_seconds()
+    started = time.perf_counter()
+    with open("crawl.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        asyncio.run(main.main())
+    seconds = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_started
+
+    listing_latencies = [elapsed for kind, elapsed, _ in samples if kind == "listing"]
+    api_latencies = [elapsed for kind, elapsed, _ in samples if kind == "api"]
+    rows = None
+    if os.path.exists(extract_data.OUTPUT_FILE):
+        with open(extract_data.OUTPUT_FILE, "r", encoding="utf-8") as f:
+            rows = max(0, sum(1 for _ in f) - 1)
+    return {
+        "seconds": seconds,
+        "cpu_seconds": cpu,
+        "peak_memory_mb": peak_memory_mb(),
+        "listing_requests": len(listing_latencies),
+        "listing_ok": sum(1 for kind, _, status in samples if kind == "listing" and status == 200),
+        "api_requests": len(api_latencies),
+        "listing_p50": percentile(listing_latencies, 50),
+        "listing_p99": percentile(listing_latencies, 99),
+        "api_p50": percentile(api_latencies, 50),
+        "csv_rows": rows,
+    }
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.0f}" if seconds is not None else "n/a"
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end crawl benchmark against the mock site")
+    parser.add_argument('--total', type=int, default=600, help='Synthetic listings on the mock site')
+    parser.add_argument('--pages', default=None, help='Serve saved search pages from this folder')
+    parser.add_argument('--listings', default=None, help='Serve saved listings from this folder')
+    parser.add_argument('--latency', type=float, default=0.05, help='Median mock response delay (seconds)')
+    parser.add_argument('--jitter', type=float, default=0.5, help='Spread of the mock delay (lognormal sigma)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of listing requests answered with HTTP 503')
+    parser.add_argument('--block-rate', type=float, default=0.0, help='Share of listing requests answered with a block page')
+    parser.add_argument('--block-after', type=int, default=None, help='Block every request once this many listings were requested')
+    parser.add_argument('--block-for', type=float, default=3.0, help='How long the --block-after block lasts (seconds)')
+    parser.add_argument('--padding-kb', type=int, default=120, help='Boilerplate size of synthetic listing pages')
+    parser.add_argument('--set', dest='settings', type=parse_setting, action='append', default=[],
+                        metavar='NAME=VALUE', help='Override a config.py value for every run (repeatable)')
+    parser.add_argument('--sweep', type=parse_setting, default=None, metavar='NAME=V1,V2,...',
+                        help='Run one crawl per value of a config.py setting')
+    parser.add_argument('--stream', action='store_true', help='Crawl with --stream (extraction into the CSV)')
+    parser.add_argument('--no-archive', action='store_true', help='With --stream: do not save listing HTML')
+    parser.add_argument('--max-pages', type=int, default=None, help='Search pages to crawl (default: all)')
+    parser.add_argument('--keep', action='store_true', help='Keep the run folders (crawl.log, listings, frontier.db)')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Child process: run one crawl and report as JSON
+        job = json.loads(args.child)
+        stats = run_crawl(job["base_url"], job["settings"], job["main_args"], job["workdir"])
+        print(json.dumps(stats))
+        return
+
+    settings = dict(BENCHMARK_SETTINGS)
+    settings.update((name, parse_value(value)) for name, value in args.settings)
+    runs = [("default", settings)]
+    if args.sweep:
+        name, values = args.sweep
+        runs = [(f"{name}={value}", dict(settings, **{name: parse_value(value)})) for value in values.split(",")]
+    main_args = []
+    if args.stream:
+        main_args.append("--stream")
+    if args.no_archive:
+        main_args.append("--no-archive")
+    if args.max_pages:
+        main_args += ["--max-pages", str(args.max_pages)]
+
+    site = mock_server.MockSite(
+        total=args.total, pages_dir=args.pages, listings_dir=args.listings,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        block_rate=args.block_rate, block_after=args.block_after, block_for=args.block_for,
+        padding_kb=args.padding_kb,
+    )
+    server = mock_server.start_server(site)
+    source = f"saved corpus ({len(site.search_pages)} search pages)" if site.search_pages else f"{args.total} synthetic listings"
+    print(f"Mock site at {server.base_url}: {source}, latency {args.latency * 1000:.0f} ms, "
+          f"errors {args.error_rate:.0%}, blocks {args.block_rate:.0%}"
+          + (f", blocked after {args.block_after} listings for {args.block_for:g}s" if args.block_after else ""))
+    if main_args:
+        print(f"Crawling with: main.py {' '.join(main_args)}")
+    print()
+
+    print(f"{'run':<24} {'ok':>6} {'req':>6} {'err':>5} {'blk':>5} {'seconds':>8} {'pages/s':>8} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'CPU s':>6} {'CPU %':>6} {'peak MB':>8}")
+    try:
+        for label, run_settings in runs:
+            site.reset()
+            workdir = tempfile.mkdtemp(prefix="e2e_crawl_")
+            job = {"base_url": server.base_url, "settings": run_settings, "main_args": main_args, "workdir": workdir}
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', json.dumps(job)],
+                capture_output=True, text=True
+            )
+            lines = output.stdout.strip().splitlines()
+            if output.returncode != 0 or not lines:
+                print(f"{label:<24} failed: {output.stderr.strip().splitlines()[-1:]}")
+                log = os.path.join(workdir, "crawl.log")
+                if os.path.exists(log):
+                    with open(log, "r", encoding="utf-8") as f:
+                        print("".join(f.readlines()[-20:]))
+            else:
+                stats = json.loads(lines[-1])
+                served = site.stats()
+                pages_per_second = stats["listing_ok"] / stats["seconds"] if stats["seconds"] else 0
+                cpu_share = stats["cpu_seconds"] / stats["seconds"] if stats["seconds"] else 0
+                peak = f"{stats['peak_memory_mb']:.0f}" if stats["peak_memory_mb"] is not None else "n/a"
+                print(f"{label:<24} {stats['listing_ok']:>6} {stats['listing_requests']:>6} "
+                      f"{served.get('errors', 0):>5} {served.get('blocked', 0):>5} {stats['seconds']:>8.1f} "
+                      f"{pages_per_second:>8.1f} {format_ms(stats['listing_p50']):>7} {format_ms(stats['listing_p99']):>7} "
+                      f"{stats['cpu_seconds']:>6.1f} {cpu_share:>6.0%} {peak:>8}")
+                if stats["csv_rows"] is not None:
+                    print(f"{'':<24} {stats['csv_rows']} CSV rows, {stats['api_requests']} API requests "
+                          f"(p50 {format_ms(stats['api_p50'])} ms)")
+            if args.keep:
+                print(f"{'':<24} run folder: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
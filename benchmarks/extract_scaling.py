@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark of listing extraction (extract_data.iter_extracted) over worker
+process counts.
+
+Extracts the same set of listing pages once per worker count (1 = parsed in this
+process, as extract_data.py did before the process pool) and reports files/s,
+MB/s of HTML and the speedup over one worker. Every run must produce exactly the
+records of the single-process run; differences are reported. Writing the CSV is
+left out: only parsing scales with workers, the writer is one process either way.
+
+Pages come from a saved listings folder (any storage layout) or are generated
+with the mock site's synthetic listing pages (mock_server.py).
+
+Usage:
+    python benchmarks/extract_scaling.py                          # listings/ corpus
+    python benchmarks/extract_scaling.py --source listings/iskele_villa --workers 1,2,4
+    python benchmarks/extract_scaling.py --synthetic 2000
+
+Note: the speedup is bounded by the CPU cores of the machine (os.cpu_count()).
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import extract_data
+import mock_server
+import storage
+
+def write_synthetic(folder, count, padding_kb):
+    # Synthetic listing pages saved as plain .html files
+    os.makedirs(folder, exist_ok=True)
+    for n in range(count):
+        listing_id = 100000 + n
+        with open(os.path.join(folder, f"{listing_id}.html"), 'w', encoding='utf-8') as f:
+            f.write(mock_server.synthetic_listing_page(listing_id, config.BASE_DOMAIN, padding_kb))
+
+def run(html_files, workers):
+    # (seconds, {html_file: result}) of one extraction; per-field messages are dropped
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = dict(extract_data.iter_extracted(html_files, workers, quiet=True))
+    return time.perf_counter() - started, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Listing extraction throughput per worker process count")
+    parser.add_argument('--source', default=config.OUTPUT_DIR, help='Saved listings folder')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of files to use')
+    parser.add_argument('--synthetic', type=int, default=None, help='Generate this many synthetic listing pages instead')
+    parser.add_argument('--padding-kb', type=int, default=120, help='Boilerplate size of synthetic pages')
+    parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker counts')
+    args = parser.parse_args()
+
+    workdir = None
+    if args.synthetic:
+        workdir = tempfile.mkdtemp(prefix="extract_scaling_")
+        write_synthetic(workdir, args.synthetic, args.padding_kb)
+        extract_data.HTML_FOLDER = workdir
+    else:
+        extract_data.HTML_FOLDER = args.source
+    try:
+        html_files = extract_data.find_html_files()[:args.limit]
+        if not html_files:
+            print(f"No listing pages found in '{args.source}'. Run main.py first or pass --synthetic N.")
+            return
+        size = sum(len(extract_data.read_html_file(html_file)) for html_file in html_files)
+        print(f"{len(html_files)} listing pages, {size / 1e6:.1f} MB of HTML, {os.cpu_count()} CPU cores\n")
+
+        print(f"{'workers':>7} {'seconds':>8} {'files/s':>8} {'MB/s':>7} {'speedup':>8} {'parity':>7}")
+        baseline_seconds = baseline = None
+        for workers in [int(value) for value in args.workers.split(",")]:
+            seconds, results = run(html_files, workers)
+            if baseline is None:
+                baseline_seconds, baseline = seconds, results
+            differing = sum(1 for html_file in html_files if results.get(html_file) != baseline.get(html_file))
+            parity = "ok" if not differing else f"{differing} diff"
+            print(f"{workers:>7} {seconds:>8.2f} {len(html_files) / seconds:>8.1f} {size / 1e6 / seconds:>7.1f} "
+                  f"{baseline_seconds / seconds:>7.2f}x {parity:>7}")
+    finally:
+        storage.close_stores()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
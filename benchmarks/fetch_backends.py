@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Side-by-side throughput and memory comparison of the listing fetch backends.
+
+Fetches the same listing URLs with the crawl4ai backend and the plain HTTP
+backend (see fetchers.py) and prints pages/s, bytes downloaded and peak memory
+for each. Every backend runs in its own subprocess so peak memory (including
+the browser processes started by crawl4ai) is measured in isolation.
+
+Usage:
+    python benchmarks/fetch_backends.py                     # URLs from saved search pages
+    python benchmarks/fetch_backends.py --urls urls.txt --limit 100 --concurrency 4
+
+Note: this hits the live site; keep --limit and --concurrency modest.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+BACKENDS = ["crawl4ai", "http"]
+
+def peak_memory_mb():
+    # Peak RSS of this process plus its (finished) children, in MB
+    try:
+        import resource
+    except ImportError:
+        return None
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KB on Linux
+    return (self_rss + children_rss) / divisor
+
+def collect_urls(limit):
+    # Harvests listing URLs from the saved search pages
+    import main
+    import storage
+    urls = []
+    for page_name in storage.list_html(config.PAGES_DIR):
+        if not page_name.startswith("search_page_"):
+            continue
+        html = storage.read_html(config.PAGES_DIR, page_name)
+        for url in sorted(asyncio.run(main.extract_listing_links(html, config.get_base_search_url()))):
+            if url not in urls:
+                urls.append(url)
+        if len(urls) >= limit:
+            break
+    return urls[:limit]
+
+async def run_backend(backend, urls, concurrency):
+    from fetchers import LazyCrawler, create_listing_fetcher
+
+    async def fetch_all(fetcher):
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+        stats = {"ok": 0, "failed": 0, "bytes": 0}
+
+        async def worker():
+            while not queue.empty():
+                url = queue.get_nowait()
+                try:
+                    result = await fetcher.fetch(url)
+                    if result.html:
+                        stats["ok"] += 1
+                        stats["bytes"] += len(result.html.encode('utf-8'))
+                    else:
+                        stats["failed"] += 1
+                except Exception:
+                    stats["failed"] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    async with LazyCrawler() as crawler:
+        fetcher = create_listing_fetcher(crawler, backend=backend)
+        try:
+            return await fetch_all(fetcher)
+        finally:
+            await fetcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare listing fetch backends")
+    parser.add_argument('--urls', help='File with one listing URL per line (default: links from saved search pages)')
+    parser.add_argument('--limit', type=int, default=50, help='Number of URLs to fetch per backend')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent requests per backend')
+    parser.add_argument('--backend', choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--url-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        # Child process: run one backend and report as JSON
+        with open(args.url_file, 'r', encoding='utf-8') as f:
+            urls = f.read().split()
+        stats = asyncio.run(run_backend(args.backend, urls, args.concurrency))
+        stats["peak_memory_mb"] = peak_memory_mb()
+        print(json.dumps(stats))
+        return
+
+    if args.urls:
+        with open(args.urls, 'r', encoding='utf-8') as f:
+            urls = f.read().split()[:args.limit]
+    else:
+        urls = collect_urls(args.limit)
+    if not urls:
+        print("No URLs to benchmark. Run main.py first or pass --urls.")
+        return
+
+    url_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fetch_benchmark_urls.txt")
+    with open(url_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(urls))
+
+    print(f"Fetching {len(urls)} URLs per backend with concurrency {args.concurrency}\n")
+    print(f"{'backend':<10} {'ok':>5} {'failed':>6} {'seconds':>8} {'pages/s':>8} {'MB down':>8} {'peak MB':>8}")
+    try:
+        for backend in BACKENDS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--backend', backend,
+                 '--url-file', url_file, '--concurrency', str(args.concurrency)],
+                capture_output=True, text=True
+            )
+            lines = output.stdout.strip().splitlines()
+            if output.returncode != 0 or not lines:
+                print(f"{backend:<10} failed: {output.stderr.strip().splitlines()[-1:]}")
+                continue
+            stats = json.loads(lines[-1])
+            pages_per_second = stats["ok"] / stats["seconds"] if stats["seconds"] else 0
+            peak = f"{stats['peak_memory_mb']:.0f}" if stats["peak_memory_mb"] is not None else "n/a"
+            print(f"{backend:<10} {stats['ok']:>5} {stats['failed']:>6} {stats['seconds']:>8.1f} "
+                  f"{pages_per_second:>8.2f} {stats['bytes'] / 1e6:>8.1f} {peak:>8}")
+    finally:
+        os.remove(url_file)
+
+if __name__ == "__main__":
+    main()
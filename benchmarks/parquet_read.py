@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Load and filter times of the extracted listings: property_details.csv with
+pd.read_csv against the typed, partitioned Parquet copy (extract_data.export_parquet)
+with pd.read_parquet.
+
+Runs on an existing CSV or on generated rows (--synthetic N: realistic values for
+every column, spread over cities, listing types and currencies). Three reads are
+timed for each format:
+    full load    every row and column
+    columns      price, currency, city, listing_type, listing_date
+    filter       sale listings in one city under a price, with those columns
+                 (Parquet skips the other partitions and row groups entirely)
+and the filtered rows of both formats must be the same listings. Also prints the
+size on disk, the DataFrame memory and the column dtypes each format gives.
+
+Usage:
+    python benchmarks/parquet_read.py --synthetic 100000
+    python benchmarks/parquet_read.py --csv property_details.csv --repeat 5
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extract_data
+
+COLUMNS = ['property_id', 'price', 'currency', 'city', 'listing_type', 'listing_date']
+CITIES = ["Girne", "Gazimağusa", "Lefkoşa", "İskele", "Güzelyurt", "Lefke"]
+DISTRICTS = ["Alsancak", "Lapta", "Boğaz", "Long Beach", "Gönyeli", "Çatalköy", "Karaoğlanoğlu", "Yeniboğaziçi"]
+
+def write_synthetic_csv(path, rows, seed=101):
+    # rows listings with values like parse_details produces, in the CSV's column order
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(extract_data.CSV_HEADERS)
+        for n in range(rows):
+            listing_type = rng.choice(["Sale", "Sale", "Rent"])
+            currency = rng.choice(["GBP", "GBP", "USD", "EUR", "TRY"])
+            price = float(rng.randint(300, 3000) if listing_type == "Rent" else rng.randint(40, 900) * 1000)
+            listing_id = 100000 + n
+            values = {
+                'source_file': f"{listing_id}.html", 'property_id': str(listing_id),
+                'title': f"{rng.choice(['Satılık', 'Kiralık'])} {rng.choice(['2+1', '3+1', 'Villa'])} daire {n}",
+                'price': price, 'currency': currency, 'listing_type': listing_type,
+                'property_type': rng.choice(["Konut", "Arsa", "İşyeri"]), 'property_subtype': rng.choice(["Daire", "Villa", "Penthouse"]),
+                'room_count': rng.choice(["1+1", "2+1", "3+1", "4+1"]), 'district': rng.choice(DISTRICTS),
+                'city': rng.choice(CITIES), 'country': "Northern Cyprus", 'agency_name': f"Emlak {rng.randint(1, 300)}",
+                'url': f"https://www.101evler.com/kibris/satilik-emlak/ilan-{listing_id}.html",
+                'description': " ".join(rng.choice(["deniz", "manzaralı", "havuzlu", "bahçeli", "merkezi", "yeni"]) for _ in range(60)),
+                'listing_date': f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.choice([2024, 2025])}",
+                'update_date': f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2025" if rng.random() < 0.6 else "",
+                'title_deed_type': rng.choice(["Türk Koçanı", "Eşdeğer Koçan", "Tahsis"]), 'min_rental_period': "",
+                'payment_interval': "", 'exchange_option': rng.choice(["Var", "Yok"]),
+                'price_tl_14x': price * 40 * 14,
+                'image_links': ",".join(f"https://img.101evler.com/{listing_id}/{i}.jpg" for i in range(rng.randint(5, 25))),
+                'phone_numbers': f"+90533{rng.randint(1000000, 9999999)}",
+                'whatsapp_numbers': f"+90533{rng.randint(1000000, 9999999)}" if rng.random() < 0.5 else "",
+            }
+            writer.writerow([values[column] for column in extract_data.CSV_HEADERS])
+
+def folder_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def best_of(repeat, read):
+    # (best seconds, DataFrame of the last run)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = read()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, df
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV vs Parquet load and filter times of the extracted listings")
+    parser.add_argument('--csv', default=extract_data.OUTPUT_FILE, help='Extracted listings CSV')
+    parser.add_argument('--synthetic', type=int, default=None, help='Generate this many rows instead')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per read (best is reported)')
+    parser.add_argument('--city', default=None, help='City of the filter (default: the most common)')
+    parser.add_argument('--max-price', type=float, default=200000, help='Price limit of the filter')
+    args = parser.parse_args()
+
+    if extract_data.pyarrow is None:
+        print("pyarrow is not installed.")
+        return
+    workdir = tempfile.mkdtemp(prefix="parquet_read_")
+    try:
+        csv_path = args.csv
+        if args.synthetic:
+            csv_path = os.path.join(workdir, "property_details.csv")
+            write_synthetic_csv(csv_path, args.synthetic)
+        if not os.path.exists(csv_path):
+            print(f"'{csv_path}' not found. Run extract_data.py first or pass --synthetic N.")
+            return
+        parquet_dir = os.path.join(workdir, "property_details_parquet")
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = extract_data.export_parquet(csv_path, parquet_dir)
+        export_seconds = time.perf_counter() - started
+
+        city = args.city or pd.read_csv(csv_path, usecols=['city'])['city'].mode().iloc[0]
+        print(f"{rows} listings: CSV {folder_size(csv_path) / 1e6:.1f} MB, Parquet {folder_size(parquet_dir) / 1e6:.1f} MB "
+              f"(export {export_seconds:.1f}s)")
+        print(f"Filter: listing_type == 'Sale', city == '{city}', price < {args.max_price:g}\n")
+
+        def csv_filtered():
+            df = pd.read_csv(csv_path, usecols=COLUMNS, dtype={'property_id': str})
+            return df[(df['listing_type'] == 'Sale') & (df['city'] == city) & (df['price'] < args.max_price)]
+
+        def parquet_filtered():
+            return pd.read_parquet(parquet_dir, columns=COLUMNS, filters=[
+                ('listing_type', '==', 'Sale'), ('city', '==', city), ('price', '<', args.max_price)
+            ])
+
+        reads = [
+            ("full load", lambda: pd.read_csv(csv_path, dtype={'property_id': str}), lambda: pd.read_parquet(parquet_dir)),
+            ("columns", lambda: pd.read_csv(csv_path, usecols=COLUMNS, dtype={'property_id': str}),
+             lambda: pd.read_parquet(parquet_dir, columns=COLUMNS)),
+            ("filter", csv_filtered, parquet_filtered),
+        ]
+        print(f"{'read':<10} {'CSV ms':>9} {'Parquet ms':>11} {'speedup':>8} {'CSV MB':>7} {'Parquet MB':>11} {'rows':>8}")
+        frames = {}
+        for label, read_csv, read_parquet in reads:
+            csv_seconds, csv_df = best_of(args.repeat, read_csv)
+            parquet_seconds, parquet_df = best_of(args.repeat, read_parquet)
+            frames[label] = (csv_df, parquet_df)
+            print(f"{label:<10} {csv_seconds * 1000:>9.1f} {parquet_seconds * 1000:>11.1f} {csv_seconds / parquet_seconds:>7.1f}x "
+                  f"{csv_df.memory_usage(deep=True).sum() / 1e6:>7.1f} {parquet_df.memory_usage(deep=True).sum() / 1e6:>11.1f} "
+                  f"{len(parquet_df):>8}")
+
+        csv_df, parquet_df = frames["filter"]
+        same = set(csv_df['property_id']) == set(parquet_df['property_id'])
+        print(f"\nFiltered listings: {'identical' if same else 'DIFFERENT'} ({len(csv_df)} CSV, {len(parquet_df)} Parquet)")
+        csv_df, parquet_df = frames["full load"]
+        print("\nColumn dtypes (CSV -> Parquet):")
+        for column in extract_data.CSV_HEADERS:
+            if column in csv_df.columns and column in parquet_df.columns:
+                print(f"  {column:<18} {str(csv_df[column].dtype):<10} -> {parquet_df[column].dtype}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Differential check and timings of the HTML parser engines of extract_data.py
+(PARSER_ENGINE: "html.parser" and "lxml").
+
+Every listing page is extracted with each engine (extract_data.parse_details)
+and the results are compared field by field against the first engine; any
+difference is printed with the file and both values, and the exit status is 1.
+Switch PARSER_ENGINE only once this reports no differences on your saved pages.
+
+Per-file timings are split into parsing (building the BeautifulSoup tree) and
+extracting the fields from it, with the mean, p50 and p95 per engine and the
+speedup over the first engine.
+
+Pages come from a saved listings folder (any storage layout) or are generated
+with the mock site's synthetic listing pages (mock_server.py).
+
+Usage:
+    python benchmarks/parser_engines.py                            # every page in listings/
+    python benchmarks/parser_engines.py --source listings/iskele_villa --limit 500
+    python benchmarks/parser_engines.py --synthetic 200
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import extract_data
+import mock_server
+import storage
+
+def percentile(values, q):
+    # Nearest-rank percentile of an unsorted list
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))]
+
+def load_pages(source, limit):
+    # [(html_file, html)] of the listing pages under a folder
+    extract_data.HTML_FOLDER = source
+    html_files = extract_data.find_html_files()[:limit]
+    return [(html_file, extract_data.read_html_file(html_file)) for html_file in html_files]
+
+def synthetic_pages(count, padding_kb):
+    return [(f"{100000 + n}.html", mock_server.synthetic_listing_page(100000 + n, config.BASE_DOMAIN, padding_kb))
+            for n in range(count)]
+
+def run_engine(pages, engine):
+    # ({html_file: result}, [parse seconds], [total seconds]) of one engine; the
+    # per-field messages of parse_details are dropped
+    results = {}
+    parse_times = []
+    total_times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for html_file, html in pages:
+            started = time.perf_counter()
+            extract_data.make_soup(html, engine)
+            parse_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            results[html_file] = extract_data.parse_details(html, html_file, engine)
+            total_times.append(time.perf_counter() - started)
+    return results, parse_times, total_times
+
+def shorten(value, length=60):
+    text = repr(value)
+    return text if len(text) <= length else text[:length - 3] + "..."
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extract_data.py parser engines on listing pages")
+    parser.add_argument('--source', default=config.OUTPUT_DIR, help='Saved listings folder')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of pages to use')
+    parser.add_argument('--synthetic', type=int, default=None, help='Generate this many synthetic listing pages instead')
+    parser.add_argument('--padding-kb', type=int, default=120, help='Boilerplate size of synthetic pages')
+    parser.add_argument('--engines', default=",".join(extract_data.PARSER_ENGINES), help='Comma-separated engines, the first is the reference')
+    args = parser.parse_args()
+
+    engines = args.engines.split(",")
+    for engine in engines:
+        if extract_data.resolve_parser(engine) != engine:
+            print(f"Engine '{engine}' is not available here.")
+            return 2
+    pages = synthetic_pages(args.synthetic, args.padding_kb) if args.synthetic else load_pages(args.source, args.limit)
+    storage.close_stores()
+    if not pages:
+        print(f"No listing pages found in '{args.source}'. Run main.py first or pass --synthetic N.")
+        return 2
+    size = sum(len(html) for _, html in pages)
+    print(f"{len(pages)} listing pages, {size / 1e6:.1f} MB of HTML\n")
+
+    runs = {engine: run_engine(pages, engine) for engine in engines}
+    reference_engine = engines[0]
+    reference = runs[reference_engine][0]
+    differences = 0
+    for engine in engines[1:]:
+        results = runs[engine][0]
+        differing_files = 0
+        for html_file, _ in pages:
+            expected, actual = reference[html_file], results[html_file]
+            fields = [field for field in extract_data.RECORD_FIELDS if expected.get(field) != actual.get(field)]
+            if not fields:
+                continue
+            differing_files += 1
+            for field in fields:
+                print(f"{html_file}: {field} differs: {reference_engine} {shorten(expected.get(field))}, "
+                      f"{engine} {shorten(actual.get(field))}")
+        differences += differing_files
+        print(f"Parity {engine} vs {reference_engine}: {len(pages) - differing_files}/{len(pages)} pages identical")
+    print()
+
+    print(f"{'engine':<12} {'parse ms':>9} {'extract ms':>11} {'total ms':>9} {'p50 ms':>7} {'p95 ms':>7} {'files/s':>8} {'speedup':>8}")
+    reference_seconds = sum(runs[reference_engine][2])
+    for engine in engines:
+        _, parse_times, total_times = runs[engine]
+        total = sum(total_times)
+        parse = sum(parse_times)
+        print(f"{engine:<12} {parse * 1000 / len(pages):>9.2f} {(total - parse) * 1000 / len(pages):>11.2f} "
+              f"{total * 1000 / len(pages):>9.2f} {percentile(total_times, 50) * 1000:>7.2f} "
+              f"{percentile(total_times, 95) * 1000:>7.2f} {len(pages) / total:>8.1f} {reference_seconds / total:>7.2f}x")
+    return 1 if differences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of search page parsing: the single-pass scanner
+(main.scan_search_page) against the previous path, a full BeautifulSoup parse for
+the listing links plus one regex scan per page/count signal.
+
+Both paths run over the same saved search pages (pages/search_page_*, any storage
+layout) and must agree: listing links and (total listings, total pages) are
+compared for every page and mismatches are reported. Prints ms/page for each
+path and the speedup.
+
+Usage:
+    python benchmarks/search_page_scan.py                        # pages from pages/
+    python benchmarks/search_page_scan.py --source pages/iskele_villa --repeat 5
+    python benchmarks/search_page_scan.py --synthetic 50         # generated pages
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import time
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import main
+import storage
+
+def legacy_extract_listing_links(html, base_url):
+    # main.extract_listing_links before the scanner
+    soup = BeautifulSoup(html, 'html.parser')
+    links = set()
+    listing_pattern = re.compile(config.get_listing_pattern())
+    for tag in soup.find_all('a', href=listing_pattern):
+        absolute_url = urljoin(base_url, tag['href'].strip())
+        parsed_url = urlparse(absolute_url)
+        if parsed_url.scheme in ['http', 'https'] and parsed_url.netloc == urlparse(config.BASE_DOMAIN).netloc:
+            links.add(absolute_url)
+    return links
+
+def legacy_extract_total_counts(html):
+    # main.extract_total_counts before the scanner (messages left out)
+    total_listings = None
+    total_pages = None
+    match = re.search(r'<span id="page_number">(\d+)</span>', html)
+    if match and match.group(1) != "1":
+        total_pages = int(match.group(1))
+    match = re.search(r'([\d\.]+)\s*Sonuç Bulundu', html)
+    if match:
+        try:
+            total_listings = int(match.group(1).replace('.', ''))
+            if total_pages is None:
+                total_pages = max(1, (total_listings + 29) // 30)
+        except ValueError:
+            pass
+    if total_pages is None:
+        options = re.findall(r'<option[^>]*value="[^"]*[?&]page=(\d+)[^"]*"[^>]*>(\d+)</option>', html)
+        if options:
+            highest_page = max(int(page[0]) for page in options)
+            if highest_page > 1:
+                total_pages = highest_page
+    if total_pages is None:
+        match = re.search(r'<a[^>]*href="[^"]*[?&]page=(\d+)[^"]*"[^>]*>.*?Son.*?</a>', html)
+        if match:
+            total_pages = int(match.group(1))
+    if total_listings is None:
+        items_count = len(re.findall(r'class="ilanitem(cardorange|basic)"', html))
+        if items_count > 0:
+            total_listings = items_count
+    if total_listings == 0 and total_pages is None:
+        total_pages = 1
+    if total_pages is None:
+        total_pages = 30
+    return total_listings, total_pages
+
+def legacy_parse(html, base_url):
+    return legacy_extract_listing_links(html, base_url), legacy_extract_total_counts(html)
+
+def scanner_parse(html, base_url):
+    scan = main.scan_search_page(html, base_url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        counts = main.extract_total_counts(html, scan)
+    return scan.links, counts
+
+def load_pages(source, limit):
+    # [(name, html)] of the rendered search pages in a folder (API responses are JSON)
+    pages = []
+    for root, dirs, _ in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if d not in storage.STORE_DIRS)
+        for name in storage.list_html(root):
+            if name.startswith('search_page_') and not name.endswith('_api.html'):
+                pages.append((os.path.join(root, name), storage.read_html(root, name)))
+                if len(pages) >= limit:
+                    return pages
+    return pages
+
+def synthetic_pages(count, seed=101):
+    # Search-result-like pages: navigation, filters and scripts around 30 listing
+    # cards, a result count, pagination options and a last-page link
+    rng = random.Random(seed)
+    words = ["villa", "daire", "satilik", "iskele", "girne", "magusa", "havuz", "bahce", "deniz", "manzara"]
+    navigation = "".join(
+        f'<li class="nav-item"><a href="/kibris/{rng.choice(words)}/{rng.choice(words)}" class="nav-link">'
+        f'{" ".join(rng.choice(words) for _ in range(3))}</a></li>\n'
+        for _ in range(400)
+    )
+    filters = "".join(
+        f'<label><input type="checkbox" name="f{i}" value="{i}"> {rng.choice(words)}</label>\n' for i in range(300)
+    )
+    script = "<script>" + "".join(f"var v{i}={rng.randint(0, 10**6)};" for i in range(2000)) + "</script>"
+    pages = []
+    for n in range(count):
+        total = rng.randint(100, 5000)
+        total_pages = (total + 29) // 30
+        cards = "".join(
+            f'<div class="ilanitem{rng.choice(["cardorange", "basic"])}"><a href="/kibris/satilik-emlak/'
+            f'{rng.choice(words)}-{rng.choice(words)}-{rng.randint(10**5, 10**6)}.html" class="card-link">'
+            f'<img src="/img/{rng.randint(1, 10**6)}.jpg"><span class="price">{rng.randint(50, 900)}.000 £</span>'
+            f'<span>{" ".join(rng.choice(words) for _ in range(8))}</span></a></div>\n'
+            for _ in range(30)
+        )
+        options = "".join(
+            f'<option value="/kibris/satilik-emlak/iskele?page={p}">{p}</option>' for p in range(1, total_pages + 1)
+        )
+        html = (
+            f"<html><head><title>Satilik</title>{script}</head><body><ul>{navigation}</ul>"
+            f"<form>{filters}</form><span class=\"count_label\">{total:,} Sonuç Bulundu</span>".replace(",", ".")
+            + f"<div class=\"results\">{cards}</div>"
+            f"<select class=\"pagination\">{options}</select><span id=\"page_number\">1</span>"
+            f"<a href=\"/kibris/satilik-emlak/iskele?page={total_pages}\" class=\"page-link\">Son</a>"
+            f"<footer>{navigation}</footer></body></html>"
+        )
+        pages.append((f"synthetic_{n}", html))
+    return pages
+
+def time_path(parse, pages, base_url, repeat):
+    # Best of repeat runs, in seconds for all pages
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _, html in pages:
+            parse(html, base_url)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Compare search page parsing paths")
+    parser.add_argument('--source', default=config.PAGES_DIR, help='Saved search pages folder')
+    parser.add_argument('--limit', type=int, default=200, help='Maximum number of pages to use')
+    parser.add_argument('--synthetic', type=int, default=None, help='Generate this many synthetic pages instead')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per path (best is reported)')
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.synthetic) if args.synthetic else load_pages(args.source, args.limit)
+    if not pages:
+        print(f"No rendered search pages found in '{args.source}'. Run main.py first or pass --synthetic N.")
+        return
+    base_url = config.get_base_search_url()
+    size = sum(len(html) for _, html in pages)
+    print(f"{len(pages)} search pages, {size / 1e6:.1f} MB of HTML\n")
+
+    mismatches = 0
+    for name, html in pages:
+        expected = legacy_parse(html, base_url)
+        actual = scanner_parse(html, base_url)
+        if expected != actual:
+            mismatches += 1
+            print(f"Mismatch in {name}: {len(expected[0] ^ actual[0])} links differ, counts {expected[1]} vs {actual[1]}")
+    print(f"Parity: {len(pages) - mismatches}/{len(pages)} pages identical\n")
+
+    legacy_seconds = time_path(legacy_parse, pages, base_url, args.repeat)
+    scanner_seconds = time_path(scanner_parse, pages, base_url, args.repeat)
+    print(f"{'path':<22} {'ms/page':>9} {'pages/s':>9}")
+    for label, seconds in (("BeautifulSoup + regex", legacy_seconds), ("single-pass scanner", scanner_seconds)):
+        print(f"{label:<22} {seconds * 1000 / len(pages):>9.2f} {len(pages) / seconds:>9.0f}")
+    print(f"\nSpeedup: {legacy_seconds / scanner_seconds:.1f}x")
+
+if __name__ == "__main__":
+    main_benchmark()
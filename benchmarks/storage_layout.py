@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Disk footprint and read throughput of the page storage layouts (see storage.py).
+
+Writes the same set of listing pages as plain .html files (the original layout),
+into the compressed, content-addressed store with gzip and zstd, and into the
+segment archive, then reads every page back by name and with a sequential
+scan (memory-mapped for segments). Prints bytes on disk, file count, write time,
+open time (index load) and read throughput for each layout.
+
+Pages come from a saved listings folder (any layout) or are generated: synthetic
+pages share a large block of boilerplate markup, like the real listing pages,
+and a share of them are identical re-fetches to show deduplication.
+
+Usage:
+    python benchmarks/storage_layout.py                       # pages from listings/
+    python benchmarks/storage_layout.py --source listings/iskele_villa --limit 2000
+    python benchmarks/storage_layout.py --synthetic 2000 --duplicates 0.2
+
+Note: reads are measured with a warm page cache.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import storage
+
+def load_pages(source, limit):
+    # [(name, html)] from a saved listings folder
+    names = storage.list_html(source)[:limit]
+    return [(name, storage.read_html(source, name)) for name in names]
+
+def synthetic_pages(count, duplicates, seed=101):
+    # Listing-like pages: ~150 KB of shared boilerplate (navigation, scripts, footer)
+    # around a few KB of listing-specific details
+    rng = random.Random(seed)
+    words = ["villa", "daire", "satilik", "iskele", "girne", "magusa", "havuz", "bahce",
+             "deniz", "manzara", "oda", "salon", "banyo", "otopark", "asansor", "site"]
+    boilerplate = "".join(
+        f'<div class="nav-item n{i}"><a href="/kibris/{rng.choice(words)}/{rng.choice(words)}">'
+        f'{" ".join(rng.choice(words) for _ in range(6))}</a></div>\n'
+        for i in range(1500)
+    )
+    script = "<script>" + "".join(f"var v{i}={rng.randint(0, 10**6)};" for i in range(3000)) + "</script>"
+    pages = []
+    for n in range(count):
+        if pages and rng.random() < duplicates:
+            # Identical re-fetch of an earlier page, stored under its own name
+            pages.append((f"{100000 + n}.html", rng.choice(pages)[1]))
+            continue
+        details = "".join(
+            f'<li><span class="label">{rng.choice(words)}</span><span class="value">{rng.randint(1, 10**6)}</span></li>'
+            for _ in range(40)
+        )
+        description = " ".join(rng.choice(words) for _ in range(300))
+        html = (f"<html><head><title>Ilan {100000 + n}</title></head><body>{boilerplate}"
+                f"<h1>{description[:60]}</h1><ul>{details}</ul><p>{description}</p>{script}</body></html>")
+        pages.append((f"{100000 + n}.html", html))
+    return pages
+
+def disk_usage(directory):
+    # (bytes allocated on disk, apparent bytes, file count)
+    allocated = apparent = files = 0
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            stat = os.stat(os.path.join(root, filename))
+            allocated += getattr(stat, "st_blocks", 0) * 512 or stat.st_size
+            apparent += stat.st_size
+            files += 1
+    return allocated, apparent, files
+
+LAYOUTS = {
+    # name: (HTML_STORAGE mode, compression)
+    "files": ("files", None),
+    "gzip": ("compressed", "gzip"),
+    "zstd": ("compressed", "zstd"),
+    "segments": ("segments", "auto"),
+}
+
+def run_layout(layout, pages, workdir):
+    directory = os.path.join(workdir, layout)
+    mode, codec = LAYOUTS[layout]
+    store = storage.HtmlStore(directory, mode=mode, codec=codec)
+
+    started = time.perf_counter()
+    for name, html in pages:
+        store.put(name, html)
+    store.close()
+    write_seconds = time.perf_counter() - started
+
+    allocated, apparent, files = disk_usage(directory)
+
+    # Fresh store instance, as extract_data.py would open it
+    started = time.perf_counter()
+    store = storage.HtmlStore(directory, mode=mode, codec=codec)
+    names = sorted(store.names())
+    open_seconds = time.perf_counter() - started
+
+    # Random access by name (one positioned read per page for segments)
+    order = list(names)
+    random.Random(1).shuffle(order)
+    started = time.perf_counter()
+    read_bytes = 0
+    for name in order:
+        read_bytes += len(store.get(name))
+    read_seconds = time.perf_counter() - started
+
+    # Sequential scan of everything
+    started = time.perf_counter()
+    for _, html in store.iter_pages():
+        pass
+    scan_seconds = time.perf_counter() - started
+    store.close()
+    return {
+        "allocated": allocated,
+        "apparent": apparent,
+        "files": files,
+        "write_seconds": write_seconds,
+        "open_seconds": open_seconds,
+        "read_seconds": read_seconds,
+        "read_bytes": read_bytes,
+        "scan_seconds": scan_seconds,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare page storage layouts")
+    parser.add_argument('--source', default=config.OUTPUT_DIR, help='Saved listings folder to read pages from')
+    parser.add_argument('--limit', type=int, default=1000, help='Maximum number of pages to use')
+    parser.add_argument('--synthetic', type=int, default=None, help='Generate this many synthetic pages instead')
+    parser.add_argument('--duplicates', type=float, default=0.1, help='Share of identical re-fetches in synthetic pages')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        pages = synthetic_pages(args.synthetic, args.duplicates)
+    else:
+        pages = load_pages(args.source, args.limit)
+    if not pages:
+        print(f"No pages found in '{args.source}'. Run main.py first or pass --synthetic N.")
+        return
+    raw_bytes = sum(len(html.encode('utf-8')) for _, html in pages)
+    print(f"{len(pages)} pages, {raw_bytes / 1e6:.1f} MB of HTML\n")
+
+    layouts = [layout for layout in LAYOUTS if layout != "zstd" or storage.zstandard is not None]
+    if storage.zstandard is None:
+        print("zstandard not installed, skipping the zstd layout (segments use gzip)\n")
+    print(f"{'layout':<9} {'MB disk':>8} {'ratio':>6} {'files':>7} {'write s':>8} {'open s':>7} "
+          f"{'read s':>7} {'pages/s':>8} {'MB/s':>7} {'scan s':>7}")
+    workdir = tempfile.mkdtemp(prefix="storage_benchmark_")
+    try:
+        for layout in layouts:
+            stats = run_layout(layout, pages, workdir)
+            pages_per_second = len(pages) / stats["read_seconds"] if stats["read_seconds"] else 0
+            mb_per_second = stats["read_bytes"] / 1e6 / stats["read_seconds"] if stats["read_seconds"] else 0
+            print(f"{layout:<9} {stats['allocated'] / 1e6:>8.1f} {raw_bytes / stats['allocated']:>6.1f} "
+                  f"{stats['files']:>7} {stats['write_seconds']:>8.2f} {stats['open_seconds']:>7.3f} "
+                  f"{stats['read_seconds']:>7.2f} {pages_per_second:>8.0f} {mb_per_second:>7.0f} "
+                  f"{stats['scan_seconds']:>7.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
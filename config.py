@@ -17,6 +17,10 @@ SORT = "mr"  # mr=en yeni, pa=fiyat artan, pd=fiyat azalan
 # Kaç sayfa taranacak? (None = tümü, sayı = maksimum sayfa)
 MAX_PAGES = None
 
+# Artımlı tarama (SORT = "mr" ile): bilinen ilanlara ulaşınca sayfalama durur,
+# toplam ilan sayısı ve ilk sayfa değişmemişse tarama tamamen atlanır
+INCREMENTAL = False
+
 # =============================================================================
 # HIZLI AYARLAR - Örnekler
 # =============================================================================
@@ -49,13 +53,112 @@ QUICK_CONFIGS = {
 OUTPUT_DIR = "listings"
 PAGES_DIR = "pages"
 
-# İndirme hızı (1-5 arası, 3 önerilen)
+# Sayfaların saklanma şekli: "compressed" (sıkıştırılmış, içerik özetine göre tek kopya;
+# aynı içerik tekrar indirilirse yer kaplamaz), "segments" (sıkıştırılmış sayfalar büyük
+# segment dosyalarına eklenir; binlerce küçük dosya yerine birkaç büyük dosya) veya
+# "files" (her sayfa ayrı .html dosyası). Tüm biçimler okunabilir; mevcut klasörler
+# "python storage.py convert listings --to segments" ile dönüştürülebilir.
+HTML_STORAGE = "compressed"
+SEGMENT_MAX_MB = 256  # bir segment dosyası bu boyuta ulaşınca yenisine geçilir
+STORAGE_COMPRESSION = "auto"  # "auto" (zstandard kuruluysa zstd, değilse gzip), "zstd", "gzip"
+STORAGE_COMPRESSION_LEVEL = 10  # zstd seviyesi (1-22, yüksek = daha küçük ama daha yavaş)
+
+# Disk yazımı: sayfalar ayrı iş parçacıklarında sıkıştırılıp yazılır (indirmeyi bekletmez).
+# Her sayfa önce geçici dosyaya yazılıp yerine taşınır, yarım kalmış dosya oluşmaz.
+WRITER_THREADS = 4  # yazma iş parçacığı sayısı
+WRITER_MAX_PENDING = 64  # aynı anda bekleyebilecek en fazla yazma (dolunca indirme yavaşlar)
+FSYNC_EVERY = 100  # bu kadar sayfada bir diske kesin yazılır (fsync)
+FSYNC_INTERVAL = 5.0  # ya da en geç bu kadar saniyede bir
+
+# Akış modu (--stream): indirilen her ilan hemen ayrıştırılıp CSV'ye eklenir
+STREAM_EXTRACT = False  # True ise --stream vermeden de akış modu açık
+STREAM_QUEUE_SIZE = 100  # ayrıştırılmayı bekleyebilecek en fazla sayfa (dolunca indirme yavaşlar)
+STREAM_EXTRACT_WORKERS = 2  # aynı anda ayrıştırılan sayfa sayısı
+ARCHIVE_HTML = True  # False (veya --no-archive) ise ilan HTML'leri kaydedilmez, sadece CSV'ye yazılır
+
+# Arama sayfaları taranırken bulunan ilanlar hemen indirilmeye başlar; bu kuyruk dolunca
+# arama sayfası taraması ilan indirmelerini bekler (bellek kullanımı sabit kalır)
+LISTING_QUEUE_SIZE = 200
+
+# İndirme hızı: aynı anda ilan çeken işçi sayısı (1-5 arası, 3 önerilen)
 BATCH_SIZE = 3
 
 # Bekleme süreleri (saniye)
 DELAY_BETWEEN_REQUESTS = 1.5
 DELAY_BETWEEN_BATCHES = 1.0
 
+# Uyarlanabilir hız kontrolü: yukarıdaki değerler başlangıç noktasıdır. Gecikme
+# sabit kaldıkça hız ve eşzamanlılık artırılır; engellenme, 429/5xx veya gecikme
+# artışında hızla düşürülür. False = sabit hız (BATCH_SIZE ve bekleme süreleri)
+ADAPTIVE_RATE = True
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+MIN_REQUESTS_PER_SECOND = 0.2
+MAX_REQUESTS_PER_SECOND = 5.0
+RATE_INCREASE_STEP = 0.1  # her sağlıklı turda eklenen istek/saniye
+RATE_BURST = 2  # token bucket kapasitesi (art arda izin verilen istek)
+LATENCY_SPIKE_FACTOR = 2.5  # normal gecikmenin kaç katı "ani artış" sayılır
+DECREASE_COOLDOWN = 5.0  # iki yavaşlama arasındaki minimum süre (saniye)
+
+# İlan sayfaları için indirme yöntemi: "http" (hafif HTTP istemcisi, önerilen)
+# veya "crawl4ai" (arama sayfalarında her zaman crawl4ai/Playwright kullanılır)
+LISTING_FETCHER = "http"
+HTTP_MAX_CONNECTIONS = 10  # HTTP bağlantı havuzu boyutu
+HTTP2 = True  # sunucu destekliyorsa HTTP/2 kullan
+HTTP_TIMEOUT = 30  # saniye
+
+# Hatalı ilan indirmelerinin tekrar denenmesi: geçici hatalarda (zaman aşımı, boş yanıt,
+# 5xx) ilan artan bekleme süresiyle (RETRY_BASE_DELAY, 2x, 4x ... RETRY_MAX_DELAY, rastgele
+# sapmayla) tekrar denenir. 404/410 tekrar denenmez. Deneme hakkı biten ilanlar "hatalı"
+# olarak kalır; "python main.py --retry-failed" ile yeniden denenir.
+MAX_ATTEMPTS = 4  # bir ilan için en fazla deneme
+RETRY_BASE_DELAY = 10  # ilk tekrar denemeden önceki bekleme (saniye)
+RETRY_MAX_DELAY = 300  # en uzun bekleme (saniye)
+RETRY_JITTER = 0.5  # beklemenin en fazla bu oranı kadar rastgele kısaltılır
+RETRY_EVERY = 5  # yeni ilanlar varken her 5 yeni ilanda bir zamanı gelen tekrar deneme yapılır
+RETRY_MAX_WAIT = 60  # yeni iş kalmadığında bir tekrar deneme için en fazla beklenecek süre; daha uzaksa sonraki çalıştırmaya kalır
+
+# Engellenme: tüm istekler tek bir bekleme süresi boyunca durdurulur, sonra tek bir
+# deneme isteği atılır. Hala engelliyse kalan işler FRONTIER_DB'de sırada kalır.
+BLOCK_COOLDOWN_SECONDS = 180
+# Tarama durumu veritabanı (SQLite): bulunan her ilan ve durumu (sırada / indiriliyor /
+# tamamlandı / hatalı), deneme sayısı, son indirme zamanı ve içerik özeti.
+# Yarıda kalan tarama buradan kaldığı yerden devam eder.
+FRONTIER_DB = "frontier.db"
+# Artımlı tarama için hedef başına son durum (toplam ilan sayısı, ilk sayfadaki ilanlar)
+WATERMARK_FILE = "watermarks.json"
+
+# Tazelik: kayıtlı sayfalar bu süre dolunca yeniden indirilir (saniye; None = hiç yenilenmez).
+# Arama sayfaları kısa sürede eskir (yeni ilanlar ilk sayfalara düşer). İlanlar, tarama
+# sırasında tekrar bulunduklarında süreleri dolmuşsa koşullu istekle yenilenir; süre
+# ilanın yaşıyla uzar: ilk bulunuşundan bu yana geçen sürenin LISTING_TTL_AGE_FACTOR
+# katı, en az LISTING_TTL, en fazla LISTING_TTL_MAX.
+SEARCH_PAGE_TTL = 6 * 3600  # 6 saat
+LISTING_TTL = 7 * 86400  # 7 gün
+LISTING_TTL_AGE_FACTOR = 0.5  # 0 = yaştan bağımsız, hep LISTING_TTL
+LISTING_TTL_MAX = 30 * 86400  # 30 gün
+
+# Öncelikli yenileme (python main.py --refresh): kayıtlı ilanlar değişme olasılıklarına
+# göre sıralanır ve günlük istek bütçesi en olası değişikliklere harcanır. Olasılık;
+# son kontrolden bu yana geçen süre, ilanın geçmişte ne sıklıkla değiştiği, CSV'deki
+# update_date / listing_date ve ilanın son arama sayfalarında görülüp görülmediğine göre
+# hesaplanır ("python scheduler.py" sıralamayı gösterir).
+REFRESH_DAILY_BUDGET = 500  # günde en fazla yenileme isteği (None = sınırsız)
+REFRESH_MIN_INTERVAL = 86400  # bir ilan en fazla bu sıklıkla yenilenir (saniye)
+REFRESH_PRIOR_DAYS = 14  # geçmişi olmayan ilanın varsayılan değişme aralığı (gün)
+REFRESH_RECENT_UPDATE_DAYS = 7  # update_date bu kadar yeniyse ilan daha sık değişiyor sayılır
+REFRESH_NEW_LISTING_DAYS = 30  # listing_date bu kadar yeniyse ilan daha sık değişiyor sayılır
+REFRESH_SEEN_DAYS = 3  # bu kadar gündür arama sayfalarında görülmeyen ilan muhtemelen kalkmış
+
+# Arama sonuçları nasıl çekilsin: "api" (sitenin /ac/arama-sonucu XHR isteği,
+# tarayıcı gerekmez; başarısız olursa Playwright'a geçilir) veya "playwright"
+SEARCH_BACKEND = "api"
+
+# Arama sayfaları: aynı anda kaç sayfa çekilsin (1 = sırayla)
+SEARCH_CONCURRENCY = 1
+# Arama sayfası istekleri arasındaki minimum süre (tüm paralel sayfalar için ortak)
+SEARCH_PAGE_DELAY = 1.5
+
 # =============================================================================
 # SİSTEM AYARLARI - Değiştirmeyin
 # =============================================================================
@@ -98,23 +201,69 @@ BLOCK_PHRASES = [
 # FONKSİYONLAR - Sistem tarafından kullanılır
 # =============================================================================
 
-def get_base_search_url():
+class Target:
+    """Taranacak hedef: şehir + emlak türü (+ sıralama). Arama URL'si ve API
+    parametreleri modül değişkenleri yerine bu nesneden de üretilebilir."""
+
+    def __init__(self, city, property_type, sort=None, name=None):
+        self.city = city
+        self.property_type = property_type
+        self.sort = sort or SORT
+        self.name = name or f"{city}_{property_type}"
+
+    @property
+    def key(self):
+        """Hedefin kalıcı anahtarı (watermark vb. için)"""
+        return f"{self.property_type}/{self.city}/{self.sort}"
+
+    def __repr__(self):
+        return f"Target({self.name}: {self.city} - {self.property_type}, sort={self.sort})"
+
+def get_current_target():
+    """CITY / PROPERTY_TYPE / SORT değişkenlerinden hedef oluşturur"""
+    return Target(CITY, PROPERTY_TYPE, SORT, name=f"{CITY}_{PROPERTY_TYPE}")
+
+def get_targets(names):
+    """Hedef listesi oluşturur. names: "all" (tüm QUICK_CONFIGS), QUICK_CONFIGS
+    isimleri veya "şehir/emlak-türü" şeklinde özel hedefler"""
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(",") if name.strip()]
+    if names == ["all"]:
+        names = list(QUICK_CONFIGS.keys())
+    targets = []
+    for name in names:
+        if name in QUICK_CONFIGS:
+            quick = QUICK_CONFIGS[name]
+            targets.append(Target(quick["CITY"], quick["PROPERTY_TYPE"], name=name))
+        elif "/" in name:
+            city, property_type = name.split("/", 1)
+            targets.append(Target(city, property_type))
+        else:
+            raise ValueError(f"'{name}' bulunamadı. Mevcut ayarlar: {list(QUICK_CONFIGS.keys())} veya şehir/emlak-türü")
+        if targets[-1].property_type not in PROPERTY_CONFIGS:
+            raise ValueError(f"Bilinmeyen emlak türü: {targets[-1].property_type}")
+    return targets
+
+def get_base_search_url(target=None):
     """Ana arama URL'sini oluşturur"""
-    return f"{BASE_DOMAIN}/kibris/{PROPERTY_TYPE}/{CITY}"
+    target = target or get_current_target()
+    return f"{BASE_DOMAIN}/kibris/{target.property_type}/{target.city}"
 
-def get_search_url_with_page(page=1):
+def get_search_url_with_page(page=1, target=None):
     """Sayfa numarası ile tam URL oluşturur"""
-    base_url = get_base_search_url()
-    return f"{base_url}?page={page}&sort={SORT}"
+    target = target or get_current_target()
+    base_url = get_base_search_url(target)
+    return f"{base_url}?page={page}&sort={target.sort}"
 
-def get_api_params(page=1):
+def get_api_params(page=1, target=None):
     """API parametrelerini oluşturur"""
-    config = PROPERTY_CONFIGS[PROPERTY_TYPE]
+    target = target or get_current_target()
+    config = PROPERTY_CONFIGS[target.property_type]
     subtype_params = []
     for i, subtype in enumerate(config['subtype']):
         subtype_params.append(f"property_subtype%5B{i}%5D={subtype}")
     subtype_string = "&".join(subtype_params)
-    return f"page={page}&s_r={config['sale']}&property_type={config['type']}&city={CITY}&{subtype_string}"
+    return f"page={page}&s_r={config['sale']}&property_type={config['type']}&city={target.city}&{subtype_string}"
 
 def get_listing_pattern():
     """İlan linklerini bulmak için pattern"""
@@ -164,6 +313,14 @@ def show_help():
 3. ÇALIŞTIRMA:
    python main.py                              # Tüm sayfalar
    python main.py --max-pages 5                # Sadece 5 sayfa
+   python main.py --search-concurrency 4       # 4 arama sayfasını paralel çek
+   python main.py --incremental                # Sadece yeni ilanlar (günlük çalıştırma)
+   python main.py --targets all                # Tüm QUICK_CONFIGS hedeflerini birlikte tara
+   python main.py --targets iskele_villa,girne/satilik-daire
+   python main.py --retry-failed               # Sadece hatalı ilanları tekrar dene
+   python main.py --refresh                    # Günlük bütçeyle en değerli kayıtlı ilanları yenile
+   python main.py --stream                     # İlanları indirirken CSV'ye de ekle
+   python main.py --stream --no-archive        # Sadece CSV, HTML kaydedilmez
 
 Daha fazla bilgi için README.md dosyasını okuyun.
 """)
@@ -6,21 +6,63 @@ import pandas as pd
 # from openai import AsyncOpenAI
 from tqdm.asyncio import tqdm
 import csv
+import contextlib
+import io
 from pathlib import Path
 import shutil
+import signal
 import re
 import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from bs4 import BeautifulSoup
+try:
+    import lxml
+except ImportError:
+    lxml = None
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import storage
 
 # Configuration
 HTML_FOLDER = 'listings'
 OUTPUT_FILE = 'property_details.csv'
 TEMP_FOLDER = 'temp'  # Temporary folder for JSON files
 MAX_CONCURRENT = 3
+EXTRACT_WORKERS = None  # Extraction processes (None = one per CPU core)
+EXTRACT_CHUNK_SIZE = 16  # Files handed to a worker process at a time
+# HTML parser behind parse_details: "html.parser" (Python's own), "lxml" (C parser,
+# several times faster, same BeautifulSoup tree) or "auto" (lxml when installed).
+# Check that both give the same fields on your pages with benchmarks/parser_engines.py
+PARSER_ENGINE = "html.parser"
+PARSER_ENGINES = ("html.parser", "lxml")
+CSV_FLUSH_ROWS = 500  # Rows buffered before they are written to the CSV
+CSV_FLUSH_INTERVAL = 5.0  # Buffered rows are written at least this often (seconds)
+
+# Parquet output (needs pyarrow): a typed copy of OUTPUT_FILE, partitioned into
+# folders by PARQUET_PARTITIONS and rebuilt whenever the CSV changed
+PARQUET_OUTPUT = False  # or: python extract_data.py --parquet
+PARQUET_DIR = 'property_details_parquet'
+PARQUET_PARTITIONS = ('city', 'listing_type')
+PARQUET_UNKNOWN_PARTITION = 'unknown'  # Folder (and value) for rows without a city / listing type
+DATE_FORMATS = ("%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d")
+
+# Columns of a new CSV file (an existing file keeps its own header order)
+CSV_HEADERS = (
+    'source_file', 'property_id', 'title', 'price', 'currency',
+    'listing_type', 'property_type', 'property_subtype', 'room_count',
+    'district', 'city', 'country', 'agency_name',
+    'url', 'description', 'listing_date', 'update_date',
+    'title_deed_type', 'min_rental_period', 'payment_interval', 'exchange_option',
+    'price_tl_14x', 'image_links', 'phone_numbers', 'whatsapp_numbers'
+)
 EXCHANGE_RATES_URL = "https://www.tcmb.gov.tr/kurlar/today.xml"
 
 # Remove OpenRouter API setup
@@ -71,11 +113,30 @@ def fetch_exchange_rates():
 # Get property ID from filename
 def get_property_id_from_filename(filename):
     # Extract numeric ID from the filename (e.g., 123456.html -> 123456)
-    match = re.match(r'(\d+)\.html', filename)
+    match = re.match(r'(\d+)\.html', os.path.basename(filename))
     if match:
         return match.group(1)
     return None
 
+# Find listing HTML files, including the per-target subfolders of multi-target runs
+def find_html_files():
+    # Paths are relative to HTML_FOLDER (e.g. 123456.html, iskele_villa/123456.html);
+    # pages in the compressed store (see storage.py) are listed like plain files
+    html_files = []
+    for root, dirs, files in os.walk(HTML_FOLDER):
+        dirs[:] = sorted(d for d in dirs if d != 'failed' and d not in storage.STORE_DIRS)
+        for filename in storage.list_html(root):
+            html_files.append(os.path.relpath(os.path.join(root, filename), HTML_FOLDER))
+    return html_files
+
+# Read a listing page (path relative to HTML_FOLDER) from the page store
+def read_html_file(html_file):
+    directory, filename = os.path.split(os.path.join(HTML_FOLDER, html_file))
+    html = storage.read_html(directory, filename)
+    if html is None:
+        raise FileNotFoundError(os.path.join(directory, filename))
+    return html
+
 # Load existing property IDs from the CSV file
 def load_existing_property_ids():
     existing_ids = set()
@@ -137,14 +198,7 @@ def setup_csv_file():
         with open(csv_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             # Define headers based on our expected JSON structure
-            headers = [
-                'source_file', 'property_id', 'title', 'price', 'currency', 
-                'listing_type', 'property_type', 'property_subtype', 'room_count',
-                'district', 'city', 'country', 'agency_name', 
-                'url', 'description', 'listing_date', 'update_date', 
-                'title_deed_type', 'min_rental_period', 'payment_interval', 'exchange_option',
-                'price_tl_14x', 'image_links', 'phone_numbers', 'whatsapp_numbers'
-            ]
+            headers = list(CSV_HEADERS)
             writer.writerow(headers)
         print(f"Created new CSV file: {OUTPUT_FILE}")
     else:
@@ -316,81 +370,484 @@ def extract_whatsapp_numbers(soup):
 
 # Add a single result to the CSV file
 def append_to_csv(result, exchange_rates):
-    try:
-        # Calculate TL price with 14x multiplier if price and currency are available
-        if "price" in result and "currency" in result and result["price"] is not None and result["currency"] is not None:
-            result["price_tl_14x"] = calculate_tl_price(result["price"], result["currency"], exchange_rates)
-        else:
-            result["price_tl_14x"] = None
-        
-        # Read existing CSV headers to ensure we write data in the correct order
-        if os.path.exists(OUTPUT_FILE) and os.path.getsize(OUTPUT_FILE) > 0:
-            with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-                csv_reader = csv.reader(f)
-                headers = next(csv_reader)  # Get the first row which contains headers
+    # One row on its own; long runs use a CsvWriter
+    with CsvWriter(exchange_rates, flush_rows=1) as writer:
+        return writer.write(result) and writer.pending == 0
+
+# Long-lived writer for OUTPUT_FILE: the header order is read once when it is opened,
+# rows are buffered and appended in batches (every flush_rows rows or flush_interval
+# seconds, and on flush() / close()), with one write per batch instead of two file
+# opens and a header parse per row. rows and bytes count what reached the file.
+class CsvWriter:
+    def __init__(self, exchange_rates, path=None, flush_rows=CSV_FLUSH_ROWS, flush_interval=CSV_FLUSH_INTERVAL):
+        self.exchange_rates = exchange_rates
+        self.path = path or OUTPUT_FILE
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.rows = 0
+        self.bytes = 0
+        self.flushes = 0
+        self.last_flush = time.monotonic()
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'r', encoding='utf-8', newline='') as f:
+                self.headers = next(csv.reader(f))
         else:
-            # Define headers based on our expected JSON structure if file doesn't exist
-            headers = [
-                'source_file', 'property_id', 'title', 'price', 'currency', 
-                'listing_type', 'property_type', 'property_subtype', 'room_count',
-                'district', 'city', 'country', 'agency_name', 
-                'url', 'description', 'listing_date', 'update_date', 
-                'title_deed_type', 'min_rental_period', 'payment_interval', 'exchange_option',
-                'price_tl_14x', 'image_links', 'phone_numbers', 'whatsapp_numbers'
-            ]
-        
-        # Prepare row data in the same order as headers
-        row_data = []
-        for header in headers:
-            if header in result:
-                row_data.append(result[header])
+            self.headers = list(CSV_HEADERS)
+            self._append([self.headers])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pending(self):
+        return len(self.buffer)
+
+    def write(self, result):
+        # Buffers a parse_details result; True if it was accepted
+        try:
+            # Calculate TL price with 14x multiplier if price and currency are available
+            if result.get("price") is not None and result.get("currency") is not None:
+                result["price_tl_14x"] = calculate_tl_price(result["price"], result["currency"], self.exchange_rates)
             else:
-                row_data.append(None)  # Use None for missing fields
-        
-        # Write to CSV
-        with open(OUTPUT_FILE, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            # If this is the first entry, write headers
-            if not os.path.exists(OUTPUT_FILE) or os.path.getsize(OUTPUT_FILE) == 0:
-                writer.writerow(headers)
-            writer.writerow(row_data)
-        
+                result["price_tl_14x"] = None
+            # Row data in the order of the file's headers
+            self.buffer.append([result.get(header) for header in self.headers])
+        except Exception as e:
+            print(f"Error adding to CSV: {e}")
+            return False
         print(f"Added data from {result.get('source_file')} to CSV")
+        if len(self.buffer) >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
         return True
+
+    def flush(self):
+        # Appends the buffered rows; on an error they stay buffered for the next flush
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return True
+        try:
+            self._append(self.buffer)
+        except Exception as e:
+            print(f"Error writing {len(self.buffer)} rows to {self.path}: {e}")
+            return False
+        self.rows += len(self.buffer)
+        self.flushes += 1
+        self.buffer = []
+        return True
+
+    def _append(self, rows):
+        chunk = io.StringIO()
+        csv.writer(chunk).writerows(rows)
+        data = chunk.getvalue().encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(data)
+        self.bytes += len(data)
+
+    def close(self):
+        if not self.flush():
+            print(f"{len(self.buffer)} rows could not be written to {self.path}")
+        return self.rows
+
+    def describe(self):
+        return f"{self.rows} rows, {self.bytes / 1024:.0f} KB in {self.flushes} writes"
+
+# Date of a listing_date / update_date value as the site writes it (e.g. 14.03.2025),
+# None if it is missing or in another format
+def parse_listing_date(text):
+    if not text:
+        return None
+    text = str(text).strip().split(" ")[0]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+# Column types of the Parquet output; columns not listed are strings
+PARQUET_FLOAT_COLUMNS = ('price', 'price_tl_14x')
+PARQUET_DATE_COLUMNS = ('listing_date', 'update_date')
+PARQUET_LIST_COLUMNS = ('image_links', 'phone_numbers', 'whatsapp_numbers')  # comma-joined in the CSV
+PARQUET_CATEGORY_COLUMNS = (
+    'currency', 'listing_type', 'property_type', 'property_subtype', 'room_count', 'district',
+    'city', 'country', 'title_deed_type', 'min_rental_period', 'payment_interval', 'exchange_option'
+)
+
+def parse_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+# (Arrow type, converter from the CSV text) of a column
+def parquet_column_type(column):
+    if column in PARQUET_FLOAT_COLUMNS:
+        return pyarrow.float64(), parse_float
+    if column in PARQUET_DATE_COLUMNS:
+        return pyarrow.date32(), parse_listing_date
+    if column in PARQUET_LIST_COLUMNS:
+        return pyarrow.list_(pyarrow.string()), lambda text: [item for item in text.split(',') if item] if text else None
+    if column in PARQUET_CATEGORY_COLUMNS:
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string()), lambda text: text or None
+    return pyarrow.string(), lambda text: text or None
+
+# Typed Arrow table of the rows of a CSV file (read as text, so nothing is guessed)
+def read_csv_table(csv_path):
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        columns = [[] for _ in headers]
+        for row in reader:
+            for values, value in zip(columns, row):
+                values.append(value)
+    arrays = []
+    fields = []
+    for column, values in zip(headers, columns):
+        arrow_type, convert = parquet_column_type(column)
+        values = [convert(value) for value in values]
+        if column in PARQUET_PARTITIONS:
+            # Partition folders cannot be read back with missing values
+            values = [value or PARQUET_UNKNOWN_PARTITION for value in values]
+        arrays.append(pyarrow.array(values, type=arrow_type))
+        fields.append(pyarrow.field(column, arrow_type))
+    return pyarrow.Table.from_arrays(arrays, schema=pyarrow.schema(fields))
+
+# Rebuild PARQUET_DIR from OUTPUT_FILE: written next to it first and swapped in, so
+# readers never see a half-written dataset. Returns the number of rows.
+def export_parquet(csv_path=None, parquet_dir=None):
+    csv_path = csv_path or OUTPUT_FILE
+    parquet_dir = parquet_dir or PARQUET_DIR
+    table = read_csv_table(csv_path)
+    partitions = [column for column in PARQUET_PARTITIONS if column in table.column_names]
+    temp_dir = f"{parquet_dir}.tmp"
+    old_dir = f"{parquet_dir}.old"
+    for leftover in (temp_dir, old_dir):
+        shutil.rmtree(leftover, ignore_errors=True)
+    pyarrow.parquet.write_to_dataset(table, temp_dir, partition_cols=partitions or None)
+    os.makedirs(temp_dir, exist_ok=True)  # nothing is written for an empty CSV
+    if os.path.exists(parquet_dir):
+        os.rename(parquet_dir, old_dir)
+    os.rename(temp_dir, parquet_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    os.utime(parquet_dir)
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(parquet_dir) for name in names)
+    print(f"Wrote {table.num_rows} rows to {parquet_dir} ({size / 1024:.0f} KB, partitioned by {', '.join(partitions) or 'nothing'})")
+    return table.num_rows
+
+# Rebuild the Parquet output if PARQUET_OUTPUT is on and the CSV changed since
+def update_parquet_output():
+    if not PARQUET_OUTPUT or not os.path.exists(OUTPUT_FILE):
+        return
+    if pyarrow is None:
+        print("pyarrow package not installed, Parquet output skipped")
+        return
+    if os.path.exists(PARQUET_DIR) and os.path.getmtime(PARQUET_DIR) >= os.path.getmtime(OUTPUT_FILE):
+        return
+    try:
+        export_parquet()
     except Exception as e:
-        print(f"Error adding to CSV: {e}")
-        return False
+        print(f"Error writing Parquet output: {e}")
+
+async def extract_details(html_file, html=None):
+    # Read HTML file, unless the caller already has the page (streaming mode)
+    if html is None:
+        try:
+            html = read_html_file(html_file)
+        except Exception as e:
+            print(f"Error reading {html_file}: {e}")
+            return None
+    return parse_details(html, html_file)
+
+# Fields of a parse_details result, in order: worker processes send a listing back
+# as a tuple of these values instead of the dict
+RECORD_FIELDS = (
+    'source_file', 'property_id', 'title', 'price', 'currency',
+    'listing_type', 'property_type', 'property_subtype', 'room_count',
+    'district', 'city', 'country', 'agency_name',
+    'url', 'description', 'listing_date', 'update_date',
+    'title_deed_type', 'min_rental_period', 'payment_interval', 'exchange_option',
+    'image_links', 'phone_numbers', 'whatsapp_numbers'
+)
+
+# BeautifulSoup tree builder for a PARSER_ENGINE setting
+def resolve_parser(engine=None):
+    engine = engine or PARSER_ENGINE
+    if engine in ("auto", "lxml"):
+        if lxml is not None:
+            return "lxml"
+        if engine != "auto":
+            print("lxml package not installed, using html.parser")
+        return "html.parser"
+    if engine == "html.parser":
+        return engine
+    raise ValueError(f"Unknown parser engine: {engine} (expected 'auto', 'lxml' or 'html.parser')")
+
+# Parse a listing page into a BeautifulSoup tree with the configured engine
+def make_soup(html, engine=None):
+    return BeautifulSoup(html, resolve_parser(engine))
+
+# Set up an extraction process: the listings folder and parser engine of the parent
+# (main.py changes HTML_FOLDER) and, with quiet, no per-field messages
+QUIET_WORKER = False
+
+def init_extract_worker(html_folder, quiet=False, engine=None):
+    global HTML_FOLDER, PARSER_ENGINE, QUIET_WORKER
+    HTML_FOLDER = html_folder
+    PARSER_ENGINE = engine or PARSER_ENGINE
+    QUIET_WORKER = quiet
 
-async def extract_details(html_file):
-    # Read HTML file
-    file_path = os.path.join(HTML_FOLDER, html_file)
+# Read and parse one listing file into a record (tuple in RECORD_FIELDS order),
+# None if the file cannot be read
+def extract_record(html_file):
+    if QUIET_WORKER:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return read_record(html_file)
+    return read_record(html_file)
+
+def read_record(html_file):
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            html = f.read()
+        html = read_html_file(html_file)
     except Exception as e:
         print(f"Error reading {html_file}: {e}")
         return None
-        
+    result = parse_details(html, html_file)
+    return tuple(result.get(field) for field in RECORD_FIELDS)
+
+# Extract listing files on worker processes (parsing is CPU-bound, so threads or
+# asyncio would run them one at a time): files go out in chunks of
+# EXTRACT_CHUNK_SIZE and (html_file, result) pairs come back in input order, so the
+# caller is the single CSV writer. result is the parse_details dict, None if the
+# file could not be read. Small sets, and workers=1, are parsed in this process.
+def iter_extracted(html_files, workers=None, quiet=False):
+    workers = workers or EXTRACT_WORKERS or os.cpu_count() or 1
+    workers = min(workers, max(1, len(html_files) // EXTRACT_CHUNK_SIZE))
+    if workers <= 1:
+        records = map(extract_record, html_files)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_extract_worker, initargs=(HTML_FOLDER, quiet, PARSER_ENGINE))
+        records = pool.map(extract_record, html_files, chunksize=EXTRACT_CHUNK_SIZE)
+    try:
+        for html_file, record in zip(html_files, records):
+            yield html_file, dict(zip(RECORD_FIELDS, record)) if record is not None else None
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+# Label/value rows of the listing sections ("text-block-141" divs with the label in
+# "col-5" and the value in "col-7"), read from a declarative spec: each section lists
+# (label keyword, parser, field, overwrite). A row is handled by the first entry
+# whose keyword is in its label; the parser turns the value into {field: value}
+# updates. With overwrite a later row replaces the value, otherwise the field keeps
+# the first value found (in this section or an earlier one). The rows of all
+# sections are collected in one pass over the page and routed to their section by
+# its ancestor div; sections are then applied in the order of ROW_SECTIONS (that
+# order is the priority between them). Adding a field is a new entry here.
+CURRENCY_SYMBOLS = {'£': 'GBP', '$': 'USD', '€': 'EUR', '₺': 'TRY'}
+
+def text_field(field):
+    return lambda value: {field: value}
+
+def parse_property_id(value):
+    return {"property_id": value.replace('#', '').strip()}
+
+def location_parser(separators):
+    # Location as "district, city" or "district / city", separators tried in order
+    def parse(value):
+        fields = {"location": value}
+        for separator in separators:
+            parts = value.split(separator)
+            if len(parts) >= 2:
+                fields["district"] = parts[0].strip()
+                fields["city"] = parts[1].strip()
+                break
+        return fields
+    return parse
+
+def parse_property_type(value):
+    # Often "Konut / Daire"
+    parts = value.split('/')
+    if len(parts) >= 2:
+        return {"property_type": parts[0].strip(), "property_subtype": parts[1].strip()}
+    return {"property_type": value}
+
+def parse_listing_type(value):
+    if "Kiralık" in value:
+        return {"listing_type": "Rent"}
+    if "Satılık" in value:
+        return {"listing_type": "Sale"}
+    return {}
+
+def parse_price(value):
+    # Often "$580 (~ 22,291 TL)"
+    price_match = re.match(r'([£$€₺])\s*([0-9,.]+)', value)
+    if not price_match:
+        return {}
+    try:
+        price = float(price_match.group(2).replace(',', ''))
+    except ValueError:
+        # No digits ("$."): currency without a price
+        price = None
+    return {"price": price, "currency": CURRENCY_SYMBOLS[price_match.group(1)]}
+
+def parse_area(value):
+    # "85 m²"
+    area_match = re.match(r'([0-9,.]+)\s*m²', value)
+    try:
+        return {"area_m2": int(area_match.group(1).replace(',', ''))} if area_match else {}
+    except ValueError:
+        # "1.200 m²"
+        return {}
+
+def floor_parser(field):
+    # A number, or text such as "Giriş Katı"
+    def parse(value):
+        try:
+            return {field: int(value.strip())}
+        except ValueError:
+            return {field: value.strip()}
+    return parse
+
+HIZLI_BAKIS_FIELDS = [
+    ("İlan No", parse_property_id, "property_id", True),
+    ("Konum", location_parser((',', '/')), "location", True),
+    ("Emlak Türü", parse_property_type, "property_type", True),
+    ("Durumu", parse_listing_type, "listing_type", True),
+    ("Fiyat", parse_price, "price", True),
+    ("Tapu Türü", text_field("title_deed_type"), "title_deed_type", True),
+    ("Metrekare", parse_area, "area_m2", True),
+    ("Takas", text_field("exchange_option"), "exchange_option", True),
+    ("İlan Tarihi", text_field("listing_date"), "listing_date", True),
+    ("Güncelleme Tarihi", text_field("update_date"), "update_date", True),
+    ("En Az Kiralama", text_field("min_rental_period"), "min_rental_period", True),
+    ("Kira Ödeme Aralığı", text_field("payment_interval"), "payment_interval", True),
+    ("Oda Sayısı", text_field("room_count"), "room_count", True),
+]
+KONUT_DETAYLARI_FIELDS = [
+    ("Bulunduğu Kat", floor_parser("floor"), "floor", True),
+    ("Kat Sayısı", floor_parser("total_floors"), "total_floors", True),
+    ("Oda Sayısı", text_field("room_count"), "room_count", False),
+]
+# The right column of the quick look block, only read for dates still missing
+SIDE_FIELDS = [
+    ("İlan Tarihi", text_field("listing_date"), "listing_date", False),
+    ("Güncelleme Tarihi", text_field("update_date"), "update_date", False),
+    ("Konum", location_parser(('/', ',')), "location", False),
+]
+
+LABEL_CACHE_SIZE = 256
+
+class RowSpec:
+    # A section's spec compiled into a label -> entry dict. The labels the site uses
+    # as written in the spec hit the dict directly; any other label is matched by
+    # keyword once and remembered, up to LABEL_CACHE_SIZE labels per section.
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_label = {}
+        for entry in entries:
+            self.by_label.setdefault(entry[0], self.match(entry[0]))
+
+    def match(self, label_text):
+        # First entry whose keyword is in the label, None if there is none
+        return next((entry for entry in self.entries if entry[0] in label_text), None)
+
+    def lookup(self, label_text):
+        try:
+            return self.by_label[label_text]
+        except KeyError:
+            entry = self.match(label_text)
+            if len(self.by_label) < LABEL_CACHE_SIZE:
+                self.by_label[label_text] = entry
+            return entry
+
+# (name, section div as (attribute, value), class of a div the row must be in below
+# the section div (None: any), spec, value from a <strong> in the value column if
+# there is one, fields of which one must be missing for the section to be read)
+ROW_SECTIONS = [
+    ("Hızlı Bakış", ("id", "hizli-bakis"), "zebra-rows", RowSpec(HIZLI_BAKIS_FIELDS), True, None),
+    ("Konut Detayları", ("id", "konut-detaylari"), None, RowSpec(KONUT_DETAYLARI_FIELDS), True, None),
+    ("alternative HTML", ("class", "h-zl-bak-sright"), None, RowSpec(SIDE_FIELDS), False, ("listing_date", "update_date")),
+]
+ROW_FIELDS = ("property_id", "location", "district", "city", "property_type", "property_subtype",
+              "listing_type", "price", "currency", "title_deed_type", "area_m2", "exchange_option",
+              "listing_date", "update_date", "min_rental_period", "payment_interval", "room_count",
+              "floor", "total_floors")
+
+# Dates still missing after the sections are searched for in the page text:
+# (field, label in the raw HTML, pattern in the text)
+DATE_FALLBACKS = [
+    ("listing_date", re.compile(r'Tarihi', re.IGNORECASE),
+     re.compile(r'İlan\s+Tarihi\s*:?\s*(\d{2}/\d{2}/\d{4})', re.IGNORECASE)),
+    ("update_date", re.compile(r'Güncelleme', re.IGNORECASE),
+     re.compile(r'Güncelleme\s+Tarihi\s*:?\s*(\d{2}/\d{2}/\d{4})', re.IGNORECASE)),
+]
+
+def row_sections(row):
+    # Indexes into ROW_SECTIONS of the sections a row is in, from its ancestors
+    sections = []
+    classes_below = set()
+    for parent in row.parents:
+        if parent.name != 'div':
+            continue
+        classes = parent.get('class') or ()
+        for index, (_, (attribute, value), inside, _, _, _) in enumerate(ROW_SECTIONS):
+            found = parent.get('id') == value if attribute == "id" else value in classes
+            if found and (inside is None or inside in classes_below) and index not in sections:
+                sections.append(index)
+        classes_below.update(classes)
+    return sections
+
+def read_row(row, strong):
+    # (label, value) of a row, None if it has no label or value column; the first
+    # col-5 and col-7 divs are picked up in one walk over the row
+    label_div = value_div = None
+    for div in row.find_all('div'):
+        classes = div.get('class') or ()
+        if label_div is None and 'col-5' in classes:
+            label_div = div
+        elif value_div is None and 'col-7' in classes:
+            value_div = div
+    if not label_div or not value_div:
+        return None
+    strong_tag = value_div.find('strong') if strong else None
+    value_div = strong_tag or value_div
+    return label_div.get_text(strip=True), value_div.get_text(strip=True)
+
+# Apply the ROW_SECTIONS spec to a listing page, updating fields (ROW_FIELDS)
+def extract_row_fields(soup, fields, html_file):
+    section_rows = [[] for _ in ROW_SECTIONS]
+    for row in soup.find_all('div', class_='text-block-141'):
+        for index in row_sections(row):
+            section_rows[index].append(row)
+    for (name, _, _, spec, strong, needed), rows in zip(ROW_SECTIONS, section_rows):
+        if needed and all(fields[field] for field in needed):
+            continue
+        if rows:
+            print(f"Found {name} section in {html_file}")
+        for row in rows:
+            label_value = read_row(row, strong)
+            if label_value is None or not label_value[1]:
+                continue
+            entry = spec.lookup(label_value[0])
+            if entry is None:
+                continue
+            _, parse, field, overwrite = entry
+            if not overwrite and fields[field]:
+                continue
+            updates = parse(label_value[1])
+            fields.update(updates)
+            for updated, value in updates.items():
+                print(f"Found {updated} from {name}: {value}")
+
+# Extract the property fields from a listing page; html_file is only used for
+# source_file and messages, engine overrides PARSER_ENGINE
+def parse_details(html, html_file, engine=None):
     # Initialize all fields we want to extract directly from HTML
-    listing_date = None
-    update_date = None
-    location = None
-    district = None
-    city = None
-    property_id = None
-    property_type = None
-    property_subtype = None
-    listing_type = None
-    price = None
-    currency = None
-    area_m2 = None
-    min_rental_period = None
-    payment_interval = None
-    title_deed_type = None
-    exchange_option = None
-    room_count = None
-    floor = None
-    total_floors = None
+    fields = dict.fromkeys(ROW_FIELDS)
     agency_name = None
     url = None
     description = None
@@ -398,7 +855,7 @@ async def extract_details(html_file):
     image_links = None
     
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html, engine)
         
         # Extract image URLs from HTML
         image_urls = extract_image_urls(soup)
@@ -479,252 +936,39 @@ async def extract_details(html_file):
                 description = meta_desc.get('content')
                 print(f"Found description from meta (truncated): {description[:50]}...")
         
-        # Look for all info in the "Hızlı Bakış" section
-        hizli_bakis_div = soup.find('div', id='hizli-bakis')
-        if hizli_bakis_div:
-            print(f"Found Hızlı Bakış section in {html_file}")
-            # Find all rows in the quick look section
-            zebra_rows_divs = hizli_bakis_div.find_all('div', class_='zebra-rows')
-            
-            # Process all rows from all zebra-rows divs
-            all_rows = []
-            for zebra_div in zebra_rows_divs:
-                rows = zebra_div.find_all('div', class_='text-block-141')
-                all_rows.extend(rows)
-            
-            for row in all_rows:
-                # Find the label (left column)
-                label_div = row.find('div', class_='col-5')
-                # Find the value (right column)
-                value_div = row.find('div', class_='col-7')
-                
-                if not label_div or not value_div:
-                    continue
-                    
-                label_text = label_div.get_text(strip=True)
-                
-                # Extract value, first checking for <strong> tag inside
-                strong_tag = value_div.find('strong')
-                if strong_tag:
-                    value_text = strong_tag.get_text(strip=True)
-                else:
-                    value_text = value_div.get_text(strip=True)
-                
-                # Extract various fields based on label
-                if "İlan No" in label_text and value_text:
-                    # Remove '#' if present
-                    property_id = value_text.replace('#', '').strip()
-                    print(f"Found property ID from Hızlı Bakış: {property_id}")
-                
-                elif "Konum" in label_text and value_text:
-                    location = value_text
-                    print(f"Found location from Hızlı Bakış: {location}")
-                    # Try to split location into district and city
-                    parts = location.split(',')
-                    if len(parts) >= 2:
-                        district = parts[0].strip()
-                        city = parts[1].strip()
-                    else:
-                        parts = location.split('/')
-                        if len(parts) >= 2:
-                            district = parts[0].strip()
-                            city = parts[1].strip()
-                
-                elif "Emlak Türü" in label_text and value_text:
-                    # This often has format like "Konut / Daire"
-                    parts = value_text.split('/')
-                    if len(parts) >= 2:
-                        property_type = parts[0].strip()
-                        property_subtype = parts[1].strip()
-                    else:
-                        property_type = value_text
-                    print(f"Found property type: {property_type}, subtype: {property_subtype}")
-                
-                elif "Durumu" in label_text and value_text:
-                    if "Kiralık" in value_text:
-                        listing_type = "Rent"
-                    elif "Satılık" in value_text:
-                        listing_type = "Sale"
-                    print(f"Found listing type: {listing_type}")
-                
-                elif "Fiyat" in label_text and value_text:
-                    # Price often has format like "$580 (~ 22,291 TL)"
-                    # First, try to extract the price and currency symbol
-                    price_match = re.match(r'([£$€₺])\s*([0-9,.]+)', value_text)
-                    if price_match:
-                        currency_symbol = price_match.group(1)
-                        price_value = price_match.group(2).replace(',', '')
-                        
-                        # Convert currency symbol to ISO code
-                        if currency_symbol == '£':
-                            currency = 'GBP'
-                        elif currency_symbol == '$':
-                            currency = 'USD'
-                        elif currency_symbol == '€':
-                            currency = 'EUR'
-                        elif currency_symbol == '₺':
-                            currency = 'TRY'
-                        
-                        price = float(price_value) if price_value else None
-                        print(f"Found price: {price} {currency}")
-                
-                elif "Tapu Türü" in label_text and value_text:
-                    title_deed_type = value_text
-                    print(f"Found title deed type: {title_deed_type}")
-                
-                elif "Metrekare" in label_text and value_text:
-                    # Extract just the number from "85 m²"
-                    area_match = re.match(r'([0-9,.]+)\s*m²', value_text)
-                    if area_match:
-                        area_m2 = int(area_match.group(1).replace(',', ''))
-                    print(f"Found area: {area_m2} m²")
-                
-                elif "Takas" in label_text and value_text:
-                    exchange_option = value_text
-                    print(f"Found exchange option: {exchange_option}")
-                
-                elif "İlan Tarihi" in label_text and value_text:
-                    listing_date = value_text
-                    print(f"Found listing date from Hızlı Bakış: {listing_date}")
-                
-                elif "Güncelleme Tarihi" in label_text and value_text:
-                    update_date = value_text
-                    print(f"Found update date from Hızlı Bakış: {update_date}")
-                
-                elif "En Az Kiralama" in label_text and value_text:
-                    min_rental_period = value_text
-                    print(f"Found minimum rental period: {min_rental_period}")
-                
-                elif "Kira Ödeme Aralığı" in label_text and value_text:
-                    payment_interval = value_text
-                    print(f"Found payment interval: {payment_interval}")
-                    
-                elif "Oda Sayısı" in label_text and value_text:
-                    room_count = value_text
-                    print(f"Found room count from Hızlı Bakış: {room_count}")
-        
-        # Look in the Property Details (Konut Detayları) section for floor info and room count if not found earlier
-        konut_detaylari_div = soup.find('div', id='konut-detaylari')
-        if konut_detaylari_div:
-            print(f"Found Konut Detayları section in {html_file}")
-            detail_rows = konut_detaylari_div.find_all('div', class_='text-block-141')
-            
-            for row in detail_rows:
-                # Find the label (left column)
-                label_div = row.find('div', class_='col-5')
-                # Find the value (right column)
-                value_div = row.find('div', class_='col-7')
-                
-                if not label_div or not value_div:
-                    continue
-                    
-                label_text = label_div.get_text(strip=True)
-                
-                # Extract value, first checking for <strong> tag inside
-                strong_tag = value_div.find('strong')
-                if strong_tag:
-                    value_text = strong_tag.get_text(strip=True)
-                else:
-                    value_text = value_div.get_text(strip=True)
-                
-                # Extract floor information
-                if "Bulunduğu Kat" in label_text and value_text:
-                    try:
-                        # If it's a number, keep it as is
-                        floor = int(value_text.strip())
-                    except ValueError:
-                        # Otherwise, keep the text (e.g., "Giriş Katı", "Çatı Katı")
-                        floor = value_text.strip()
-                    print(f"Found floor: {floor}")
-                
-                elif "Kat Sayısı" in label_text and value_text:
-                    try:
-                        total_floors = int(value_text.strip())
-                    except ValueError:
-                        total_floors = value_text.strip()
-                    print(f"Found total floors: {total_floors}")
-                
-                # Extract room count if not found in Hızlı Bakış
-                elif "Oda Sayısı" in label_text and value_text and not room_count:
-                    room_count = value_text
-                    print(f"Found room count from Konut Detayları: {room_count}")
+        # Quick look, property details and side columns, see ROW_SECTIONS
+        extract_row_fields(soup, fields, html_file)
         
         # If we still don't have room count, check the summary icons at the top
-        if not room_count:
+        if not fields["room_count"]:
             room_count_divs = soup.find_all('div', class_='text-block-138')
             for div in room_count_divs:
                 text = div.get_text(strip=True)
                 # Look for common room count patterns like 1+1, 2+1, etc.
                 match = re.search(r'(\d+\+\d+)', text)
                 if match:
-                    room_count = match.group(1)
-                    print(f"Found room count from icons: {room_count}")
+                    fields["room_count"] = match.group(1)
+                    print(f"Found room count from icons: {fields['room_count']}")
                     break
         
         # If we don't have floor info yet but have total_floors, combine them for the floor field
-        if floor is not None and total_floors is not None:
-            floor = f"{floor} / {total_floors}"
-            print(f"Combined floor info: {floor}")
-        
-        # If we couldn't find dates in the primary structure, try alternative locations
-        if not listing_date or not update_date:
-            # Try looking in h-zl-bak-sright class
-            right_div = soup.find('div', class_='h-zl-bak-sright')
-            if right_div:
-                rows = right_div.find_all('div', class_='text-block-141')
-                
-                for row in rows:
-                    label_div = row.find('div', class_='col-5')
-                    value_div = row.find('div', class_='col-7')
-                    
-                    if label_div and value_div:
-                        label_text = label_div.get_text(strip=True)
-                        value_text = value_div.get_text(strip=True)
-                        
-                        if "İlan Tarihi" in label_text and value_text and not listing_date:
-                            listing_date = value_text
-                            print(f"Found listing date from alternative HTML: {listing_date}")
-                        
-                        if "Güncelleme Tarihi" in label_text and value_text and not update_date:
-                            update_date = value_text
-                            print(f"Found update date from alternative HTML: {update_date}")
-                            
-                        if "Konum" in label_text and value_text and not location:
-                            location = value_text
-                            print(f"Found location from alternative HTML: {location}")
-                            # Try to split location into district and city
-                            parts = location.split('/')
-                            if len(parts) >= 2:
-                                district = parts[0].strip()
-                                city = parts[1].strip()
-                            else:
-                                parts = location.split(',')
-                                if len(parts) >= 2:
-                                    district = parts[0].strip()
-                                    city = parts[1].strip()
-        
-        # Additional fallback: Try to find dates using text search
-        if not listing_date or not update_date:
-            # Common patterns to look for dates
-            listing_date_pattern = re.compile(r'İlan\s+Tarihi\s*:?\s*(\d{2}/\d{2}/\d{4})', re.IGNORECASE)
-            update_date_pattern = re.compile(r'Güncelleme\s+Tarihi\s*:?\s*(\d{2}/\d{2}/\d{4})', re.IGNORECASE)
-            
-            # Look for listing date
-            if not listing_date:
-                text = soup.get_text()
-                listing_match = listing_date_pattern.search(text)
-                if listing_match:
-                    listing_date = listing_match.group(1)
-                    print(f"Found listing date via regex: {listing_date}")
-            
-            # Look for update date
-            if not update_date:
-                if not 'text' in locals():
-                    text = soup.get_text()
-                update_match = update_date_pattern.search(text)
-                if update_match:
-                    update_date = update_match.group(1)
-                    print(f"Found update date via regex: {update_date}")
+        if fields["floor"] is not None and fields["total_floors"] is not None:
+            fields["floor"] = f"{fields['floor']} / {fields['total_floors']}"
+            print(f"Combined floor info: {fields['floor']}")
+        
+        # Additional fallback: find dates in the page text, for dates whose label
+        # is on the page at all (the text of the whole page is only built then)
+        missing_dates = [
+            (field, pattern) for field, label, pattern in DATE_FALLBACKS
+            if not fields[field] and label.search(html)
+        ]
+        if missing_dates:
+            text = soup.get_text()
+            for field, pattern in missing_dates:
+                date_match = pattern.search(text)
+                if date_match:
+                    fields[field] = date_match.group(1)
+                    print(f"Found {field} via regex: {fields[field]}")
         
         # Extract phone numbers
         phone_numbers = extract_phone_numbers(soup)
@@ -735,33 +979,33 @@ async def extract_details(html_file):
         whatsapp_numbers_str = ','.join(whatsapp_numbers) if whatsapp_numbers else None
         
         # Check if we have the minimal required data for a listing
-        has_basic_data = bool(property_id and (listing_type or property_type))
-        has_price_data = bool(price and currency)
-        has_location_data = bool(district or city)
+        has_basic_data = bool(fields["property_id"] and (fields["listing_type"] or fields["property_type"]))
+        has_price_data = bool(fields["price"] and fields["currency"])
+        has_location_data = bool(fields["district"] or fields["city"])
         
         # Now add the extracted property information
         result = {
             "source_file": html_file,
-            "property_id": property_id,
+            "property_id": fields["property_id"],
             "title": title,
-            "price": price,
-            "currency": currency,
-            "listing_type": listing_type,
-            "property_type": property_type,
-            "property_subtype": property_subtype,
-            "room_count": room_count,
-            "district": district,
-            "city": city,
+            "price": fields["price"],
+            "currency": fields["currency"],
+            "listing_type": fields["listing_type"],
+            "property_type": fields["property_type"],
+            "property_subtype": fields["property_subtype"],
+            "room_count": fields["room_count"],
+            "district": fields["district"],
+            "city": fields["city"],
             "country": "Northern Cyprus",
             "agency_name": agency_name,
             "url": url,
             "description": description,
-            "listing_date": listing_date,
-            "update_date": update_date,
-            "title_deed_type": title_deed_type,
-            "min_rental_period": min_rental_period,
-            "payment_interval": payment_interval,
-            "exchange_option": exchange_option,
+            "listing_date": fields["listing_date"],
+            "update_date": fields["update_date"],
+            "title_deed_type": fields["title_deed_type"],
+            "min_rental_period": fields["min_rental_period"],
+            "payment_interval": fields["payment_interval"],
+            "exchange_option": fields["exchange_option"],
             "image_links": image_links,
             "phone_numbers": phone_numbers_str,
             "whatsapp_numbers": whatsapp_numbers_str
@@ -773,34 +1017,204 @@ async def extract_details(html_file):
         print(f"Error processing {html_file}: {e}")
         return {
             "source_file": html_file,
-            "property_id": property_id,
+            "property_id": fields["property_id"],
             "title": title,
-            "price": price,
-            "currency": currency,
-            "listing_type": listing_type,
-            "property_type": property_type,
-            "property_subtype": property_subtype,
-            "room_count": room_count,
-            "district": district,
-            "city": city,
+            "price": fields["price"],
+            "currency": fields["currency"],
+            "listing_type": fields["listing_type"],
+            "property_type": fields["property_type"],
+            "property_subtype": fields["property_subtype"],
+            "room_count": fields["room_count"],
+            "district": fields["district"],
+            "city": fields["city"],
             "country": "Northern Cyprus",
             "agency_name": agency_name,
             "url": url,
             "description": description,
-            "listing_date": listing_date,
-            "update_date": update_date,
-            "title_deed_type": title_deed_type,
-            "min_rental_period": min_rental_period,
-            "payment_interval": payment_interval,
-            "exchange_option": exchange_option,
+            "listing_date": fields["listing_date"],
+            "update_date": fields["update_date"],
+            "title_deed_type": fields["title_deed_type"],
+            "min_rental_period": fields["min_rental_period"],
+            "payment_interval": fields["payment_interval"],
+            "exchange_option": fields["exchange_option"],
             "image_links": image_links,
             "phone_numbers": phone_numbers_str if 'phone_numbers_str' in locals() else None,
             "whatsapp_numbers": whatsapp_numbers_str if 'whatsapp_numbers_str' in locals() else None
         }
 
+# Re-extract changed listing files and replace their existing rows in the CSV
+async def reextract_files(html_files, workers=None):
+    print(f"Re-extracting {len(html_files)} changed listings...")
+    setup_csv_file()
+    exchange_rates = fetch_exchange_rates()
+    
+    results = [result for _, result in iter_extracted(html_files, workers) if result is not None]
+    
+    # Drop the stale rows of these listings before appending the new ones
+    changed_ids = {get_property_id_from_filename(html_file) for html_file in html_files}
+    changed_ids.update(str(result['property_id']) for result in results if result.get('property_id'))
+    changed_ids.discard(None)
+    try:
+        df = pd.read_csv(OUTPUT_FILE, dtype={'property_id': str})
+        stale = df['property_id'].astype(str).isin(changed_ids) | df['source_file'].isin(html_files)
+        if stale.any():
+            df[~stale].to_csv(OUTPUT_FILE, index=False)
+            print(f"Removed {int(stale.sum())} outdated rows from CSV")
+    except Exception as e:
+        print(f"Error removing outdated rows from CSV: {e}")
+    
+    with CsvWriter(exchange_rates) as writer:
+        updated = sum(1 for result in results if writer.write(result))
+    print(f"Updated {updated} listings in {OUTPUT_FILE}")
+    update_parquet_output()
+    return updated
+
+# Drop all but the last row of each of these listings: a refreshed listing's new row
+# is appended after its outdated one. Returns the number of rows removed.
+def drop_outdated_rows(property_ids):
+    try:
+        df = pd.read_csv(OUTPUT_FILE, dtype={'property_id': str})
+        ids = df['property_id'].astype(str)
+        outdated = ids.isin(property_ids) & ids.duplicated(keep='last')
+        if outdated.any():
+            df[~outdated].to_csv(OUTPUT_FILE, index=False)
+        return int(outdated.sum())
+    except Exception as e:
+        print(f"Error removing outdated rows from CSV: {e}")
+        return 0
+
+# Streaming extraction for main.py --stream: pages are handed over right after they
+# are fetched and go through a bounded queue to the extraction workers (each hands
+# its page to a pool of `workers` processes, see init_extract_worker), then to a
+# single CSV writer, so a new listing is in the CSV seconds after it was fetched
+# (no second pass over the saved files). When the queue is full, put() waits, which
+# slows the crawl down to the extraction speed. A refreshed page (refresh=True: an
+# expired listing that came back changed) replaces the listing's row: the new row is
+# appended and the outdated one is dropped in close().
+class StreamExtractor:
+    def __init__(self, queue_size=100, workers=MAX_CONCURRENT):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.results = asyncio.Queue(maxsize=queue_size)
+        self.workers = workers
+        self.exchange_rates = {}
+        self.existing_ids = set()
+        self.tasks = []
+        self.writer_task = None
+        self.csv_writer = None
+        self.pool = None
+        self.written = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.replaced_ids = set()
+
+    async def start(self):
+        setup_csv_file()
+        loop = asyncio.get_running_loop()
+        self.exchange_rates = await loop.run_in_executor(None, fetch_exchange_rates)
+        self.existing_ids = load_existing_property_ids()
+        self.csv_writer = CsvWriter(self.exchange_rates)
+        # Spawned, not forked: the crawler process has threads (page writer, HTTP client)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_extract_worker, initargs=(HTML_FOLDER, False, PARSER_ENGINE)
+        )
+        self.tasks = [asyncio.create_task(self._extract_worker()) for _ in range(self.workers)]
+        self.writer_task = asyncio.create_task(self._write_worker())
+
+    async def put(self, directory, filename, html, wait=False, refresh=False):
+        # Queues a fetched page (saved or not as directory/filename). With wait=True,
+        # returns only once its row is in the CSV (True) or extraction failed (False).
+        html_file = os.path.relpath(os.path.join(directory, filename), HTML_FOLDER)
+        done = asyncio.get_running_loop().create_future() if wait else None
+        await self.queue.put((html_file, html, done, refresh))
+        if done is not None:
+            return await done
+        return True
+
+    async def _extract_worker(self):
+        # Parsing runs in the process pool (it is CPU-bound and would hold the GIL on a
+        # thread), so the event loop keeps fetching meanwhile
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            html_file, html, done, refresh = item
+            try:
+                result = await loop.run_in_executor(self.pool, parse_details, html, html_file)
+            except Exception as e:
+                print(f"Error processing {html_file}: {e}")
+                result = None
+            await self.results.put((html_file, result, done, refresh))
+
+    async def _write_worker(self):
+        # Rows are buffered in the CsvWriter and written in batches; a wait=True
+        # caller (--no-archive) is answered once its row is in the file, so with
+        # such callers the buffer is also written whenever no more results are waiting
+        unflushed = []
+        while True:
+            item = await self.results.get()
+            if item is None:
+                break
+            html_file, result, done, refresh = item
+            saved = False
+            property_id = get_property_id_from_filename(html_file)
+            exists = result is not None and (property_id in self.existing_ids or str(result.get('property_id')) in self.existing_ids)
+            if result is None:
+                self.failed += 1
+            elif exists and not refresh:
+                print(f"Skipping {html_file} - already exists in CSV")
+                self.skipped += 1
+                saved = True
+            elif self.csv_writer.write(result):
+                if exists:
+                    self.replaced_ids.add(str(result.get('property_id') or property_id))
+                    self.updated += 1
+                else:
+                    self.written += 1
+                self.existing_ids.add(property_id)
+                if done is not None:
+                    unflushed.append(done)
+                    done = None
+            else:
+                self.failed += 1
+            if done is not None and not done.done():
+                done.set_result(saved)
+            if unflushed and self.results.empty():
+                self.csv_writer.flush()
+            if not self.csv_writer.pending:
+                for waiting in unflushed:
+                    if not waiting.done():
+                        waiting.set_result(True)
+                unflushed = []
+        self.csv_writer.close()
+        if self.replaced_ids:
+            removed = drop_outdated_rows(self.replaced_ids)
+            print(f"Removed {removed} outdated rows of refreshed listings from CSV")
+        saved = not self.csv_writer.pending
+        for waiting in unflushed:
+            if not waiting.done():
+                waiting.set_result(saved)
+
+    async def close(self):
+        # Drains the queues: every page put so far is extracted and written
+        for _ in self.tasks:
+            await self.queue.put(None)
+        await asyncio.gather(*self.tasks)
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.writer_task is not None:
+            await self.results.put(None)
+            await self.writer_task
+        print(f"Streaming extraction: {self.written} listings added to {OUTPUT_FILE}, {self.updated} updated, "
+              f"{self.skipped} already in CSV, {self.failed} failed ({self.csv_writer.describe()})")
+        update_parquet_output()
+
 # Main function to process files
-async def main():
+async def main(workers=None):
     print(f"Starting property extraction on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    writer = None
     
     try:
         # Setup necessary directories
@@ -817,7 +1231,7 @@ async def main():
         print(f"Found {len(existing_ids)} existing property IDs in CSV")
         
         # Find all HTML files to process
-        html_files = [f for f in os.listdir(HTML_FOLDER) if f.endswith('.html')]
+        html_files = find_html_files()
         print(f"Found {len(html_files)} HTML files to process")
         
         # Filter out files that have already been processed
@@ -825,7 +1239,7 @@ async def main():
         for html_file in html_files:
             property_id = get_property_id_from_filename(html_file)
             # Double check both the property_id and the filename itself
-            if property_id in existing_ids or html_file.replace('.html', '') in existing_ids:
+            if property_id in existing_ids or os.path.basename(html_file).replace('.html', '') in existing_ids:
                 print(f"Skipping {html_file} - already exists in CSV")
             else:
                 new_files.append(html_file)
@@ -865,39 +1279,32 @@ async def main():
         # Setup progress bar
         pbar = tqdm(total=len(new_files), desc="Extracting property details")
         
+        # One writer for the run: rows are appended in batches of CSV_FLUSH_ROWS
+        writer = CsvWriter(exchange_rates)
+        
         # Track successful and failed extractions
         successful = []
         failed = []
         
-        # Process in batches to limit memory usage
-        batch_size = min(MAX_CONCURRENT * 10, len(new_files))
-        for i in range(0, len(new_files), batch_size):
-            batch = new_files[i:i + batch_size]
-            
-            # Create tasks for batch
-            tasks = [extract_details(html_file) for html_file in batch]
-            
-            # Process batch concurrently
-            results = await asyncio.gather(*tasks)
-            
-            # Process results
-            for result in results:
-                if result is None:
-                    pbar.update(1)
-                    continue
-                    
-                source_file = result.get('source_file')
-                if source_file:
-                    # Save to CSV
-                    if append_to_csv(result, exchange_rates):
-                        successful.append(source_file)
-                    else:
-                        failed.append(source_file)
-                        print(f"Failed to add data from {source_file} to CSV")
-                
+        # Parse on worker processes; results are written here, one at a time
+        for _, result in iter_extracted(new_files, workers):
+            if result is None:
                 pbar.update(1)
+                continue
+                
+            source_file = result.get('source_file')
+            if source_file:
+                # Save to CSV
+                if writer.write(result):
+                    successful.append(source_file)
+                else:
+                    failed.append(source_file)
+                    print(f"Failed to add data from {source_file} to CSV")
+            
+            pbar.update(1)
         
         pbar.close()
+        writer.close()
         
         # Print summary
         print(f"\nExtraction Summary:")
@@ -905,6 +1312,7 @@ async def main():
         print(f"- Failed: {len(failed)} files")
         print(f"- Skipped (already processed): {len(existing_ids)} files")
         print(f"- Total files: {len(html_files)} files")
+        print(f"- Written to {OUTPUT_FILE}: {writer.describe()}")
         
         return len(html_files), len(successful), len(existing_ids)
     
@@ -915,14 +1323,18 @@ async def main():
         import traceback
         traceback.print_exc()
     finally:
+        # Rows still buffered when interrupted
+        if writer is not None:
+            writer.close()
+        update_parquet_output()
         print(f"Extraction process completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 # Function to restart extraction at intervals
-async def restart_extraction(interval_minutes=30, max_runs=10):
+async def restart_extraction(interval_minutes=30, max_runs=10, workers=None):
     run_count = 0
     while run_count < max_runs:
         print(f"\n--- Starting extraction run {run_count + 1} of {max_runs} ---")
-        total, successful, skipped = await main()
+        total, successful, skipped = await main(workers)
         
         run_count += 1
         if run_count >= max_runs:
@@ -939,9 +1351,36 @@ async def restart_extraction(interval_minutes=30, max_runs=10):
 
 # Run the script
 if __name__ == "__main__":
+    # A plain kill (SIGTERM) exits through the finally blocks, so buffered CSV rows are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
     print(f"Starting property extraction on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     try:
+        # --workers N: extraction processes (default EXTRACT_WORKERS)
+        workers = None
+        if "--workers" in sys.argv:
+            index = sys.argv.index("--workers")
+            try:
+                workers = max(1, int(sys.argv[index + 1]))
+            except (IndexError, ValueError):
+                print(f"Invalid --workers value. Using default: {EXTRACT_WORKERS or os.cpu_count()} workers.")
+            del sys.argv[index:index + 2]
+        
+        # --parquet: also write the typed, partitioned Parquet copy (PARQUET_DIR)
+        if "--parquet" in sys.argv:
+            PARQUET_OUTPUT = True
+            sys.argv.remove("--parquet")
+        
+        # --parser ENGINE: HTML parser (default PARSER_ENGINE)
+        if "--parser" in sys.argv:
+            index = sys.argv.index("--parser")
+            engine = sys.argv[index + 1] if index + 1 < len(sys.argv) else None
+            if engine in PARSER_ENGINES + ("auto",):
+                PARSER_ENGINE = engine
+            else:
+                print(f"Invalid --parser value: {engine}. Using default: {PARSER_ENGINE}.")
+            del sys.argv[index:index + 2]
+        
         # Check for command-line arguments
         if len(sys.argv) > 1 and sys.argv[1] == "--continuous":
             # Get interval in minutes (default 30)
@@ -961,9 +1400,9 @@ if __name__ == "__main__":
                     print(f"Invalid max runs: {sys.argv[3]}. Using default: 10 runs.")
             
             print(f"Running in continuous mode with {interval} minute intervals, maximum {max_runs} runs.")
-            asyncio.run(restart_extraction(interval, max_runs))
+            asyncio.run(restart_extraction(interval, max_runs, workers))
         else:
-            asyncio.run(main())
+            asyncio.run(main(workers))
             
     except KeyboardInterrupt:
         print("\nExtraction interrupted by user.")
@@ -0,0 +1,137 @@
+# Fetch backends for main.py
+# Every fetcher has the same interface:
+#   result = await fetcher.fetch(url, session_id=None, headers=None)  -> FetchResult
+#   await fetcher.close()
+#   fetcher.requests  -> requests sent so far (including failed ones)
+# Crawl4aiFetcher renders pages in Playwright (needed for the JavaScript-driven
+# search pages); HttpFetcher is a plain pooled HTTP client for static listing pages
+# and the search XHR endpoint.
+import asyncio
+import httpx
+from crawl4ai import AsyncWebCrawler
+import config
+
+class FetchResult:
+    # Body, status code and response headers of a single fetch
+    def __init__(self, html, status_code=None, headers=None):
+        self.html = html
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class LazyCrawler:
+    # Shared AsyncWebCrawler that only starts (and launches its browser) on first use,
+    # so runs that never need Playwright never pay for it
+    def __init__(self, **crawler_kwargs):
+        self.crawler_kwargs = crawler_kwargs or {"headers": config.HEADERS}
+        self.crawler = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def started(self):
+        return self.crawler is not None
+
+    async def get(self):
+        async with self._lock:
+            if self.crawler is None:
+                crawler = AsyncWebCrawler(**self.crawler_kwargs)
+                await crawler.__aenter__()
+                self.crawler = crawler
+        return self.crawler
+
+    async def close(self):
+        if self.crawler is not None:
+            await self.crawler.__aexit__(None, None, None)
+            self.crawler = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+class Crawl4aiFetcher:
+    # Fetches through crawl4ai's AsyncWebCrawler (a LazyCrawler), optionally rendering
+    # with Playwright
+    name = "crawl4ai"
+
+    def __init__(self, crawler, use_playwright=False):
+        self.crawler = crawler
+        self.use_playwright = use_playwright
+        self.requests = 0
+
+    async def fetch(self, url, session_id=None, headers=None):
+        # Per-request headers (e.g. conditional request validators) are not supported
+        # by the browser backend and are ignored
+        run_kwargs = {"use_playwright": self.use_playwright}
+        if session_id:
+            # Reuses the same browser page across calls (see main.SearchPagePool)
+            run_kwargs["session_id"] = session_id
+        crawler = await self.crawler.get()
+        self.requests += 1
+        result = await crawler.arun(url=url, **run_kwargs)
+        if not result:
+            return FetchResult(None)
+        return FetchResult(
+            result.html,
+            getattr(result, "status_code", None),
+            getattr(result, "response_headers", None),
+        )
+
+    async def kill_session(self, session_id):
+        if not self.crawler.started:
+            return
+        strategy = getattr(self.crawler.crawler, "crawler_strategy", None)
+        if strategy is not None and hasattr(strategy, "kill_session"):
+            await strategy.kill_session(session_id)
+
+    async def close(self):
+        # The crawler is owned (and closed) by the caller
+        pass
+
+class HttpFetcher:
+    # Plain async HTTP client: keep-alive connection pool, HTTP/2 when the server and
+    # the h2 package support it, gzip/brotli decoding (brotli needs the brotli package)
+    name = "http"
+
+    def __init__(self, max_connections=None, http2=None, timeout=None, headers=None):
+        max_connections = max_connections or config.HTTP_MAX_CONNECTIONS
+        if http2 is None:
+            http2 = config.HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("h2 package not installed, falling back to HTTP/1.1")
+                http2 = False
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            headers=headers or config.HEADERS,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout or config.HTTP_TIMEOUT,
+            follow_redirects=True,
+        )
+        self.requests = 0
+
+    async def fetch(self, url, session_id=None, method="GET", headers=None, data=None):
+        self.requests += 1
+        response = await self.client.request(method, url, headers=headers, content=data)
+        return FetchResult(response.text, response.status_code, dict(response.headers))
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+def create_listing_fetcher(crawler, backend=None):
+    # Returns the fetcher used for listing pages (config.LISTING_FETCHER);
+    # crawler is the shared LazyCrawler
+    backend = backend or config.LISTING_FETCHER
+    if backend == "http":
+        return HttpFetcher()
+    if backend == "crawl4ai":
+        return Crawl4aiFetcher(crawler, use_playwright=False)
+    raise ValueError(f"Unknown listing fetcher: {backend} (expected 'http' or 'crawl4ai')")
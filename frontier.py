@@ -0,0 +1,444 @@
+# Crawl frontier: a local SQLite database with every discovered listing URL and its
+# crawl state, plus the search pages that are already saved. Replaces the directory
+# scans at startup (lookups are indexed queries, whatever the corpus size), the
+# failed_urls.txt log and the crawl_state.json of pending listings.
+#
+# Listing states:
+#   queued     discovered, not fetched yet (also: pending after an access block)
+#   in_flight  being fetched; reset to queued when the frontier is opened, so a
+#              crashed or killed run resumes exactly where it stopped
+#   done       saved to disk (also after a failed refresh: the saved page is still
+#              valid, the error is kept)
+#   retry      last fetch failed with a transient error; fetched again once
+#              next_attempt has passed (see main.RetryLane)
+#   failed     gave up: attempts exhausted or a permanent error (re-queued when the
+#              listing is discovered again, or with main.py --retry-failed)
+#
+# Freshness: a done listing expires listing_ttl() seconds after its last fetch and is
+# queued again when it is discovered again; a saved search page is reused for
+# SEARCH_PAGE_TTL seconds after it was fetched. main.py --refresh re-checks saved
+# listings in the order scheduler.py ranks them (last_seen, checks and changes).
+#
+# Response validators (main.ValidatorStore): a listing's ETag, Last-Modified and
+# content hash are kept in its row, a search page file's in page_validators.
+#
+# Usage: python frontier.py   -> prints per-folder counts and the failed URLs
+import os
+import sqlite3
+import sys
+import time
+import config
+
+QUEUED = "queued"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+RETRY = "retry"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id TEXT PRIMARY KEY,
+    url TEXT,
+    target TEXT,
+    output_dir TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    discovered_at REAL,
+    last_fetch REAL,
+    content_hash TEXT,
+    error TEXT,
+    next_attempt REAL,
+    last_seen REAL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_dir_state ON listings (output_dir, state);
+CREATE TABLE IF NOT EXISTS search_pages (
+    pages_dir TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    fetched_at REAL,
+    PRIMARY KEY (pages_dir, page)
+);
+CREATE TABLE IF NOT EXISTS page_validators (
+    pages_dir TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    url TEXT,
+    fetched_at REAL,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    PRIMARY KEY (pages_dir, filename)
+);
+CREATE TABLE IF NOT EXISTS imported_dirs (
+    path TEXT PRIMARY KEY,
+    imported_at REAL
+);
+CREATE TABLE IF NOT EXISTS refresh_budget (
+    day TEXT PRIMARY KEY,
+    used INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Columns added after the first release: (name, definition) for ALTER TABLE
+ADDED_COLUMNS = [
+    ("next_attempt", "REAL"),
+    ("last_seen", "REAL"),
+    ("checks", "INTEGER NOT NULL DEFAULT 0"),
+    ("changes", "INTEGER NOT NULL DEFAULT 0"),
+    ("etag", "TEXT"),
+    ("last_modified", "TEXT"),
+]
+
+# Response validators as main.ValidatorStore hands them out
+VALIDATOR_FIELDS = ("url", "etag", "last_modified", "content_hash", "fetched_at")
+
+def listing_ttl(discovered_at, last_fetch):
+    # Seconds a saved listing stays fresh after its last fetch (None = forever):
+    # LISTING_TTL, growing with the listing's age at that fetch (time since it was
+    # first discovered) by LISTING_TTL_AGE_FACTOR, up to LISTING_TTL_MAX
+    if config.LISTING_TTL is None:
+        return None
+    ttl = config.LISTING_TTL
+    if discovered_at is not None and last_fetch is not None:
+        ttl = max(ttl, (last_fetch - discovered_at) * config.LISTING_TTL_AGE_FACTOR)
+    if config.LISTING_TTL_MAX is not None:
+        ttl = min(ttl, max(config.LISTING_TTL_MAX, config.LISTING_TTL))
+    return ttl
+
+def is_listing_expired(discovered_at, last_fetch, now=None):
+    # Listings imported from saved files have no fetch time; their import counts
+    last_fetch = last_fetch or discovered_at
+    ttl = listing_ttl(discovered_at, last_fetch)
+    if ttl is None or last_fetch is None:
+        return False
+    return (time.time() if now is None else now) - last_fetch >= ttl
+
+class Frontier:
+    # One connection, used from a single event loop thread; every state change is
+    # committed right away so an interrupted run loses nothing
+    def __init__(self, path=None, resume=True):
+        self.path = path or config.FRONTIER_DB
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(listings)")}
+        for name, definition in ADDED_COLUMNS:
+            if name not in columns:
+                # Databases created by an older version
+                self.conn.execute(f"ALTER TABLE listings ADD COLUMN {name} {definition}")
+        self.conn.commit()
+        if not resume:
+            return
+        resumed = self.conn.execute(
+            "UPDATE listings SET state = ? WHERE state = ?", (QUEUED, IN_FLIGHT)
+        ).rowcount
+        self.conn.commit()
+        if resumed:
+            print(f"Resuming {resumed} listings that were in flight when the last run stopped")
+
+    def __contains__(self, listing_id):
+        # True if the listing was ever discovered (any folder, any state)
+        row = self.conn.execute("SELECT 1 FROM listings WHERE listing_id = ?", (listing_id,)).fetchone()
+        return row is not None
+
+    def get_state(self, listing_id):
+        row = self.conn.execute("SELECT state FROM listings WHERE listing_id = ?", (listing_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_discovered(self, listings, output_dir, target=None, queued=None, expired=None):
+        # Records discovered (listing_id, url) pairs for a folder and returns the
+        # counts {"new", "existing", "duplicates", "requeued"}: existing = already saved
+        # in this folder, duplicates = known under another folder (another target).
+        # Failed listings are queued again, and so are saved ones whose TTL has run out
+        # ("expired", see listing_ttl). The URLs queued by this call are appended to
+        # the queued list, if one is passed; the expired ones also to expired.
+        counts = {"new": 0, "existing": 0, "duplicates": 0, "requeued": 0, "expired": 0}
+        now = time.time()
+        for listing_id, url in listings:
+            row = self.conn.execute(
+                "SELECT output_dir, state, discovered_at, last_fetch FROM listings WHERE listing_id = ?", (listing_id,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO listings (listing_id, url, target, output_dir, state, discovered_at, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (listing_id, url, target, output_dir, QUEUED, now, now),
+                )
+                counts["new"] += 1
+                if queued is not None:
+                    queued.append(url)
+                continue
+            # Still listed on the site (see scheduler.py)
+            self.conn.execute("UPDATE listings SET last_seen = ? WHERE listing_id = ?", (now, listing_id))
+            if row[0] != output_dir:
+                counts["duplicates"] += 1
+            elif row[1] == FAILED:
+                self.conn.execute(
+                    "UPDATE listings SET state = ?, url = ? WHERE listing_id = ?", (QUEUED, url, listing_id)
+                )
+                counts["requeued"] += 1
+                if queued is not None:
+                    queued.append(url)
+            elif row[1] == DONE and is_listing_expired(row[2], row[3], now):
+                self.conn.execute(
+                    "UPDATE listings SET state = ?, url = ?, attempts = 0 WHERE listing_id = ?", (QUEUED, url, listing_id)
+                )
+                counts["expired"] += 1
+                if queued is not None:
+                    queued.append(url)
+                if expired is not None:
+                    expired.append(url)
+            elif row[1] == DONE:
+                counts["existing"] += 1
+        self.conn.commit()
+        return counts
+
+    def add_done(self, listings, output_dir, target=None):
+        # Records listings that are already saved (import of an existing folder)
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO listings (listing_id, url, target, output_dir, state, discovered_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(listing_id, url, target, output_dir, DONE, now) for listing_id, url in listings],
+        )
+        self.conn.commit()
+
+    def queued_urls(self, output_dir):
+        # URLs waiting to be fetched for a folder, in discovery order
+        rows = self.conn.execute(
+            "SELECT url FROM listings WHERE output_dir = ? AND state = ? AND url IS NOT NULL ORDER BY discovered_at, listing_id",
+            (output_dir, QUEUED),
+        )
+        return [row[0] for row in rows]
+
+    def done_listings(self, output_dir):
+        # (listing_id, url) of every saved listing in a folder; url may be None for
+        # listings imported from files without a known URL
+        rows = self.conn.execute(
+            "SELECT listing_id, url FROM listings WHERE output_dir = ? AND state = ? ORDER BY listing_id",
+            (output_dir, DONE),
+        )
+        return rows.fetchall()
+
+    def refresh_candidates(self, output_dir):
+        # The saved listings of a folder with what the refresh scheduler ranks them by:
+        # (listing_id, url, discovered_at, last_fetch, last_seen, checks, changes)
+        rows = self.conn.execute(
+            "SELECT listing_id, url, discovered_at, COALESCE(last_fetch, discovered_at), last_seen, checks, changes "
+            "FROM listings WHERE output_dir = ? AND state = ? ORDER BY listing_id",
+            (output_dir, DONE),
+        )
+        return rows.fetchall()
+
+    def record_check(self, listing_id, changed):
+        # Outcome of a re-fetch of a saved listing: the observed change frequency
+        self.conn.execute(
+            "UPDATE listings SET checks = checks + 1, changes = changes + ? WHERE listing_id = ?",
+            (1 if changed else 0, listing_id),
+        )
+        self.conn.commit()
+
+    def budget_used(self, day):
+        # Refresh requests spent on a day (YYYY-MM-DD)
+        row = self.conn.execute("SELECT used FROM refresh_budget WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def spend_budget(self, day, requests):
+        self.conn.execute(
+            "INSERT INTO refresh_budget (day, used) VALUES (?, ?) ON CONFLICT(day) DO UPDATE SET used = used + excluded.used",
+            (day, requests),
+        )
+        self.conn.commit()
+
+    def count(self, output_dir, state):
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM listings WHERE output_dir = ? AND state = ?", (output_dir, state)
+        ).fetchone()
+        return row[0]
+
+    def mark_in_flight(self, listing_id):
+        self.conn.execute(
+            "UPDATE listings SET state = ?, attempts = attempts + 1, last_fetch = ? WHERE listing_id = ?",
+            (IN_FLIGHT, time.time(), listing_id),
+        )
+        self.conn.commit()
+
+    def get_attempts(self, listing_id):
+        row = self.conn.execute("SELECT attempts FROM listings WHERE listing_id = ?", (listing_id,)).fetchone()
+        return row[0] if row else 0
+
+    def mark_done(self, listing_id):
+        # attempts counts the failures of one fetch cycle (up to MAX_ATTEMPTS), so a
+        # success resets it for the listing's next refresh
+        self.conn.execute(
+            "UPDATE listings SET state = ?, attempts = 0, error = NULL, next_attempt = NULL WHERE listing_id = ?",
+            (DONE, listing_id),
+        )
+        self.conn.commit()
+
+    def mark_failed(self, listing_id, error=None):
+        self.conn.execute(
+            "UPDATE listings SET state = ?, error = ?, next_attempt = NULL WHERE listing_id = ?", (FAILED, error, listing_id)
+        )
+        self.conn.commit()
+
+    def mark_retry(self, listing_id, error, next_attempt):
+        # Failed with a transient error: fetch again after next_attempt (epoch seconds)
+        self.conn.execute(
+            "UPDATE listings SET state = ?, error = ?, next_attempt = ? WHERE listing_id = ?",
+            (RETRY, error, next_attempt, listing_id),
+        )
+        self.conn.commit()
+
+    def mark_refresh_error(self, listing_id, error, next_attempt=None):
+        # A re-fetch of a saved listing failed. Its saved page is still valid, so it
+        # stays done (and in the refresh pool, see refresh_candidates) with the error
+        # and, while this run still retries it, next_attempt. Without next_attempt
+        # the run gave up on it: attempts starts over for the next refresh.
+        self.conn.execute(
+            "UPDATE listings SET state = ?, error = COALESCE(?, error), next_attempt = ?, "
+            "attempts = CASE WHEN ? IS NULL THEN 0 ELSE attempts END WHERE listing_id = ?",
+            (DONE, error, next_attempt, next_attempt, listing_id),
+        )
+        self.conn.commit()
+
+    def retry_listings(self, output_dir):
+        # (url, next_attempt) of the listings of a folder waiting for a retry
+        rows = self.conn.execute(
+            "SELECT url, next_attempt FROM listings WHERE output_dir = ? AND state = ? AND url IS NOT NULL ORDER BY next_attempt",
+            (output_dir, RETRY),
+        )
+        return rows.fetchall()
+
+    def requeue_failed(self, output_dir):
+        # --retry-failed: failed and retry-waiting listings of a folder go back to the
+        # queue with a fresh attempt budget. Returns their number.
+        count = self.conn.execute(
+            "UPDATE listings SET state = ?, attempts = 0, next_attempt = NULL WHERE output_dir = ? AND state IN (?, ?) AND url IS NOT NULL",
+            (QUEUED, output_dir, FAILED, RETRY),
+        ).rowcount
+        self.conn.commit()
+        return count
+
+    def mark_queued(self, listing_id):
+        # Back to the queue without counting the attempt (e.g. stopped by an access block)
+        self.conn.execute(
+            "UPDATE listings SET state = ?, attempts = MAX(attempts - 1, 0) WHERE listing_id = ?",
+            (QUEUED, listing_id),
+        )
+        self.conn.commit()
+
+    def failed_listings(self, output_dir=None):
+        # (url, attempts, error) of failed listings and those waiting for a retry
+        query = "SELECT url, attempts, error FROM listings WHERE state IN (?, ?)"
+        params = [FAILED, RETRY]
+        if output_dir is not None:
+            query += " AND output_dir = ?"
+            params.append(output_dir)
+        return self.conn.execute(query + " ORDER BY last_fetch", params).fetchall()
+
+    def get_validators(self, listing_id):
+        # Validators of a listing's last fetch (see VALIDATOR_FIELDS; fetched_at is
+        # last_fetch), {} if none were ever stored
+        row = self.conn.execute(
+            "SELECT url, etag, last_modified, content_hash, last_fetch FROM listings WHERE listing_id = ?", (listing_id,)
+        ).fetchone()
+        if row is None or not any(row[1:4]):
+            return {}
+        return dict(zip(VALIDATOR_FIELDS, row))
+
+    def record_validators(self, listing_id, url, etag, last_modified, content_hash):
+        # Not committed here: goes out with the listing's next state change
+        # (mark_done right after the fetch) or commit()
+        self.conn.execute(
+            "UPDATE listings SET url = COALESCE(url, ?), etag = ?, last_modified = ?, content_hash = ? WHERE listing_id = ?",
+            (url, etag, last_modified, content_hash, listing_id),
+        )
+
+    def get_page_validators(self, pages_dir, filename):
+        # Validators of a saved search page file, {} if none
+        row = self.conn.execute(
+            "SELECT url, etag, last_modified, content_hash, fetched_at FROM page_validators WHERE pages_dir = ? AND filename = ?",
+            (pages_dir, filename),
+        ).fetchone()
+        return dict(zip(VALIDATOR_FIELDS, row)) if row else {}
+
+    def record_page_validators(self, pages_dir, filename, url, fetched_at, validators=None):
+        # validators: (etag, last_modified, content_hash), None for a 304 (only the
+        # fetch time changes). Not committed here, like record_validators.
+        if validators is None:
+            self.conn.execute(
+                "INSERT INTO page_validators (pages_dir, filename, url, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(pages_dir, filename) DO UPDATE SET url = excluded.url, fetched_at = excluded.fetched_at",
+                (pages_dir, filename, url, fetched_at),
+            )
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO page_validators (pages_dir, filename, url, fetched_at, etag, last_modified, content_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (pages_dir, filename, url, fetched_at) + tuple(validators),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def get_search_pages(self, pages_dir):
+        # Page numbers of the search pages saved in a folder
+        rows = self.conn.execute("SELECT page FROM search_pages WHERE pages_dir = ?", (pages_dir,))
+        return {row[0] for row in rows}
+
+    def fresh_search_pages(self, pages_dir, ttl=None, now=None):
+        # Page numbers of the search pages of a folder fetched less than ttl seconds
+        # ago (ttl None: every saved page)
+        if ttl is None:
+            return self.get_search_pages(pages_dir)
+        now = time.time() if now is None else now
+        rows = self.conn.execute(
+            "SELECT page FROM search_pages WHERE pages_dir = ? AND fetched_at > ?", (pages_dir, now - ttl)
+        )
+        return {row[0] for row in rows}
+
+    def record_search_pages(self, pages_dir, page_nums):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO search_pages (pages_dir, page, fetched_at) VALUES (?, ?, ?)",
+            [(pages_dir, page_num, now) for page_num in page_nums],
+        )
+        self.conn.commit()
+
+    def is_imported(self, path):
+        row = self.conn.execute("SELECT 1 FROM imported_dirs WHERE path = ?", (path,)).fetchone()
+        return row is not None
+
+    def mark_imported(self, path):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO imported_dirs (path, imported_at) VALUES (?, ?)", (path, time.time())
+        )
+        self.conn.commit()
+
+    def summary(self):
+        # {output_dir: {state: count}}
+        result = {}
+        rows = self.conn.execute("SELECT output_dir, state, COUNT(*) FROM listings GROUP BY output_dir, state")
+        for output_dir, state, count in rows:
+            result.setdefault(output_dir, {})[state] = count
+        return result
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else config.FRONTIER_DB
+    if not os.path.exists(path):
+        print(f"{path} bulunamadı")
+        sys.exit(1)
+    frontier = Frontier(path, resume=False)
+    for output_dir, states in sorted(frontier.summary().items()):
+        print(f"{output_dir}: " + ", ".join(f"{state}={count}" for state, count in sorted(states.items())))
+    failed = frontier.failed_listings()
+    if failed:
+        print(f"\nFailed listings ({len(failed)}):")
+        for url, attempts, error in failed:
+            print(f"  {url} (attempts: {attempts}) {error or ''}")
+    frontier.close()
@@ -2,56 +2,136 @@ import asyncio
 import os
 import re
 from urllib.parse import urljoin, urlparse
-from crawl4ai import AsyncWebCrawler
-from bs4 import BeautifulSoup
+from fetchers import Crawl4aiFetcher, FetchResult, HttpFetcher, LazyCrawler, create_listing_fetcher
+from frontier import Frontier
+import storage
 import sys
-import time  # cooldown için
+import time
 import random
+import datetime
+import contextlib
+import hashlib
+import heapq
+import html as html_module
+import json
 import config
+import extract_data
+import scheduler
 
 # No API key needed for this version
 
-async def scrape_page(url, crawler, use_playwright=False):
-    # Fetches HTML content of a given URL, optionally using Playwright
-    print(f"  Fetching: {url} {'(using Playwright)' if use_playwright else ''}")
+async def fetch_page(url, fetcher, session_id=None, headers=None):
+    # Fetches a URL with the given fetcher (see fetchers.py) and returns a FetchResult;
+    # result.html is None on failure or when a conditional request got 304 Not Modified
+    print(f"  Fetching: {url} {'(using Playwright)' if getattr(fetcher, 'use_playwright', False) else ''}")
     try:
-        result = await crawler.arun(url=url, use_playwright=use_playwright) 
+        result = await fetcher.fetch(url, session_id=session_id, headers=headers)
         # Check if html content exists and is not empty
-        if result and result.html:
+        if result.status_code == 304:
+            print(f"  Not modified: {url}")
+            result.html = None
+        elif result.html:
             print(f"  Success fetching: {url}")
-            return result.html
         else:
             print(f"  Failed fetching or empty content: {url}")
-            return None
+            result.html = None
+        return result
     except Exception as e:
         print(f"  Error during fetch for {url}: {e}")
-        return None
+        return FetchResult(None)
+
+async def scrape_page(url, fetcher, session_id=None):
+    # Fetches HTML content of a given URL, returns None on failure
+    result = await fetch_page(url, fetcher, session_id=session_id)
+    return result.html
+
+# Single-pass search page scanner: one regex walk over the page picks up the anchor
+# tags (listing links, the "Son" pagination link) and every page/count signal that
+# extract_total_counts needs, instead of a full BeautifulSoup tree plus one regex
+# scan per signal. benchmarks/search_page_scan.py compares it with the old path.
+SEARCH_PAGE_TOKENS = re.compile(
+    r'<[aA]\b(?P<a>[^>]*)>'
+    r'|<option\b[^>]*value="[^"]*[?&]page=(?P<option_page>\d+)[^"]*"[^>]*>(?P<option_text>\d+)</option>'
+    r'|<span id="page_number">(?P<page_number>\d+)</span>'
+    r'|(?P<count>[\d\.]+)\s*Sonuç Bulundu'
+    r'|(?P<item>class="ilanitem(?:cardorange|basic)")'
+)
+HREF_ATTRIBUTE = re.compile(r'\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))', re.IGNORECASE)
+PAGE_LINK = re.compile(r'[?&]page=(\d+)')
+_listing_patterns = {}
+
+def get_listing_regex():
+    # config.get_listing_pattern(), compiled once
+    pattern = config.get_listing_pattern()
+    compiled = _listing_patterns.get(pattern)
+    if compiled is None:
+        compiled = _listing_patterns[pattern] = re.compile(pattern)
+    return compiled
+
+class SearchPageScan:
+    # What scan_search_page found on a rendered search page: the listing links and
+    # the raw page/count signals (first match of each, like re.search, except
+    # option_pages: every pagination option)
+    def __init__(self):
+        self.links = set()
+        self.anchor_count = 0  # listing anchors, duplicates included
+        self.page_number = None
+        self.total_listings_text = None
+        self.option_pages = []
+        self.last_page_link = None
+        self.item_count = 0
+
+def scan_search_page(html, base_url):
+    scan = SearchPageScan()
+    listing_regex = get_listing_regex()
+    site_netloc = urlparse(config.BASE_DOMAIN).netloc
+    for match in SEARCH_PAGE_TOKENS.finditer(html):
+        attributes = match.group('a')
+        if attributes is not None:
+            if 'class="ilanitem' in attributes and ('class="ilanitemcardorange"' in attributes or 'class="ilanitembasic"' in attributes):
+                scan.item_count += 1
+            href_match = HREF_ATTRIBUTE.search(attributes)
+            if href_match is None:
+                continue
+            href = next(value for value in href_match.groups() if value is not None)
+            if '&' in href:
+                href = html_module.unescape(href)
+            if listing_regex.search(href):
+                scan.anchor_count += 1
+                absolute_url = urljoin(base_url, href.strip())
+                # Final check for validity
+                parsed_url = urlparse(absolute_url)
+                if parsed_url.scheme in ['http', 'https'] and parsed_url.netloc == site_netloc:
+                    scan.links.add(absolute_url)
+            elif scan.last_page_link is None and 'page=' in href:
+                # "Son" (last page) button: a page link whose text says Son
+                page_match = PAGE_LINK.search(href)
+                end = html.find('</a>', match.end())
+                if page_match and end != -1 and 'Son' in html[match.end():end]:
+                    scan.last_page_link = int(page_match.group(1))
+        elif match.group('option_page') is not None:
+            scan.option_pages.append(int(match.group('option_page')))
+        elif match.group('page_number') is not None:
+            if scan.page_number is None:
+                scan.page_number = int(match.group('page_number'))
+        elif match.group('count') is not None:
+            if scan.total_listings_text is None:
+                scan.total_listings_text = match.group('count')
+        else:
+            scan.item_count += 1
+    return scan
 
-async def extract_listing_links(html, base_url):
-    # Extracts links that match the property listing pattern
+async def extract_listing_links(html, base_url, scan=None):
+    # Extracts links that match the property listing pattern (see scan_search_page;
+    # pass a scan of the page to reuse it)
     if not html:
         print("No HTML content to extract links from.")
         return set()
-        
-    soup = BeautifulSoup(html, 'html.parser')
-    links = set()
-    
-    # Regex for property listing pattern based on config
-    listing_pattern = re.compile(config.get_listing_pattern())
-    
-    anchor_tags = soup.find_all('a', href=listing_pattern)
-    print(f"Found {len(anchor_tags)} potential listing anchor tags using pattern.")
-    
-    for tag in anchor_tags:
-        href = tag['href'].strip()
-        absolute_url = urljoin(base_url, href) 
-        # Final check for validity
-        parsed_url = urlparse(absolute_url)
-        if parsed_url.scheme in ['http', 'https'] and parsed_url.netloc == 'www.101evler.com':
-            links.add(absolute_url)
-            
-    print(f"Extracted {len(links)} unique listing links.")
-    return links
+    
+    scan = scan or scan_search_page(html, base_url)
+    print(f"Found {scan.anchor_count} potential listing anchor tags using pattern.")
+    print(f"Extracted {len(scan.links)} unique listing links.")
+    return scan.links
 
 def get_listing_id_from_url(url):
     # Extract listing ID from URL
@@ -67,8 +147,15 @@ def get_existing_listing_ids(output_dir):
         return set()
     
     existing_ids = set()
-    for filename in os.listdir(output_dir):
+    truncated = 0
+    store = storage.open_store(output_dir)
+    for filename in storage.list_html(output_dir):
         if filename.endswith('.html'):
+            # Files cut short by an interrupted write (older versions wrote in place)
+            # are not counted, so the listing is fetched again
+            if not store.is_complete(filename):
+                truncated += 1
+                continue
             # Extract ID from filename (e.g., 123456.html -> 123456)
             try:
                 listing_id = filename.split('.')[0]
@@ -78,6 +165,8 @@ def get_existing_listing_ids(output_dir):
                 pass
     
     print(f"Found {len(existing_ids)} existing listing files in '{output_dir}'")
+    if truncated:
+        print(f"Ignoring {truncated} truncated listing files in '{output_dir}', they will be fetched again")
     return existing_ids
 
 def get_existing_search_pages(pages_dir):
@@ -87,7 +176,7 @@ def get_existing_search_pages(pages_dir):
         return set()
     
     existing_pages = set()
-    for filename in os.listdir(pages_dir):
+    for filename in storage.list_html(pages_dir):
         if filename.startswith('search_page_') and filename.endswith('.html'):
             try:
                 # Extract page number from filename (e.g., search_page_1_playwright.html -> 1)
@@ -99,33 +188,144 @@ def get_existing_search_pages(pages_dir):
     print(f"Found {len(existing_pages)} existing search pages in '{pages_dir}'")
     return existing_pages
 
+def get_listing_filename(url):
+    # Extract a filename from the URL, e.g., the listing ID
+    match = re.search(r'-(\d+)\.html$', url)
+    if match:
+        return f"{match.group(1)}.html"
+    # Fallback filename if pattern doesn't match
+    filename = os.path.basename(urlparse(url).path).replace('.html', '') + ".html"
+    if not filename or filename == ".html": # Added check for empty filename
+        filename = f"listing_{hash(url)}.html" # Use hash as last resort
+    return filename
+
+def get_saved_listing_url(output_dir, filename):
+    # Reads the canonical listing URL (og:url) back from a saved listing page
+    try:
+        html = storage.read_html(output_dir, filename) or ""
+    except Exception as e:
+        print(f"  Error reading {filename} from '{output_dir}': {e}")
+        return None
+    match = re.search(r'<meta[^>]+property="og:url"[^>]+content="([^"]+)"', html)
+    return match.group(1) if match else None
+
+class ValidatorStore:
+    # Response validators of saved pages (ETag, Last-Modified and content hash), keyed
+    # by file name. Used to send conditional requests and to skip rewriting unchanged
+    # content. They are kept in the frontier: a listing's in its row there (next to
+    # its url, last_fetch and content_hash), a search page's in page_validators
+    # (search_pages=True). record() is a single-row update that goes out with the
+    # frontier's next commit, so it adds no file write of its own to the event loop.
+    # validators.json files of earlier versions are imported once.
+    LEGACY_FILENAME = "validators.json"
+
+    def __init__(self, frontier, directory, search_pages=False):
+        self.frontier = frontier
+        self.directory = directory
+        self.search_pages = search_pages
+        self.import_legacy()
+
+    @classmethod
+    def load_legacy(cls, directory):
+        # {file name: entry} of a validators.json of earlier versions ({} if none)
+        path = os.path.join(directory, cls.LEGACY_FILENAME)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading validators from {path}: {e}")
+            return {}
+
+    def import_legacy(self):
+        path = os.path.join(self.directory, self.LEGACY_FILENAME)
+        if not os.path.exists(path) or self.frontier.is_imported(path):
+            return
+        entries = self.load_legacy(self.directory)
+        for key, entry in entries.items():
+            validators = (entry.get("etag"), entry.get("last_modified"), entry.get("content_hash"))
+            if self.search_pages:
+                try:
+                    fetched_at = datetime.datetime.fromisoformat(entry["fetched_at"]).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    fetched_at = None
+                self.frontier.record_page_validators(self.directory, key, entry.get("url"), fetched_at, validators)
+            else:
+                self.frontier.record_validators(self.listing_id(key), entry.get("url"), *validators)
+        self.frontier.mark_imported(path)
+        if entries:
+            print(f"Imported {len(entries)} validators from {path} into the frontier")
+
+    @staticmethod
+    def listing_id(key):
+        return key[:-len(".html")] if key.endswith(".html") else key
+
+    @staticmethod
+    def content_hash(html):
+        return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        # {"url", "etag", "last_modified", "content_hash", "fetched_at"} ({} if none)
+        if self.search_pages:
+            return self.frontier.get_page_validators(self.directory, key)
+        return self.frontier.get_validators(self.listing_id(key))
+
+    def conditional_headers(self, key):
+        entry = self.get(key)
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(self, key, html):
+        entry = self.get(key)
+        return bool(html) and entry.get("content_hash") == self.content_hash(html)
+
+    def record(self, key, url, result):
+        # Stores validators from a FetchResult; a 304 only refreshes the fetch time
+        # (a listing's last_fetch is set when it goes in flight)
+        validators = None
+        if result.status_code != 304:
+            headers = {name.lower(): value for name, value in (result.headers or {}).items()}
+            validators = (
+                headers.get("etag"), headers.get("last-modified"),
+                self.content_hash(result.html) if result.html else None,
+            )
+        if self.search_pages:
+            self.frontier.record_page_validators(self.directory, key, url, time.time(), validators)
+        elif validators is not None:
+            self.frontier.record_validators(self.listing_id(key), url, *validators)
+
+    def save(self):
+        # Commits what was recorded since the frontier's last state change
+        self.frontier.commit()
+
 async def save_html_to_file(html_content, url, output_dir):
-    # Saves HTML content to a file named after the listing ID
+    # Saves HTML content to a file named after the listing ID. The write runs on the
+    # storage writer's threads (see storage.PageWriter) and is atomic: the page is
+    # either saved whole or not at all. Returns True once it is saved.
     if not html_content:
         print(f"  Skipping save for {url} due to empty content.")
-        return
+        return False
         
-    # Extract a filename from the URL, e.g., the listing ID
-    match = re.search(r'-(\d+)\.html$', url)
-    if match:
-        filename = f"{match.group(1)}.html"
-    else:
-        # Fallback filename if pattern doesn't match
-        filename = os.path.basename(urlparse(url).path).replace('.html', '') + ".html"
-        if not filename or filename == ".html": # Added check for empty filename
-            filename = f"listing_{hash(url)}.html" # Use hash as last resort
-            
+    filename = get_listing_filename(url)
     filepath = os.path.join(output_dir, filename)
     
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        print(f"  Saved HTML for {url} to {filepath}")
+        _, stored = await storage.write_html_async(output_dir, filename, html_content)
+        print(f"  Saved HTML for {url} to {filepath}{'' if stored else ' (content already stored)'}")
+        return True
     except Exception as e:
         print(f"  Error saving HTML for {url}: {e}")
+        return False
 
-async def save_search_page(html_content, page_num, pages_dir):
-    # Saves search page HTML content to a file in the pages directory
+async def save_search_page(html_content, page_num, pages_dir, validators=None, result=None, source="playwright", target=None):
+    # Saves search page HTML content to a file in the pages directory.
+    # With validators, the fetch result's validators are recorded and an unchanged
+    # page is not rewritten.
     if not html_content:
         print(f"  Skipping save for search page {page_num} due to empty content.")
         return
@@ -134,16 +334,440 @@ async def save_search_page(html_content, page_num, pages_dir):
     if not os.path.exists(pages_dir):
         os.makedirs(pages_dir)
         
-    filename = f"search_page_{page_num}_playwright.html"
+    filename = get_search_page_filename(page_num, source)
     filepath = os.path.join(pages_dir, filename)
     
+    if validators is not None and result is not None:
+        unchanged = validators.is_unchanged(filename, html_content) and storage.has_html(pages_dir, filename)
+        validators.record(filename, config.get_search_url_with_page(page_num, target), result)
+        if unchanged:
+            print(f"  Search page {page_num} unchanged, keeping {filepath}")
+            return
+    
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        await storage.write_html_async(pages_dir, filename, html_content)
         print(f"  Saved HTML for search page {page_num} to {filepath}")
     except Exception as e:
         print(f"  Error saving HTML for search page {page_num}: {e}")
 
+class RequestPacer:
+    # Global pacing limit: request starts are spaced at least min_interval seconds apart,
+    # no matter how many coroutines are waiting to fetch
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class TokenBucket:
+    # Token bucket pacer: allows `rate` requests per second on average with bursts
+    # of up to `capacity` requests. The rate can be changed while requests wait.
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate):
+        self._refill()
+        self.rate = rate
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AdaptiveController:
+    # AIMD rate and concurrency controller for listing fetches.
+    # Every healthy response window (one success per allowed slot) adds one slot and
+    # RATE_INCREASE_STEP req/s. Block pages, 429/5xx and failed fetches halve both;
+    # latency spikes (LATENCY_SPIKE_FACTOR x the healthy baseline) cut them by a quarter.
+    # Decreases within DECREASE_COOLDOWN seconds of each other count once, so a burst
+    # of in-flight requests reporting the same slowdown does not collapse the rate.
+    def __init__(self, rate, concurrency, adaptive=True):
+        self.adaptive = adaptive
+        self.bucket = TokenBucket(rate, capacity=config.RATE_BURST)
+        self.limit = concurrency
+        self.in_flight = 0
+        self.latency = None
+        self.baseline_latency = None
+        self.requests = 0
+        self.throttled = 0
+        self._healthy_streak = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        # Waits for a free concurrency slot and a rate token
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            await self.bucket.acquire()
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    async def record(self, latency, status_code=None, blocked=False, failed=False):
+        self.requests += 1
+        self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+        if not self.adaptive:
+            return
+
+        if blocked or status_code == 429 or (status_code is not None and status_code >= 500) or failed:
+            self.throttled += 1
+            reason = "block page" if blocked else (f"HTTP {status_code}" if status_code else "fetch error")
+            self._decrease(0.5, reason)
+        elif self.baseline_latency and latency > config.LATENCY_SPIKE_FACTOR * self.baseline_latency:
+            self._decrease(0.75, f"latency spike {latency:.1f}s")
+        else:
+            # Healthy response: track the baseline and grow additively
+            self.baseline_latency = latency if self.baseline_latency is None else 0.9 * self.baseline_latency + 0.1 * latency
+            self._healthy_streak += 1
+            if self._healthy_streak >= self.limit:
+                self._healthy_streak = 0
+                async with self._cond:
+                    self.limit = min(config.MAX_CONCURRENCY, self.limit + 1)
+                    self._cond.notify_all()
+                self.bucket.set_rate(min(config.MAX_REQUESTS_PER_SECOND, self.rate + config.RATE_INCREASE_STEP))
+
+    def _decrease(self, factor, reason):
+        self._healthy_streak = 0
+        now = time.monotonic()
+        if now - self._last_decrease < config.DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.limit = max(config.MIN_CONCURRENCY, int(self.limit * factor))
+        self.bucket.set_rate(max(config.MIN_REQUESTS_PER_SECOND, self.rate * factor))
+        print(f"🐢 Backing off ({reason}): {self.describe()}")
+
+    def describe(self):
+        latency = f"{self.latency:.2f}s" if self.latency is not None else "n/a"
+        return f"{self.rate:.2f} req/s, concurrency {self.limit}, latency {latency}"
+
+class SearchPagePool:
+    # Pool of reusable Playwright sessions (browser pages) inside one AsyncWebCrawler.
+    # Each fetch borrows a session, so at most `size` search pages render at once.
+    def __init__(self, fetcher, size, pacer):
+        self.fetcher = fetcher
+        self.pacer = pacer
+        self.session_ids = [f"search_page_session_{i}" for i in range(max(1, size))]
+        self._free = asyncio.Queue()
+        for session_id in self.session_ids:
+            self._free.put_nowait(session_id)
+
+    async def fetch(self, url):
+        session_id = await self._free.get()
+        try:
+            await self.pacer.wait()
+            return await fetch_page(url, self.fetcher, session_id=session_id)
+        finally:
+            self._free.put_nowait(session_id)
+
+    async def close(self):
+        # Release the browser pages held by the pool
+        for session_id in self.session_ids:
+            try:
+                await self.fetcher.kill_session(session_id)
+            except Exception as e:
+                print(f"  Error closing browser session {session_id}: {e}")
+
+class ApiSearchClient:
+    # Pages through search results with plain POST requests to config.API_URL
+    # (/ac/arama-sonucu), the XHR the site's own JavaScript makes, instead of rendering
+    # every search page in a browser. Requests share the search pages' RequestPacer.
+    # If the endpoint answers with something that holds no listings before it ever
+    # returned any (e.g. only a count), it is disabled for the rest of the run so
+    # the Playwright fallback does not pay for a useless request on every page.
+    # total_listings is the total count of the last response that had one (also of
+    # a rejected one), so the first page's request gives the totals as well.
+    # target is a config.Target (None = the CITY/PROPERTY_TYPE settings).
+    def __init__(self, fetcher, pacer, target=None):
+        self.fetcher = fetcher
+        self.pacer = pacer
+        self.target = target
+        self.enabled = True
+        self.verified = False
+        self.total_listings = None
+
+    async def fetch(self, page_num):
+        await self.pacer.wait()
+        headers = config.API_HEADERS.copy()
+        headers["Referer"] = config.get_search_url_with_page(page_num, self.target)
+        print(f"  Fetching: {config.API_URL} (API, page {page_num})")
+        try:
+            result = await self.fetcher.fetch(
+                config.API_URL, method="POST", headers=headers,
+                data=config.get_api_params(page=page_num, target=self.target)
+            )
+        except Exception as e:
+            print(f"  Error during API request for page {page_num}: {e}")
+            return FetchResult(None)
+        if result.status_code is not None and result.status_code >= 400:
+            print(f"  API returned HTTP {result.status_code} for page {page_num}")
+            result.html = None
+        return result
+
+    def accept(self, links, page_num):
+        # Decides whether parsed API links can be used for this page
+        if links is None or (not links and not self.verified):
+            if self.enabled:
+                print(f"API yanıtında ilan bulunamadı (sayfa {page_num}). Arama sayfaları için Playwright kullanılacak.")
+            self.enabled = False
+            return False
+        if links:
+            self.verified = True
+        return True
+
+def parse_api_search_response(text):
+    # Parses a search API response (JSON or an HTML fragment) with the listing pattern.
+    # Returns (links, count): links is None when the response holds no listing markup
+    # at all (e.g. a bare count), count is the total listing count if the response has one.
+    if not text or not text.strip():
+        return None, None
+    text = text.strip()
+    if text.isdigit():
+        return None, int(text)
+
+    count = None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        fragment = text
+    else:
+        strings = []
+        stack = [data]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                for key, item in value.items():
+                    if key in ("count", "total", "total_count") and isinstance(item, int):
+                        count = item
+                    stack.append(item)
+            elif isinstance(value, list):
+                stack.extend(value)
+            elif isinstance(value, str):
+                strings.append(value)
+        fragment = "\n".join(strings)
+        if not fragment:
+            return None, count
+
+    links = {urljoin(config.BASE_DOMAIN, match) for match in get_listing_regex().findall(fragment)}
+    return links, count
+
+def get_search_page_filename(page_num, source="playwright"):
+    # search_page_<n>_playwright.html for rendered pages, search_page_<n>_api.html
+    # for raw API responses
+    return f"search_page_{page_num}_{source}.html"
+
+def load_search_page(page_num, pages_dir, validators=None):
+    # Loads a previously saved search page; returns (html, source) or (None, None)
+    # if missing or empty. If the page was saved both rendered and from the API, the
+    # one fetched last (per validators) wins, so a re-fetched page is not shadowed
+    # by an older copy.
+    sources = ["playwright", "api"]
+    if validators is not None:
+        sources.sort(key=lambda source: validators.get(get_search_page_filename(page_num, source)).get("fetched_at") or 0, reverse=True)
+    for source in sources:
+        try:
+            html = storage.read_html(pages_dir, get_search_page_filename(page_num, source))
+        except Exception as e:
+            print(f"Error loading search page {page_num} from file: {e}")
+            continue
+        if html is None:
+            continue
+        if not html:
+            print(f"Empty file for search page {page_num}, will re-scrape")
+            continue
+        print(f"Loaded search page {page_num} from file")
+        return html, source
+    return None, None
+
+async def fetch_search_page(page_num, pool, api_client, breaker, pages_dir, validators=None, target=None):
+    # Fetches one search page and saves it: through the search API when available,
+    # falling back to rendering it with Playwright. Returns (html, source).
+    if api_client is not None and api_client.enabled:
+        result = await breaker.call(lambda: api_client.fetch(page_num))
+        links, count = parse_api_search_response(result.html)
+        if count is not None:
+            api_client.total_listings = count
+        if api_client.accept(links, page_num):
+            await save_search_page(result.html, page_num, pages_dir, validators, result, source="api", target=target)
+            return result.html, "api"
+        print(f"Falling back to Playwright for search page {page_num}")
+
+    search_page_url = config.get_search_url_with_page(page_num, target)
+    result = await breaker.call(lambda: pool.fetch(search_page_url))
+    if result.html:
+        await save_search_page(result.html, page_num, pages_dir, validators, result, target=target)
+    return result.html, "playwright"
+
+async def get_search_page_links(html, source, page_num, target=None, scan=None):
+    # Listing links of a saved or fetched search page (scan: see scan_search_page)
+    if source == "api":
+        links, _ = parse_api_search_response(html)
+        links = links or set()
+        print(f"Extracted {len(links)} unique listing links from API response.")
+        return links
+    base_for_relative = config.get_search_url_with_page(page_num, target).split('?')[0]
+    return await extract_listing_links(html, base_for_relative, scan)
+
+async def process_search_page(page_num, max_search_pages, pool, api_client, pages_dir, existing_search_pages, breaker, validators=None, target=None):
+    # Loads or fetches one search page and returns its listing links (None on failure)
+    print(f"\n--- Processing Search Page {page_num}/{max_search_pages} for links --- ")
+
+    html, source = None, None
+    if page_num in existing_search_pages:
+        print(f"Search page {page_num} already exists - loading from file")
+        html, source = load_search_page(page_num, pages_dir, validators)
+        if check_blocked_html(html):
+            print(f"Saved search page {page_num} is a block page, will re-scrape")
+            html = None
+    if html is None:
+        html, source = await fetch_search_page(page_num, pool, api_client, breaker, pages_dir, validators, target)
+
+    if not html:
+        print(f"Skipping search page {page_num} due to fetch error or empty content.")
+        return None
+
+    return await get_search_page_links(html, source, page_num, target)
+
+async def crawl_search_pages(pool, api_client, page_nums, max_search_pages, pages_dir, existing_search_pages, breaker, on_page, validators=None, known_ids=None, target=None):
+    # Crawls search pages with up to pool-size pages in flight at once and hands
+    # each page's links to on_page(page_num, links) (a coroutine function) in page
+    # order, as soon as the page and all pages before it are in. Saved pages are
+    # loaded from disk; new pages come from the search API when api_client is set,
+    # otherwise from the pool.
+    # Once a page comes back empty (end of results) no later pages are handed out,
+    # and results for pages after it are dropped, same as the sequential loop.
+    # With known_ids (incremental mode, newest-first sort) a page that only contains
+    # already known listings ends pagination the same way.
+    # If the breaker trips, the pages gathered so far are handed over.
+    concurrency = len(pool.session_ids)
+    order = list(page_nums)
+    pages = iter(order)
+    finished = {}  # page_num -> links (None if the page failed), until handed over
+    emitted = 0
+    emit_lock = asyncio.Lock()
+    last_page = None
+
+    async def emit(pages_in_order):
+        # Hands over finished pages; with pages_in_order only up to the first gap
+        nonlocal emitted
+        async with emit_lock:
+            while emitted < len(order):
+                page_num = order[emitted]
+                if page_num not in finished:
+                    if pages_in_order:
+                        return
+                    emitted += 1
+                    continue
+                emitted += 1
+                links_on_page = finished.pop(page_num)
+                if links_on_page is None or (last_page is not None and page_num > last_page):
+                    continue
+                await on_page(page_num, links_on_page)
+
+    async def worker():
+        nonlocal last_page
+        for page_num in pages:
+            if last_page is not None and page_num > last_page:
+                break
+            try:
+                links_on_page = await process_search_page(
+                    page_num, max_search_pages, pool, api_client, pages_dir, existing_search_pages, breaker, validators, target
+                )
+            except AccessBlockedError:
+                return
+            if links_on_page is not None and (last_page is None or page_num < last_page):
+                # Eğer hiç ilan yoksa, bu muhtemelen son sayfa
+                if not links_on_page:
+                    print(f"Sayfa {page_num} boş, muhtemelen son sayfa. Tarama durduruluyor.")
+                    last_page = page_num
+                elif known_ids is not None and all(get_listing_id_from_url(url) in known_ids for url in links_on_page):
+                    print(f"Sayfa {page_num} sadece bilinen ilanlar içeriyor. Tarama durduruluyor.")
+                    last_page = page_num
+            finished[page_num] = links_on_page
+            await emit(pages_in_order=True)
+
+    if concurrency > 1:
+        print(f"Crawling search pages with {concurrency} pages in parallel...")
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    # Pages after one that was never finished (blocked)
+    await emit(pages_in_order=False)
+
+def get_target_key(target=None):
+    # Identifies a search target (default: the current settings) in the watermark file
+    return (target or config.get_current_target()).key
+
+def load_watermark(watermark_file, target_key):
+    # Returns the stored watermark of a target ({} if none)
+    if not os.path.exists(watermark_file):
+        return {}
+    try:
+        with open(watermark_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get(target_key, {})
+    except Exception as e:
+        print(f"Error loading watermark from {watermark_file}: {e}")
+        return {}
+
+def save_watermark(watermark_file, target_key, total_listings, newest_ids):
+    # Stores the total listing count and the listing IDs on the first search page
+    watermarks = {}
+    if os.path.exists(watermark_file):
+        try:
+            with open(watermark_file, 'r', encoding='utf-8') as f:
+                watermarks = json.load(f)
+        except Exception as e:
+            print(f"Error loading watermark from {watermark_file}: {e}")
+    watermarks[target_key] = {
+        "total_listings": total_listings,
+        "newest_ids": newest_ids,
+        "updated_at": datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    temp_path = watermark_file + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, watermark_file)
+
+class KnownListings:
+    # Listings that count as already known in incremental mode: everything in the
+    # frontier plus the IDs stored in the watermark
+    def __init__(self, frontier, extra_ids=()):
+        self.frontier = frontier
+        self.extra_ids = set(extra_ids)
+
+    def __contains__(self, listing_id):
+        return listing_id in self.extra_ids or listing_id in self.frontier
+
+def get_sorted_listing_ids(links):
+    # Listing IDs of a set of links, sorted for a stable comparison between runs
+    return sorted(filter(None, (get_listing_id_from_url(url) for url in links)))
+
 def check_blocked_html(html):
     if not html:
         return False
@@ -153,31 +777,111 @@ def check_blocked_html(html):
             return True
     return False
 
-def handle_access_blocked():
-    """Erişim engellendiğinde yapılacak işlemler: 3 dakika bekle ve tekrar dene"""
-    cooldown_minutes = 3
-    print(f"!!! Erişim engellendi. {cooldown_minutes} dakika bekleniyor ve tekrar denenecek... !!!")
-    # 3 dakika bekle
-    time.sleep(cooldown_minutes * 60)
-    print(f"{cooldown_minutes} dakika bekleme süresi doldu. Tekrar deneniyor...")
-    return
-
-def extract_total_counts(html):
-    import re
+class AccessBlockedError(Exception):
+    # Raised when access is still blocked after the shared cooldown and probe
+    pass
+
+class FetchError(Exception):
+    # A listing fetch that returned no usable page (network error, empty body or an
+    # HTTP error status). 404/410 are permanent; everything else is worth a retry.
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def permanent(self):
+        return self.status_code in (404, 410)
+
+class CircuitBreaker:
+    # Shared, asyncio-aware circuit breaker for access blocks.
+    # The first task that gets a block page opens the circuit and runs the cooldown;
+    # every other task waits on the same cooldown instead of sleeping on its own,
+    # and nothing new is dispatched meanwhile. After the cooldown a single probe
+    # (the request that tripped the breaker) is retried: if it comes back clean the
+    # circuit closes and everyone resumes, otherwise the breaker stays tripped and
+    # all waiting tasks get AccessBlockedError so the caller can save its state.
+    def __init__(self, cooldown_seconds):
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self._closed = asyncio.Event()
+        self._closed.set()
+
+    @property
+    def tripped(self):
+        return self.state == "tripped"
+
+    async def wait_ready(self):
+        await self._closed.wait()
+        if self.tripped:
+            raise AccessBlockedError("Access is still blocked after the cooldown")
+
+    async def call(self, fetch):
+        # Runs fetch() (a coroutine function returning a FetchResult) through the breaker
+        while True:
+            await self.wait_ready()
+            result = await fetch()
+            if not check_blocked_html(result.html):
+                return result
+            if self.state == "closed":
+                return await self._cooldown_and_probe(fetch)
+            # Another task already opened the circuit: wait for its verdict
+
+    async def _cooldown_and_probe(self, fetch):
+        self.state = "open"
+        self._closed.clear()
+        cooldown_minutes = self.cooldown_seconds / 60
+        print(f"!!! Erişim engellendi. Tüm istekler durduruldu, {cooldown_minutes:g} dakika bekleniyor... !!!")
+        try:
+            await asyncio.sleep(self.cooldown_seconds)
+            print(f"{cooldown_minutes:g} dakika bekleme süresi doldu. Tek bir deneme isteği gönderiliyor...")
+            self.state = "half-open"
+            result = await fetch()
+            if check_blocked_html(result.html):
+                print("!!! Erişim hala engelli. Kalan işler kaydedilip tarama durduruluyor. !!!")
+                raise AccessBlockedError("Access is still blocked after the cooldown")
+            print("Erişim tekrar açıldı, taramaya devam ediliyor.")
+            self.state = "closed"
+        finally:
+            # Cancelled during the cooldown or the probe failed: without a verdict the
+            # breaker counts as tripped, so the waiting tasks stop instead of hanging
+            if self.state != "closed":
+                self.state = "tripped"
+            self._closed.set()
+        return result
+
+def import_existing_files(frontier, output_dir, pages_dir, target_name=None):
+    # One-time import of folders saved before the frontier existed (or by another
+    # copy of the scraper): saved listings become "done", saved search pages are
+    # recorded. Later runs skip the directory scan entirely.
+    if not frontier.is_imported(output_dir):
+        legacy_validators = ValidatorStore.load_legacy(output_dir)
+        listings = []
+        for listing_id in sorted(get_existing_listing_ids(output_dir)):
+            listings.append((listing_id, legacy_validators.get(f"{listing_id}.html", {}).get("url")))
+        frontier.add_done(listings, output_dir, target_name)
+        frontier.mark_imported(output_dir)
+        if listings:
+            print(f"Imported {len(listings)} saved listings from '{output_dir}' into the frontier")
+    if not frontier.is_imported(pages_dir):
+        frontier.record_search_pages(pages_dir, get_existing_search_pages(pages_dir))
+        frontier.mark_imported(pages_dir)
+
+def extract_total_counts(html, scan=None):
+    # Total listings and pages from a rendered search page; the signals come from
+    # scan_search_page (pass a scan of the page to reuse it)
+    scan = scan or scan_search_page(html, config.BASE_DOMAIN)
     total_listings = None
     total_pages = None
     
     # 1. Sayfa numarasını HTML'den direkt tespit etmeye çalış
-    match = re.search(r'<span id="page_number">(\d+)</span>', html)
-    if match and match.group(1) != "1":  # Eğer "1" değilse JavaScript tarafından güncellenmiş demektir
-        total_pages = int(match.group(1))
+    if scan.page_number is not None and scan.page_number != 1:  # Eğer "1" değilse JavaScript tarafından güncellenmiş demektir
+        total_pages = scan.page_number
         print(f"HTML'den toplam sayfa sayısı: {total_pages}")
     
     # 2. Toplam ilan sayısını bul (count_label)
-    match = re.search(r'([\d\.]+)\s*Sonuç Bulundu', html)
-    if match:
+    if scan.total_listings_text is not None:
         try:
-            total_listings = int(match.group(1).replace('.', ''))
+            total_listings = int(scan.total_listings_text.replace('.', ''))
             print(f"HTML'den toplam ilan sayısı: {total_listings}")
             # Toplam sayfa sayısını hesapla (JavaScript'in yaptığı gibi)
             if total_listings is not None and total_pages is None:
@@ -187,30 +891,20 @@ def extract_total_counts(html):
             pass
     
     # 3. Pagination select options'dan tespit et
-    if total_pages is None:
-        options = re.findall(r'<option[^>]*value="[^"]*[?&]page=(\d+)[^"]*"[^>]*>(\d+)</option>', html)
-        if options:
-            try:
-                highest_page = max([int(page[0]) for page in options])
-                if highest_page > 1:  # En az 2 varsa JavaScript çalışmış demektir
-                    total_pages = highest_page
-                    print(f"Pagination options'dan tespit edilen sayfa sayısı: {total_pages}")
-            except:
-                pass
+    if total_pages is None and scan.option_pages:
+        highest_page = max(scan.option_pages)
+        if highest_page > 1:  # En az 2 varsa JavaScript çalışmış demektir
+            total_pages = highest_page
+            print(f"Pagination options'dan tespit edilen sayfa sayısı: {total_pages}")
     
     # 4. next/son sayfa butonunda URL'den tespit et
-    if total_pages is None:
-        match = re.search(r'<a[^>]*href="[^"]*[?&]page=(\d+)[^"]*"[^>]*>.*?Son.*?</a>', html)
-        if match:
-            try:
-                total_pages = int(match.group(1))
-                print(f"Son sayfa butonundan tespit edilen sayfa sayısı: {total_pages}")
-            except:
-                pass
+    if total_pages is None and scan.last_page_link is not None:
+        total_pages = scan.last_page_link
+        print(f"Son sayfa butonundan tespit edilen sayfa sayısı: {total_pages}")
     
     # 5. Sayfadaki ilanları say ve bundan tahmin et (fallback)
     if total_listings is None:
-        items_count = len(re.findall(r'class="ilanitem(cardorange|basic)"', html))
+        items_count = scan.item_count
         # İlan sayısı ile sayfa başına ilan sayısını hesapla
         if items_count > 0:
             total_listings = items_count  # Bu sadece ilk sayfadaki ilan sayısı
@@ -228,18 +922,18 @@ def extract_total_counts(html):
     
     return total_listings, total_pages
 
-async def extract_total_counts_from_api(crawler, base_url):
+async def extract_total_counts_from_api(fetcher, base_url, target=None):
     """JavaScript'in yaptığı gibi API'ye istek yaparak toplam ilan sayısını almaya çalışır"""
     try:
         api_url = config.API_URL
         # API parametreleri: konfigürasyondan alınır
-        params = config.get_api_params(page=1)
+        params = config.get_api_params(page=1, target=target)
         headers = config.API_HEADERS.copy()
         headers["Referer"] = base_url
         
         print("API'den toplam ilan sayısını almaya çalışılıyor...")
-        response = await crawler.arun(
-            url=api_url, 
+        response = await fetcher.fetch(
+            api_url,
             method="POST",
             headers=headers,
             data=params
@@ -248,7 +942,8 @@ async def extract_total_counts_from_api(crawler, base_url):
         if response and response.html:
             total_listings_str = response.html
             try:
-                total_listings = int(total_listings_str)
+                _, total_listings = parse_api_search_response(total_listings_str)
+                total_listings = int(total_listings if total_listings is not None else total_listings_str)
                 total_pages = max(1, (total_listings + 29) // 30)  # Math.ceil(count/30) eşdeğeri
                 print(f"API'den alınan toplam ilan sayısı: {total_listings}")
                 print(f"API'den hesaplanan toplam sayfa sayısı: {total_pages}")
@@ -262,254 +957,829 @@ async def extract_total_counts_from_api(crawler, base_url):
         
     return None, None
 
+class CrawlResources:
+    # What all targets of one run share: the browser (LazyCrawler), the HTTP client
+    # for the search API, the search-page pool and pacer, the listing fetcher and its
+    # AdaptiveController (one rate budget for every target), the circuit breaker and
+    # the frontier, which knows every listing discovered by any target, so a listing
+    # that shows up under several targets is only fetched once. In streaming mode
+    # also the extract_data.StreamExtractor that fetched listings are handed to.
+    def __init__(self, crawler, api_fetcher, search_concurrency, frontier, extractor=None, archive=True):
+        self.crawler = crawler
+        self.api_fetcher = api_fetcher
+        self.search_pacer = RequestPacer(config.SEARCH_PAGE_DELAY)
+        self.pool = SearchPagePool(
+            Crawl4aiFetcher(crawler, use_playwright=True), search_concurrency, self.search_pacer
+        )
+        self.breaker = CircuitBreaker(config.BLOCK_COOLDOWN_SECONDS)
+        self.controller = create_listing_controller()
+        self.frontier = frontier
+        self.extractor = extractor
+        self.archive = archive
+        self.listing_fetcher = None
+
+    def get_listing_fetcher(self):
+        # Created on first use, so runs without new listings never open it
+        if self.listing_fetcher is None:
+            self.listing_fetcher = create_listing_fetcher(self.crawler)
+        return self.listing_fetcher
+
+    async def close(self):
+        await self.pool.close()
+        if self.listing_fetcher is not None:
+            await self.listing_fetcher.close()
+
+def get_target_paths(target, multi_target=False):
+    # (output_dir, pages_dir) of a target. A single-target run keeps the configured
+    # folders; in multi-target mode every target gets its own subfolders.
+    if not multi_target:
+        return config.OUTPUT_DIR, config.PAGES_DIR
+    return os.path.join(config.OUTPUT_DIR, target.name), os.path.join(config.PAGES_DIR, target.name)
+
+async def crawl_target(target, resources, output_dir, pages_dir, max_pages=None, incremental=False):
+    # Crawls the search pages of one target and scrapes its new listings.
+    # Returns the target's stats.
+    breaker = resources.breaker
+    frontier = resources.frontier
+    stats = {"found": 0, "existing": 0, "duplicates": 0, "new": 0, "succeeded": 0, "failed": 0, "pending": 0,
+             "expired": 0, "changed_files": []}
+    print(f"\n=== {target.name}: {config.get_base_search_url(target)} ===")
+    
+    # Listings left queued by a previous run (stopped by an access block or killed)
+    pending_from_last_run = frontier.queued_urls(output_dir)
+    if pending_from_last_run:
+        print(f"Resuming {len(pending_from_last_run)} queued listings from the last run")
+    
+    # Create output directories if they don't exist
+    for directory in (output_dir, pages_dir):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+    
+    print(f"Will skip {frontier.count(output_dir, 'done')} listings that are already saved.")
+    listing_validators = ValidatorStore(frontier, output_dir)
+    
+    # Search pages saved within SEARCH_PAGE_TTL are reused, older ones are fetched again
+    existing_search_pages = frontier.fresh_search_pages(pages_dir, config.SEARCH_PAGE_TTL)
+    expired_search_pages = len(frontier.get_search_pages(pages_dir) - existing_search_pages)
+    print(f"Will skip {len(existing_search_pages)} search pages that are already saved"
+          + (f" ({expired_search_pages} expired, will re-fetch)." if expired_search_pages else "."))
+    search_validators = ValidatorStore(frontier, pages_dir, search_pages=True)
+    
+    # Incremental mode: cached search pages are stale by definition, re-fetch from page 1
+    # and stop at the first page that only has known listings
+    target_key = get_target_key(target)
+    watermark = load_watermark(config.WATERMARK_FILE, target_key)
+    if incremental:
+        if target.sort != "mr":
+            print(f"Warning: incremental mode expects SORT = 'mr' (newest first), current sort is '{target.sort}'")
+        existing_search_pages = set()
+        print(f"Incremental mode: watermark for {target_key}: {watermark.get('total_listings')} listings, updated {watermark.get('updated_at')}")
+    
+    print(f"Starting link extraction from search pages...")
+
+    # Search pages come from the search API (SEARCH_BACKEND = "api") or are rendered
+    # with Playwright; the browser is only started if a page actually needs it.
+    # Listing pages use LISTING_FETCHER.
+    pool = resources.pool
+    api_client = ApiSearchClient(resources.api_fetcher, resources.search_pacer, target) if config.SEARCH_BACKEND == "api" else None
+    
+    # 1. Fetch the first search page to gather listing links and page counts
+    first_page_num = 1
+    search_page_url = config.get_search_url_with_page(first_page_num, target)
+    try:
+        html, source = await fetch_search_page(
+            first_page_num, pool, api_client, breaker, pages_dir, search_validators, target
+        )
+    except AccessBlockedError:
+        print("!!! Erişim engellendi. Script durduruluyor. !!!")
+        return stats
+    if not html:
+        print("İlk arama sayfası çekilemedi. Script duruyor.")
+        return stats
+    
+    # Önce API'den toplam sayıları almayı dene: API modunda ilk sayfanın yanıtından
+    # (aynı istek ikinci kez gönderilmez), aksi halde JavaScript'in yaptığı gibi ayrı bir istekle
+    if api_client is not None:
+        total_listings_api, total_pages_api = api_client.total_listings, None
+        if total_listings_api is not None:
+            total_pages_api = max(1, (total_listings_api + 29) // 30)  # Math.ceil(count/30) eşdeğeri
+            print(f"API yanıtındaki toplam ilan sayısı: {total_listings_api}")
+            print(f"API'den hesaplanan toplam sayfa sayısı: {total_pages_api}")
+    else:
+        total_listings_api, total_pages_api = await extract_total_counts_from_api(resources.api_fetcher, search_page_url, target)
+    
+    # Sonra HTML'den tespit et (API yanıtı tam sayfa olmadığı için sadece render edilmiş sayfada);
+    # sayfa bir kez taranır, linkler de aynı taramadan alınır
+    first_page_scan = None
+    if source == "playwright":
+        base_for_relative = search_page_url.split('?')[0]
+        first_page_scan = scan_search_page(html, base_for_relative)
+        total_listings_html, total_pages_html = extract_total_counts(html, first_page_scan)
+    else:
+        total_listings_html, total_pages_html = None, None
+    
+    # API'den ve HTML'den alınan değerleri önceliklendirme
+    total_listings = total_listings_api if total_listings_api else total_listings_html
+    total_pages = total_pages_api if total_pages_api else total_pages_html
+    
+    if total_listings:
+        print(f"Toplam ilan: {total_listings}")
+    if total_pages:
+        print(f"Toplam sayfa: {total_pages}")
+        
+    # Kullanıcı override etmediyse otomatik max_search_pages belirle
+    if max_pages:
+        max_search_pages = max_pages
+        print(f"Kullanıcı tarafından belirlenen maksimum sayfa: {max_search_pages}")
+    elif total_pages:
+        max_search_pages = total_pages
+        print(f"Otomatik tespit edilen maksimum sayfa: {max_search_pages}")
+    else:
+        max_search_pages = 30
+        print(f"Sayfa sayısı tespit edilemedi, varsayılan: {max_search_pages}")
+    
+    links_on_page = await get_search_page_links(html, source, first_page_num, target, first_page_scan)
+    newest_ids = get_sorted_listing_ids(links_on_page)
+    
+    known_ids = None
+    if incremental:
+        # Nothing new if the API count and the first page match the watermark
+        if (watermark and not pending_from_last_run
+                and total_listings_api is not None
+                and watermark.get("total_listings") == total_listings_api
+                and watermark.get("newest_ids") == newest_ids):
+            print("Toplam ilan sayısı ve ilk sayfa değişmemiş. Yeni ilan yok, tarama atlanıyor.")
+            return stats
+        known_ids = KnownListings(frontier, watermark.get("newest_ids", []))
+        if links_on_page and all(get_listing_id_from_url(url) in known_ids for url in links_on_page):
+            print("İlk sayfa sadece bilinen ilanlar içeriyor. Diğer sayfalar atlanıyor.")
+            max_search_pages = 1
+    
+    # Listings of earlier runs waiting for a delayed retry
+    retry_backlog = frontier.retry_listings(output_dir)
+    if retry_backlog:
+        print(f"{len(retry_backlog)} listings from earlier runs wait for a retry")
+    
+    # Discovery and listing fetches overlap: every search page's links are recorded
+    # in the frontier as soon as the page is in, and the ones that get queued go
+    # straight to the listing workers through a bounded feed while later search pages
+    # are still being crawled. Listings already saved here or claimed by another
+    # target are skipped, new and previously failed ones are queued, and so are
+    # saved ones past their LISTING_TTL, which are re-fetched with conditional requests.
+    feed = ListingFeed(config.LISTING_QUEUE_SIZE)
+    counts = {"new": 0, "existing": 0, "duplicates": 0, "requeued": 0, "expired": 0}
+    queued_total = len(pending_from_last_run)
+    # Listings queued by an earlier run that were saved before are refreshes too
+    expired_urls = {url for url in pending_from_last_run if listing_validators.get(get_listing_filename(url))}
+    
+    async def add_page_links(page_num, links):
+        nonlocal queued_total
+        stats["found"] += len(links)
+        queued = []
+        expired = []
+        page_counts = frontier.add_discovered(
+            [(get_listing_id_from_url(url), url) for url in links], output_dir, target.name, queued, expired
+        )
+        for key in counts:
+            counts[key] += page_counts[key]
+        queued_total += len(queued)
+        expired_urls.update(expired)
+        if page_num not in existing_search_pages:
+            # Fetched now (a reused page keeps its fetch time, so it still expires)
+            frontier.record_search_pages(pages_dir, [page_num])
+        for url in queued:
+            await feed.put(url)
+    
+    async def discover():
+        try:
+            # Listings left queued by a previous run go first
+            for url in pending_from_last_run:
+                await feed.put(url)
+            await add_page_links(first_page_num, links_on_page)
+            # Kalan sayfalar: SEARCH_CONCURRENCY kadar sayfa aynı anda çekilir
+            await crawl_search_pages(
+                pool, api_client, range(2, max_search_pages + 1), max_search_pages,
+                pages_dir, existing_search_pages, breaker, add_page_links,
+                validators=search_validators, known_ids=known_ids, target=target
+            )
+        finally:
+            search_validators.save()
+            await feed.close()
+            print(f"\nSearch pages done: {stats['found']} listing links, {queued_total} queued for scraping")
+            if counts["duplicates"]:
+                print(f"Skipping {counts['duplicates']} listings already found for another target")
+    
+    # 2. Scrape each individual listing page (NO Playwright needed) and save its HTML
+    print("\n--- Scraping individual listing pages while search pages are crawled --- ")
+    tasks = [
+        asyncio.create_task(discover()),
+        asyncio.create_task(crawl_listings(
+            feed, resources.get_listing_fetcher(), output_dir, frontier, breaker,
+            validators=listing_validators, controller=resources.controller,
+            extractor=resources.extractor, archive=resources.archive, retries=retry_backlog,
+            refresh_urls=expired_urls
+        )),
+    ]
+    try:
+        _, progress = await asyncio.gather(*tasks)
+    except BaseException:
+        # One side failed (or the run was cancelled): stop the other one as well, so
+        # the workers do not wait forever on a feed nobody closes and discovery does
+        # not block on a feed nobody reads. Queued listings stay in the frontier.
+        feed.abandon()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        listing_validators.save()
+    if not breaker.tripped and not progress.pending_urls and not progress.deferred_urls:
+        save_watermark(config.WATERMARK_FILE, target_key, total_listings_api or total_listings, newest_ids)
+    stats["existing"] = counts["existing"]
+    stats["duplicates"] = counts["duplicates"]
+    # Listings discovered for the first time; failed ones queued again, expired ones
+    # and those resumed from the last run are queued too but are not new
+    stats["new"] = counts["new"]
+    stats["succeeded"] = progress.succeeded
+    stats["failed"] = progress.failed
+    stats["expired"] = counts["expired"]
+    # Re-fetched listings whose content changed; their CSV rows are updated by main()
+    stats["changed_files"] = progress.changed_files
+    # Left queued after an access block (including links found after the workers
+    # stopped) plus retries for a later run
+    queued_left = frontier.count(output_dir, "queued")
+    stats["pending"] = queued_left + len(progress.deferred_urls)
+
+    print(f"\n--- Scraping Complete ({target.name}) --- ")
+    if resources.archive:
+        print(f"Saved HTML content for individual listings in the '{output_dir}' folder.")
+    print(f"Saved HTML content for search pages in the '{pages_dir}' folder.")
+    
+    # Print stats
+    print(f"Total links found: {stats['found']}")
+    print(f"Previously scraped: {counts['existing']}")
+    print(f"New links to scrape: {stats['new']}")
+    if pending_from_last_run:
+        print(f"Resumed from the last run: {len(pending_from_last_run)}")
+    if counts["requeued"]:
+        print(f"Failed listings queued again: {counts['requeued']}")
+    if counts["expired"]:
+        print(f"Expired listings re-fetched: {counts['expired']} ({len(progress.changed_files)} changed)")
+    print(f"Successfully scraped: {progress.succeeded}")
+    print(f"Failed to scrape: {progress.failed}")
+    if progress.retried:
+        print(f"Retries after transient errors: {progress.retried}")
+    if queued_left:
+        print(f"Left pending after access block: {queued_left} (queued in {frontier.path})")
+    if progress.deferred_urls:
+        print(f"Waiting for a retry in a later run: {len(progress.deferred_urls)}")
+    if progress.failed:
+        print(f"Failed URLs are kept in {frontier.path} (list them with: python frontier.py)")
+    return stats
+
 async def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--max-pages', type=int, default=None, help='Maksimum çekilecek sayfa sayısı')
+    parser.add_argument('--search-concurrency', type=int, default=None, help='Aynı anda render edilecek arama sayfası sayısı')
+    parser.add_argument('--incremental', action='store_true', help='Sadece yeni ilanlar: bilinen ilanlara ulaşınca sayfalamayı durdur (SORT="mr" ile)')
+    parser.add_argument('--refresh', action='store_true', help='Kayıtlı ilanları değişme olasılığına göre, günlük bütçeyle koşullu isteklerle yenile (sadece değişenler yeniden yazılır)')
+    parser.add_argument('--targets', default=None, help='Birden çok hedefi birlikte tara: "all" (tüm QUICK_CONFIGS) veya virgülle ayrılmış QUICK_CONFIGS isimleri / şehir/emlak-türü')
+    parser.add_argument('--stream', action='store_true', help='İndirilen ilanları hemen ayrıştırıp CSV\'ye ekle (extract_data.py\'yi ayrıca çalıştırmaya gerek yok)')
+    parser.add_argument('--retry-failed', action='store_true', help='Sadece hatalı ilanları (frontier.db) tekrar dene, arama sayfalarını tarama')
+    parser.add_argument('--no-archive', action='store_true', help='--stream ile: ilan HTML\'lerini diske kaydetme, sadece CSV\'ye yaz')
     args = parser.parse_args()
-    # base_search_url konfigürasyondan alınır
-    base_search_url = config.get_base_search_url()
-    output_dir = config.OUTPUT_DIR
-    pages_dir = config.PAGES_DIR
-    all_listing_links = set()
     
-    # Create pages directory if it doesn't exist
-    if not os.path.exists(pages_dir):
-        os.makedirs(pages_dir)
+    archive = config.ARCHIVE_HTML and not args.no_archive
+    stream = args.stream or config.STREAM_EXTRACT
+    if not archive and not stream:
+        print("--no-archive sadece --stream ile kullanılabilir (aksi halde indirilen ilanlar kaybolur).")
+        return
     
-    # Get existing listing IDs before starting
-    existing_listing_ids = get_existing_listing_ids(output_dir)
-    print(f"Will skip {len(existing_listing_ids)} listings that are already saved.")
+    # Hedefler: --targets verilmezse CITY / PROPERTY_TYPE ayarları
+    multi_target = bool(args.targets)
+    if multi_target:
+        try:
+            targets = config.get_targets(args.targets)
+        except ValueError as e:
+            print(e)
+            return
+    else:
+        targets = [config.get_current_target()]
+    target_paths = [get_target_paths(target, multi_target) for target in targets]
     
-    # Get existing search pages before starting
-    existing_search_pages = get_existing_search_pages(pages_dir)
-    print(f"Will skip {len(existing_search_pages)} search pages that are already saved.")
+    # Crawl state of every discovered listing; folders saved before the frontier
+    # existed are imported once
+    frontier = Frontier(config.FRONTIER_DB)
+    if multi_target:
+        import_existing_files(frontier, config.OUTPUT_DIR, config.PAGES_DIR)
+    for target, (output_dir, pages_dir) in zip(targets, target_paths):
+        import_existing_files(frontier, output_dir, pages_dir, target.name)
     
-    print(f"Starting link extraction from search pages...")
+    if args.retry_failed:
+        breaker = CircuitBreaker(config.BLOCK_COOLDOWN_SECONDS)
+        for output_dir, _ in target_paths:
+            await retry_failed_listings(output_dir, frontier, breaker)
+            if breaker.tripped:
+                break
+        await storage.close_writer()
+        frontier.close()
+        storage.close_stores()
+        return
+    
+    if args.refresh:
+        if args.stream:
+            print("Note: --refresh re-extracts the changed listings itself, --stream is ignored.")
+        breaker = CircuitBreaker(config.BLOCK_COOLDOWN_SECONDS)
+        # One daily budget for all targets (see scheduler.py)
+        budget = scheduler.remaining_budget(frontier)
+        if budget == 0:
+            print(f"Today's refresh budget (REFRESH_DAILY_BUDGET = {config.REFRESH_DAILY_BUDGET}) is used up.")
+        for output_dir, _ in target_paths:
+            if budget == 0:
+                break
+            used = await refresh_saved_listings(output_dir, frontier, breaker, budget)
+            if budget is not None:
+                budget = max(budget - used, 0)
+            if breaker.tripped:
+                break
+        await storage.close_writer()
+        frontier.close()
+        storage.close_stores()
+        return
+    
+    incremental = args.incremental or config.INCREMENTAL
+    search_concurrency = args.search_concurrency or config.SEARCH_CONCURRENCY
+    if multi_target:
+        print(f"Crawling {len(targets)} targets: {', '.join(target.name for target in targets)}")
 
-    async with AsyncWebCrawler(
-        headers=config.HEADERS
-    ) as crawler:
-        
-        # 1. Scrape search result pages using PLAYWRIGHT to gather listing links
-        first_page_num = 1
-        search_page_url = config.get_search_url_with_page(first_page_num)
-        html = await scrape_page(search_page_url, crawler, use_playwright=True)
-        if check_blocked_html(html):
-            handle_access_blocked()
-            # Tekrar ilk sayfayı çek
-            html = await scrape_page(search_page_url, crawler, use_playwright=True)
-            if check_blocked_html(html):
-                print("!!! Erişim engellendi. Script durduruluyor. !!!")
-                exit(1)  # İkinci denemede de engellenirse sonlandır
-        if not html:
-            print("İlk arama sayfası çekilemedi. Script duruyor.")
-            return
-        
-        # Önce API'den toplam sayıları almayı dene
-        total_listings_api, total_pages_api = await extract_total_counts_from_api(crawler, search_page_url)
-        
-        # Sonra HTML'den tespit et
-        total_listings_html, total_pages_html = extract_total_counts(html)
-        
-        # API'den ve HTML'den alınan değerleri önceliklendirme
-        total_listings = total_listings_api if total_listings_api else total_listings_html
-        total_pages = total_pages_api if total_pages_api else total_pages_html
-        
-        if total_listings:
-            print(f"Toplam ilan: {total_listings}")
-        if total_pages:
-            print(f"Toplam sayfa: {total_pages}")
-            
-        # Kullanıcı override etmediyse otomatik max_search_pages belirle
-        if args.max_pages:
-            max_search_pages = args.max_pages
-            print(f"Kullanıcı tarafından belirlenen maksimum sayfa: {max_search_pages}")
-        elif total_pages:
-            max_search_pages = total_pages
-            print(f"Otomatik tespit edilen maksimum sayfa: {max_search_pages}")
+    extractor = None
+    if stream:
+        # Rows are written for pages of every target; source_file stays relative to
+        # OUTPUT_DIR, as extract_data.py would list them
+        extract_data.HTML_FOLDER = config.OUTPUT_DIR
+        extractor = extract_data.StreamExtractor(config.STREAM_QUEUE_SIZE, config.STREAM_EXTRACT_WORKERS)
+        await extractor.start()
+        print(f"Streaming extraction into {extract_data.OUTPUT_FILE}" + ("" if archive else " (listing HTML not archived)"))
+
+    async with LazyCrawler() as crawler, HttpFetcher() as api_fetcher:
+        resources = CrawlResources(crawler, api_fetcher, search_concurrency, frontier, extractor, archive)
+        try:
+            results = await asyncio.gather(*(
+                crawl_target(target, resources, output_dir, pages_dir, args.max_pages, incremental)
+                for target, (output_dir, pages_dir) in zip(targets, target_paths)
+            ), return_exceptions=multi_target)
+        finally:
+            await resources.close()
+            if extractor is not None:
+                await extractor.close()
+            await storage.close_writer()
+            frontier.close()
+            storage.close_stores()
+
+    # Expired listings that came back changed: update their rows if there is a CSV
+    # already (otherwise extract_data.py picks them up with everything else). In
+    # streaming mode the extractor has replaced them already.
+    changed_files = [
+        os.path.relpath(os.path.join(output_dir, filename), config.OUTPUT_DIR)
+        for stats, (output_dir, _) in zip(results, target_paths)
+        if not isinstance(stats, Exception)
+        for filename in stats["changed_files"]
+    ]
+    if changed_files and extractor is None and os.path.exists(extract_data.OUTPUT_FILE):
+        extract_data.HTML_FOLDER = config.OUTPUT_DIR
+        await extract_data.reextract_files(changed_files)
+
+    if not multi_target:
+        return
+    print("\n=== Hedef özeti ===")
+    for target, stats in zip(targets, results):
+        if isinstance(stats, Exception):
+            print(f"{target.name}: hata - {stats}")
+            continue
+        print(
+            f"{target.name}: {stats['found']} links, {stats['new']} new, "
+            f"{stats['existing']} already saved, {stats['expired']} expired, {stats['duplicates']} in another target, "
+            f"{stats['succeeded']} scraped, {stats['failed']} failed, {stats['pending']} pending"
+        )
+    if resources.breaker.tripped:
+        print(f"Erişim engellendi: bekleyen ilanlar {config.FRONTIER_DB} içinde sırada bekliyor.")
+
+class CrawlProgress:
+    # Counts finished listing requests and estimates the finish time from the
+    # measured per-request throughput
+    def __init__(self, total, report_every=10, controller=None):
+        self.total = total
+        self.report_every = report_every
+        self.controller = controller
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.pending_urls = []
+        self.deferred_urls = []
+        self.changed_files = []
+        self.start_time = time.time()
+
+    @property
+    def completed(self):
+        return self.succeeded + self.failed
+
+    def record(self, success):
+        if success:
+            self.succeeded += 1
         else:
-            max_search_pages = 30
-            print(f"Sayfa sayısı tespit edilemedi, varsayılan: {max_search_pages}")
-        
-        # İlk sayfa kaydedilsin
-        await save_search_page(html, first_page_num, pages_dir)
-        base_for_relative = search_page_url.split('?')[0]
-        links_on_page = await extract_listing_links(html, base_for_relative)
-        all_listing_links.update(links_on_page)
-        print(f"Total unique links found so far: {len(all_listing_links)}")
-        
-        # Kalan sayfalar için döngü
-        for page_num in range(2, max_search_pages + 1):
-            search_page_url = config.get_search_url_with_page(page_num)
-            print(f"\n--- Processing Search Page {page_num}/{max_search_pages} for links --- ")
-            
-            # Check if this search page already exists
-            if page_num in existing_search_pages:
-                print(f"Search page {page_num} already exists - loading from file")
-                page_file = os.path.join(pages_dir, f"search_page_{page_num}_playwright.html")
-                try:
-                    with open(page_file, 'r', encoding='utf-8') as f:
-                        html = f.read()
-                    if html:
-                        print(f"Loaded search page {page_num} from file")
-                    else:
-                        print(f"Empty file for search page {page_num}, will re-scrape")
-                        html = None
-                except Exception as e:
-                    print(f"Error loading search page {page_num} from file: {e}")
-                    html = None
-            else:
-                # Use Playwright for the search pages
-                html = await scrape_page(search_page_url, crawler, use_playwright=True)
-                # Save the search page
-                if html:
-                    await save_search_page(html, page_num, pages_dir)
-            
-            if html:
-                if check_blocked_html(html):
-                    handle_access_blocked()
-                    # Tekrar aynı sayfayı çek
-                    html = await scrape_page(search_page_url, crawler, use_playwright=True)
-                    if check_blocked_html(html):
-                        print("!!! Erişim engellendi. Script durduruluyor. !!!")
-                        exit(1)  # İkinci denemede de engellenirse sonlandır
-                    if not html:
-                        print(f"Sayfa {page_num} tekrar çekilemedi. Sonraki sayfaya geçiliyor.")
-                        continue
-                base_for_relative = search_page_url.split('?')[0]
-                links_on_page = await extract_listing_links(html, base_for_relative)
-                all_listing_links.update(links_on_page)
-                print(f"Total unique links found so far: {len(all_listing_links)}")
-                # Eğer hiç ilan yoksa, bu muhtemelen son sayfa, döngüyü kır
-                if not links_on_page:
-                    print(f"Sayfa {page_num} boş, muhtemelen son sayfa. Tarama durduruluyor.")
-                    break
-            else:
-                print(f"Skipping search page {page_num} due to fetch error or empty content.")
-            
-            # Add a random component to the delay to make the scraping pattern less predictable
-            # Only wait if we're fetching the next page (not on the last page)
-            if page_num < max_search_pages and page_num not in existing_search_pages:
-                random_delay = 1.2 + (page_num % 3) * 0.3
-                print(f"Waiting {random_delay:.1f} seconds before next search page...")
-                await asyncio.sleep(random_delay)
-
-        print(f"\nFound a total of {len(all_listing_links)} unique listing links.")
-        
-        if not all_listing_links:
-            print("No listing links found. Exiting.")
+            self.failed += 1
+        if self.completed % self.report_every == 0 or self.completed == self.total:
+            self.report()
+
+    def report(self):
+        elapsed_time = time.time() - self.start_time
+        throughput = self.completed / elapsed_time if elapsed_time > 0 else 0.0
+        remaining = self.total - self.completed
+        estimated_remaining_time = remaining / throughput if throughput > 0 else 0.0
+        finish_time = datetime.datetime.now() + datetime.timedelta(seconds=estimated_remaining_time)
+
+        print(f"📊 Progress: {self.completed}/{self.total} listings completed ({self.failed} failed, {throughput:.2f} listings/s)")
+        print(f"⏱️  Elapsed: {elapsed_time/60:.1f} minutes")
+        print(f"🎯 Estimated finish: {finish_time.strftime('%H:%M:%S')} (in {estimated_remaining_time/60:.1f} minutes)")
+        if self.controller is not None:
+            print(f"🚦 Rate: {self.controller.describe()}")
+
+def retry_delay(attempts):
+    # Exponential backoff with jitter: RETRY_BASE_DELAY after the first failed attempt,
+    # doubling up to RETRY_MAX_DELAY; the jitter spreads retries of listings that
+    # failed together
+    delay = min(config.RETRY_MAX_DELAY, config.RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(1 - config.RETRY_JITTER, 1)
+
+class RetryLane:
+    # Listings waiting for a delayed retry, ordered by due time (epoch seconds, as
+    # stored in the frontier). It is the lower-priority lane of crawl_listings: while
+    # new listings are queued, a due retry is taken after every RETRY_EVERY of them.
+    def __init__(self):
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, url, due):
+        heapq.heappush(self._heap, (due, url))
+
+    def pop_due(self, now=None):
+        now = time.time() if now is None else now
+        if self._heap and self._heap[0][0] <= now:
+            return heapq.heappop(self._heap)[1]
+        return None
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def urls(self):
+        return [url for _, url in sorted(self._heap)]
+
+class ListingFeed:
+    # Bounded queue of listing URLs from discovery (the search pages) to the workers
+    # of crawl_listings. put() waits while the queue is full, so discovery runs at
+    # most maxsize listings ahead of the fetches and memory stays flat however many
+    # listings a target has. close() marks the end of discovery; once the workers
+    # stop early (access block) they abandon() the feed, and put() returns right away.
+    def __init__(self, maxsize=0):
+        self.queue = asyncio.Queue(maxsize)
+        self.total = 0
+        self.abandoned = False
+        self.finished = False  # closed and drained
+
+    @classmethod
+    def from_urls(cls, urls):
+        feed = cls()
+        for url in urls:
+            feed.total += 1
+            feed.queue.put_nowait(url)
+        feed.queue.put_nowait(None)
+        return feed
+
+    async def put(self, url):
+        if self.abandoned:
             return
-            
-        # Filter out listings that are already scraped
-        new_listing_links = []
-        for url in all_listing_links:
-            listing_id = get_listing_id_from_url(url)
-            if listing_id in existing_listing_ids:
-                print(f"Skipping listing {listing_id} - already scraped")
+        self.total += 1
+        await self.queue.put(url)
+
+    async def close(self):
+        if not self.abandoned:
+            await self.queue.put(None)
+
+    def _take(self, item):
+        if item is None:
+            # End of discovery; left in the queue for the other workers
+            self.finished = True
+            self.queue.put_nowait(None)
+        return item
+
+    def get_nowait(self):
+        # Next URL, or None if none is queued right now
+        if self.finished or self.queue.empty():
+            return None
+        return self._take(self.queue.get_nowait())
+
+    async def get(self, timeout=None):
+        # Waits for the next URL (None once the feed is finished); raises
+        # asyncio.TimeoutError after timeout seconds
+        if self.finished:
+            return None
+        return self._take(await asyncio.wait_for(self.queue.get(), timeout))
+
+    def abandon(self):
+        # Stops the feed and returns the URLs still queued
+        self.abandoned = True
+        urls = []
+        while not self.queue.empty():
+            url = self.queue.get_nowait()
+            if url is not None:
+                urls.append(url)
+        return urls
+
+def create_listing_controller(workers=None):
+    # AdaptiveController for listing fetches, starting from the static politeness
+    # budget of BATCH_SIZE requests per (DELAY_BETWEEN_REQUESTS + DELAY_BETWEEN_BATCHES)
+    # seconds. One controller can be shared by several crawls (one rate budget).
+    initial_concurrency = workers or config.BATCH_SIZE
+    initial_rate = initial_concurrency / (config.DELAY_BETWEEN_REQUESTS + config.DELAY_BETWEEN_BATCHES)
+    if config.ADAPTIVE_RATE:
+        initial_rate = min(max(initial_rate, config.MIN_REQUESTS_PER_SECOND), config.MAX_REQUESTS_PER_SECOND)
+    return AdaptiveController(initial_rate, initial_concurrency, adaptive=config.ADAPTIVE_RATE)
+
+async def crawl_listings(listing_urls, fetcher, output_dir, frontier, breaker, workers=None, validators=None, conditional=False, controller=None, extractor=None, archive=True, retries=None, refresh_urls=None):
+    # Fetches listings with a pool of workers pulling from one queue: each worker
+    # takes the next URL as soon as it finishes, so one slow listing only holds up
+    # its own worker. listing_urls is a list or a ListingFeed that is still being
+    # filled by discovery (see crawl_target). An AdaptiveController (see create_listing_controller, or the
+    # shared one passed in) decides how many of the workers may fetch at once and
+    # how fast; with ADAPTIVE_RATE enabled it ramps up or backs off from there.
+    # Every listing's state is tracked in the frontier (in flight -> done / failed).
+    # A transient failure schedules a retry with exponential backoff (see RetryLane,
+    # seeded with retries: (url, due) pairs of earlier runs) until MAX_ATTEMPTS; the
+    # run waits at most RETRY_MAX_WAIT for a retry once there is no other work, later
+    # ones stay in the frontier for the next run. A refresh (below) that fails
+    # leaves the listing done with the error: its saved page is still valid.
+    # If the breaker trips, unfetched URLs stay queued there and are returned in
+    # progress.pending_urls; retries left for a later run are in progress.deferred_urls.
+    # With conditional=True (refresh mode) only changed pages are rewritten; their file
+    # names are collected in progress.changed_files. refresh_urls (a set that may
+    # still grow while the crawl runs) marks single URLs as refreshes the same way:
+    # expired listings re-fetched during a crawl.
+    # With an extractor (streaming mode) every fetched page is also handed to it;
+    # archive=False skips saving the pages.
+    controller = controller or create_listing_controller(workers)
+    initial_concurrency = controller.limit
+    if config.ADAPTIVE_RATE:
+        workers = max(initial_concurrency, config.MAX_CONCURRENCY)
+    else:
+        workers = initial_concurrency
+    retries = retries or []
+    feed = listing_urls if isinstance(listing_urls, ListingFeed) else ListingFeed.from_urls(listing_urls)
+    progress = CrawlProgress(feed.total + len(retries), report_every=max(initial_concurrency, 10), controller=controller)
+
+    def is_refresh(listing_url):
+        return conditional or (refresh_urls is not None and listing_url in refresh_urls)
+
+    retry_lane = RetryLane()
+    for listing_url, due in retries:
+        retry_lane.add(listing_url, due or 0)
+    new_taken = 0
+
+    def take_new(listing_url):
+        nonlocal new_taken
+        new_taken += 1
+        progress.total = feed.total + len(retries)
+        return listing_url
+
+    async def next_url():
+        # Next URL to fetch: a due retry every RETRY_EVERY new listings (or whenever
+        # no new one is queued), else a new one; None when there is nothing left to do
+        nonlocal new_taken
+        while not breaker.tripped:
+            # (the feed's end marker stays queued once discovery is done, so a finished
+            # feed counts as empty)
+            no_new = feed.finished or feed.queue.empty()
+            if retry_lane and (no_new or new_taken % config.RETRY_EVERY == config.RETRY_EVERY - 1):
+                listing_url = retry_lane.pop_due()
+                if listing_url:
+                    new_taken += 1
+                    return listing_url
+            listing_url = feed.get_nowait()
+            if listing_url:
+                return take_new(listing_url)
+            next_due = retry_lane.next_due()
+            if not feed.finished:
+                # Discovery still running: wait for the next listing (or retry)
+                timeout = None if next_due is None else max(next_due - time.time(), 0.05)
+                try:
+                    listing_url = await feed.get(timeout)
+                except asyncio.TimeoutError:
+                    continue
+                if listing_url:
+                    return take_new(listing_url)
                 continue
-            new_listing_links.append(url)
-            
-        print(f"After filtering: {len(new_listing_links)} new listings to scrape (skipped {len(all_listing_links) - len(new_listing_links)} existing ones)")
-            
-        if not new_listing_links:
-            print("No new listings to scrape. Exiting.")
-            return
-            
-        # 2. Scrape each individual listing page (NO Playwright needed) and save its HTML
-        print(f"\n--- Scraping individual listing pages ({len(new_listing_links)} links) --- ")
-        tasks = []
-        for listing_url in new_listing_links:
-             tasks.append(scrape_and_save_listing(listing_url, crawler, output_dir))
-             
-        # Batch size konfigürasyondan alınır
-        batch_size = config.BATCH_SIZE 
-        
-        # Create subdirectory for failed listings to retry later
-        failed_dir = os.path.join(output_dir, "failed")
-        if not os.path.exists(failed_dir):
-            os.makedirs(failed_dir)
-            
-        # Start time for batch processing estimation
-        import datetime
-        batch_start_time = time.time()
-        total_batches = (len(tasks) + batch_size - 1) // batch_size
-            
-        for i in range(0, len(tasks), batch_size):
-             batch = tasks[i:i+batch_size]
-             current_batch = i//batch_size + 1
-             print(f"\nProcessing batch {current_batch}/{total_batches}...")
-             
-             # Gather results to check for failures
-             results = await asyncio.gather(*batch, return_exceptions=True)
-             
-             # Check if any tasks failed and log them
-             for j, result in enumerate(results):
-                 if isinstance(result, Exception):
-                     batch_index = i + j
-                     if batch_index < len(new_listing_links):
-                         failed_url = new_listing_links[batch_index]
-                         print(f"⚠️ Failed to scrape {failed_url}: {result}")
-                         # Log failed URL to retry later
-                         with open(os.path.join(failed_dir, "failed_urls.txt"), "a") as f:
-                             f.write(f"{failed_url}\n")
-             
-             # Calculate and display estimated finish time
-             elapsed_time = time.time() - batch_start_time
-             if current_batch > 0:
-                 avg_time_per_batch = elapsed_time / current_batch
-                 remaining_batches = total_batches - current_batch
-                 estimated_remaining_time = remaining_batches * avg_time_per_batch
-                 
-                 # Add estimated delay time for remaining batches
-                 if remaining_batches > 0:
-                     estimated_delay_time = remaining_batches * 1  # Average delay of 1 second
-                     estimated_remaining_time += estimated_delay_time
-                 
-                 finish_time = datetime.datetime.now() + datetime.timedelta(seconds=estimated_remaining_time)
-                 
-                 print(f"📊 Progress: {current_batch}/{total_batches} batches completed")
-                 print(f"⏱️  Elapsed: {elapsed_time/60:.1f} minutes")
-                 print(f"🎯 Estimated finish: {finish_time.strftime('%H:%M:%S')} (in {estimated_remaining_time/60:.1f} minutes)")
-             
-             if i + batch_size < len(tasks):
-                 # Konfigürasyondan batch delay
-                 batch_delay = config.DELAY_BETWEEN_BATCHES
-                 print(f"Waiting {batch_delay:.1f} seconds before next batch...")
-                 await asyncio.sleep(batch_delay)
-
-    print("\n--- Scraping Complete --- ")
-    print(f"Saved HTML content for individual listings in the '{output_dir}' folder.")
-    print(f"Saved HTML content for search pages in the '{pages_dir}' folder.")
-    
-    # Print stats
-    failed_urls = []
-    if os.path.exists(os.path.join(failed_dir, "failed_urls.txt")):
-        with open(os.path.join(failed_dir, "failed_urls.txt"), "r") as f:
-            failed_urls = f.read().splitlines()
-    
-    print(f"Total links found: {len(all_listing_links)}")
-    print(f"Previously scraped: {len(existing_listing_ids)}")
-    print(f"New links to scrape: {len(new_listing_links)}")
-    print(f"Successfully scraped: {len(new_listing_links) - len(failed_urls)}")
-    print(f"Failed to scrape: {len(failed_urls)}")
-    if failed_urls:
-        print(f"Failed URLs are saved in: {os.path.join(failed_dir, 'failed_urls.txt')}")
-    
-async def scrape_and_save_listing(url, crawler, output_dir):
-    # Scrape single listing page WITHOUT Playwright
-    html_content = await scrape_page(url, crawler, use_playwright=False) 
-    if check_blocked_html(html_content):
-        handle_access_blocked()
-        # Tekrar dene
-        html_content = await scrape_page(url, crawler, use_playwright=False)
-        if check_blocked_html(html_content):
-            print("!!! Erişim engellendi. Script durduruluyor. !!!")
-            exit(1)  # İkinci denemede de engellenirse sonlandır
-    await save_html_to_file(html_content, url, output_dir)
-    # Add a slight random variation to the delay based on config
-    delay = config.DELAY_BETWEEN_REQUESTS
-    await asyncio.sleep(delay)
+            if next_due is None or next_due - time.time() > config.RETRY_MAX_WAIT:
+                return None
+            await asyncio.sleep(min(max(next_due - time.time(), 0), 1.0))
+        return None
+
+    async def worker():
+        while True:
+            listing_url = await next_url()
+            if listing_url is None:
+                return
+            listing_id = get_listing_id_from_url(listing_url)
+            key = get_listing_filename(listing_url)
+            frontier.mark_in_flight(listing_id)
+            refresh = is_refresh(listing_url)
+            try:
+                written = await scrape_and_save_listing(
+                    listing_url, fetcher, output_dir, controller, breaker, validators, refresh,
+                    extractor, archive
+                )
+                if refresh:
+                    frontier.record_check(listing_id, written)
+                    if written:
+                        progress.changed_files.append(key)
+                frontier.mark_done(listing_id)
+                progress.record(True)
+            except AccessBlockedError:
+                # Refreshed listings stay saved; new ones go back to the queue
+                if refresh:
+                    frontier.mark_done(listing_id)
+                else:
+                    frontier.mark_queued(listing_id)
+                progress.pending_urls.append(listing_url)
+                return
+            except Exception as e:
+                attempts = frontier.get_attempts(listing_id)
+                if (isinstance(e, FetchError) and e.permanent) or attempts >= config.MAX_ATTEMPTS:
+                    print(f"⚠️ Failed to scrape {listing_url} (attempt {attempts}): {e}")
+                    if refresh:
+                        # The saved page is still valid: stays done and refreshable
+                        frontier.mark_refresh_error(listing_id, str(e))
+                    else:
+                        # Kept in the frontier as failed; queued again when rediscovered
+                        # or with --retry-failed
+                        frontier.mark_failed(listing_id, str(e))
+                    progress.record(False)
+                    continue
+                due = time.time() + retry_delay(attempts)
+                print(f"⚠️ Failed to scrape {listing_url} (attempt {attempts}/{config.MAX_ATTEMPTS}): {e}, retrying in {due - time.time():.0f}s")
+                if refresh:
+                    frontier.mark_refresh_error(listing_id, str(e), due)
+                else:
+                    frontier.mark_retry(listing_id, str(e), due)
+                retry_lane.add(listing_url, due)
+                progress.retried += 1
+
+    print(f"Fetching with up to {workers} workers, starting at {controller.describe()}")
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    # Stopped early (access block): the rest stays queued in the frontier
+    progress.pending_urls.extend(feed.abandon())
+    # Still waiting for a retry (state "retry" in the frontier): next run. Refreshes
+    # are not carried over: they stay done, the scheduler or their TTL brings them back.
+    for listing_url in retry_lane.urls():
+        if is_refresh(listing_url):
+            frontier.mark_refresh_error(get_listing_id_from_url(listing_url), None)
+        else:
+            progress.deferred_urls.append(listing_url)
+    print(f"Final rate: {controller.describe()} ({controller.throttled}/{controller.requests} requests throttled)")
+    return progress
+
+async def refresh_saved_listings(output_dir, frontier, breaker, budget=None):
+    # Refresh mode: re-requests the saved listings most likely to have changed (see
+    # scheduler.py), at most budget of them (None = all that are due), with their
+    # stored validators (If-None-Match / If-Modified-Since). Only listings whose
+    # content changed are rewritten, and only those are re-extracted into the CSV.
+    # Returns the number of requests made, which is charged to today's
+    # REFRESH_DAILY_BUDGET.
+    validators = ValidatorStore(frontier, output_dir)
+    listing_urls = []
+    plan = scheduler.plan_refresh(frontier, output_dir)
+    waiting = frontier.count(output_dir, "done") - len(plan)
+    if waiting:
+        print(f"{waiting} saved listings were checked within REFRESH_MIN_INTERVAL, skipping them.")
+    for _, listing_id, url in plan:
+        if budget is not None and len(listing_urls) >= budget:
+            break
+        filename = f"{listing_id}.html"
+        url = url or validators.get(filename).get("url") or get_saved_listing_url(output_dir, filename)
+        if url:
+            listing_urls.append(url)
+        else:
+            print(f"Skipping refresh of {filename}: listing URL unknown")
+    if not listing_urls:
+        print("No saved listings are due for a refresh.")
+        return 0
+    if len(listing_urls) < len(plan):
+        print(f"Daily refresh budget: refreshing the {len(listing_urls)} most likely changed of {len(plan)} due listings.")
+
+    print(f"\n--- Refreshing {len(listing_urls)} saved listings with conditional requests --- ")
+    if config.LISTING_FETCHER == "crawl4ai":
+        print("Note: the crawl4ai backend cannot send conditional requests; unchanged pages are detected by content hash only.")
+
+    async def run(fetcher):
+        try:
+            return await crawl_listings(
+                listing_urls, fetcher, output_dir, frontier, breaker,
+                validators=validators, conditional=True
+            )
+        finally:
+            await fetcher.close()
+            validators.save()
+
+    async with LazyCrawler() as crawler:
+        fetcher = create_listing_fetcher(crawler)
+        try:
+            progress = await run(fetcher)
+        finally:
+            # Requests actually sent (304s and failed attempts included), also when
+            # the run stops early
+            requests = fetcher.requests
+            frontier.spend_budget(scheduler.today(), requests)
+    unchanged = progress.succeeded - len(progress.changed_files)
+    print(f"\nRefresh complete: {len(progress.changed_files)} changed, {unchanged} unchanged, {progress.failed} failed")
+    if progress.pending_urls:
+        print(f"Stopped by an access block, {len(progress.pending_urls)} listings were not refreshed.")
+    if progress.changed_files:
+        # Paths relative to OUTPUT_DIR, as extract_data lists them (per-target subfolders)
+        extract_data.HTML_FOLDER = config.OUTPUT_DIR
+        changed_files = [
+            os.path.relpath(os.path.join(output_dir, filename), config.OUTPUT_DIR)
+            for filename in progress.changed_files
+        ]
+        await extract_data.reextract_files(changed_files)
+    return requests
+
+async def retry_failed_listings(output_dir, frontier, breaker):
+    # --retry-failed: fetches the failed listings of a folder (and those waiting for
+    # a retry) again, each with a fresh MAX_ATTEMPTS budget and the usual backoff
+    requeued = frontier.requeue_failed(output_dir)
+    listing_urls = frontier.queued_urls(output_dir)
+    if not listing_urls:
+        print(f"No failed listings to retry in '{output_dir}'.")
+        return
+    print(f"\n--- Retrying {requeued} failed listings in '{output_dir}' ({len(listing_urls)} queued in total) --- ")
+    validators = ValidatorStore(frontier, output_dir)
+    async with LazyCrawler() as crawler:
+        fetcher = create_listing_fetcher(crawler)
+        try:
+            progress = await crawl_listings(listing_urls, fetcher, output_dir, frontier, breaker, validators=validators)
+        finally:
+            await fetcher.close()
+            validators.save()
+    print(f"\nRetry complete: {progress.succeeded} scraped, {progress.failed} failed, "
+          f"{len(progress.pending_urls) + len(progress.deferred_urls)} pending")
+
+async def scrape_listing_page(url, fetcher, controller=None, headers=None):
+    # Fetches a listing page WITHOUT Playwright and returns a FetchResult. With a
+    # controller the request waits for a concurrency slot and a rate token, and its
+    # latency/status are fed back.
+    if controller is None:
+        return await fetch_page(url, fetcher, headers=headers)
+    async with controller.slot():
+        started = time.monotonic()
+        result = await fetch_page(url, fetcher, headers=headers)
+        await controller.record(
+            time.monotonic() - started, result.status_code,
+            blocked=check_blocked_html(result.html),
+            failed=result.html is None and result.status_code != 304
+        )
+    return result
+
+async def scrape_and_save_listing(url, fetcher, output_dir, controller=None, breaker=None, validators=None, conditional=False, extractor=None, archive=True):
+    # Scrape single listing page WITHOUT Playwright. Block pages go through the shared
+    # breaker, which raises AccessBlockedError if access does not come back.
+    # With conditional=True the stored validators are sent along and the file is only
+    # rewritten when the content changed. Returns True if the file was (re)written.
+    # With an extractor the page is queued for extraction as well. Without archive
+    # nothing is saved, so the call waits until the CSV row is written: the listing
+    # is only marked done once its data is somewhere.
+    breaker = breaker or CircuitBreaker(config.BLOCK_COOLDOWN_SECONDS)
+    key = get_listing_filename(url)
+    headers = validators.conditional_headers(key) if conditional and validators else None
+    result = await breaker.call(lambda: scrape_listing_page(url, fetcher, controller, headers))
+    if result.status_code != 304 and (result.html is None or (result.status_code or 0) >= 400):
+        # Nothing usable (network error, empty body, error page): a failed attempt
+        reason = f"HTTP {result.status_code}" if result.status_code else "no content"
+        raise FetchError(f"fetch failed: {reason}", result.status_code)
+    if result.status_code == 304 or (conditional and validators and validators.is_unchanged(key, result.html)):
+        print(f"  Unchanged: {url}")
+        if validators:
+            validators.record(key, url, result)
+        return False
+    if result.html and archive and not await save_html_to_file(result.html, url, output_dir):
+        # Not saved: the listing must not be recorded as done
+        raise OSError(f"could not save {key}")
+    if result.html and extractor is not None:
+        if not await extractor.put(output_dir, key, result.html, wait=not archive, refresh=conditional) and not archive:
+            raise ValueError(f"could not extract {key}")
+    if validators and result.html:
+        validators.record(key, url, result)
+    return bool(result.html)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for www.101evler.com, for benchmarks and scheduling experiments
+without touching the live site.
+
+Serves the same URL shapes the scraper requests:
+    GET  /kibris/<property-type>/<city>?page=N     rendered search page
+    POST /ac/arama-sonucu                           search API (form params, page=N)
+    GET  /kibris/satilik-emlak/<slug>-<id>.html     listing page
+    GET  /_stats                                    request counters (JSON)
+
+Pages come from a saved corpus (--pages with search_page_* files, --listings with
+<id>.html files, any storage layout) or are generated: every target gets its own
+synthetic result set of --total listings, 30 per page, and listing pages carry the
+fields extract_data.py reads. Listings a corpus search page links to but that are
+missing from --listings are generated too.
+
+Faults: every response waits a random latency (lognormal around --latency),
+listing pages fail with HTTP 503 at --error-rate, and block pages (HTTP 403 with
+config.BLOCK_PHRASES) are served at --block-rate or, with --block-after N, for
+--block-for seconds once N listing pages were requested. Search pages and the
+API are left alone unless --faults-everywhere, so discovery is not disturbed.
+
+Usage:
+    python mock_server.py                                   # synthetic site on 127.0.0.1:8101
+    python mock_server.py --pages pages --listings listings --latency 0.2
+    python mock_server.py --error-rate 0.05 --block-after 500 --block-for 30
+
+Point the scraper at it with BASE_DOMAIN = "http://127.0.0.1:8101" and
+API_URL = BASE_DOMAIN + "/ac/arama-sonucu" (benchmarks/e2e_crawl.py does this).
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import config
+import storage
+
+LISTINGS_PER_PAGE = 30
+SEARCH_PATH = re.compile(r'^/kibris/([\w-]+)/([\w-]+)/?$')
+LISTING_PATH = re.compile(r'^/kibris/satilik-emlak/[\w-]+-(\d+)\.html$')
+SEARCH_PAGE_NAME = re.compile(r'^search_page_(\d+)_(playwright|api)\.html$')
+COUNT_TEXT = re.compile(r'([\d\.]+)\s*Sonuç Bulundu')
+LIVE_DOMAIN = "https://www.101evler.com"
+
+DISTRICTS = ["İskele", "Boğaz", "Long Beach", "Girne", "Alsancak", "Lapta", "Gazimağusa", "Yeniboğaziçi", "Lefkoşa", "Gönyeli"]
+WORDS = ["villa", "daire", "deniz", "manzara", "havuz", "bahce", "site", "merkezi", "yeni", "luks", "satilik", "genis"]
+
+def format_count(count):
+    # 12345 -> "12.345", as the site writes result counts
+    return f"{count:,}".replace(",", ".")
+
+def synthetic_listing_page(listing_id, base_url, padding_kb=120):
+    # Listing page with the title, description, "Hızlı Bakış" rows and images that
+    # extract_data.parse_details reads, inside padding_kb of navigation/script
+    # boilerplate like the real pages. Deterministic per listing ID.
+    rng = random.Random(int(listing_id))
+    district = rng.choice(DISTRICTS)
+    rooms = rng.choice(["1+1", "2+1", "3+1", "4+1"])
+    title = f"{district} {rooms} {' '.join(rng.choice(WORDS) for _ in range(3))}".title()
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+    rows = [
+        ("İlan No", f"#{listing_id}"),
+        ("Konum", f"{district}, {rng.choice(['İskele', 'Girne', 'Gazimağusa', 'Lefkoşa'])}"),
+        ("Emlak Türü", rng.choice(["Konut / Villa", "Konut / Daire", "Konut / Ev"])),
+        ("Durumu", rng.choice(["Satılık", "Kiralık"])),
+        ("Fiyat", f"{rng.choice('£$€')}{rng.randint(40, 900) * 1000:,}"),
+        ("Tapu Türü", rng.choice(["Türk Koçanı", "Eşdeğer Koçan", "Tahsis"])),
+        ("Metrekare", f"{rng.randint(45, 400)} m²"),
+        ("Oda Sayısı", rooms),
+        ("İlan Tarihi", f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2025"),
+    ]
+    quick_look = "".join(
+        f'<div class="text-block-141 row"><div class="col-5">{label}</div>'
+        f'<div class="col-7"><strong>{value}</strong></div></div>'
+        for label, value in rows
+    )
+    images = "".join(
+        f'<img src="https://cdn.101evler.com/ilan/{listing_id}/{n}.jpg" class="gallery-image">'
+        for n in range(rng.randint(3, 12))
+    )
+    page_url = f"{base_url}/kibris/satilik-emlak/{district.lower().replace(' ', '-')}-{listing_id}.html"
+    navigation = '<div class="nav-item"><a href="/kibris/satilik-villa/iskele">Satılık Villa</a></div>\n'
+    padding = navigation * max(1, padding_kb * 1024 // len(navigation))
+    return (
+        f'<html><head><title>{title} - İlan No {listing_id} | 101evler</title>'
+        f'<meta property="og:title" content="{title}"><meta property="og:url" content="{page_url}">'
+        f'<meta name="description" content="{description[:150]}"></head><body>{padding}'
+        f'<h1>{title}</h1><div class="gallery">{images}</div>'
+        f'<div id="hizli-bakis"><div class="zebra-rows">{quick_look}</div></div>'
+        f'<div class="div-block-361" style="line-break:anywhere"><p class="f-s-16">{description}</p></div>'
+        f'<div class="text-block-157">{rng.choice(["Kıbrıs Emlak", "Ada Gayrimenkul", "Deniz Emlak"])}</div>'
+        f'<script>dataLayer=[{{"listing":"{listing_id}"}}];</script></body></html>'
+    )
+
+def search_results_fragment(listing_ids, slug):
+    # The listing cards of one search page
+    return "".join(
+        f'<div class="ilanitembasic"><a href="/kibris/satilik-emlak/{slug}-{listing_id}.html" class="card-link">'
+        f'<span class="price">{random.Random(int(listing_id)).randint(40, 900)}.000 £</span></a></div>\n'
+        for listing_id in listing_ids
+    )
+
+def synthetic_search_page(listing_ids, slug, page, total, path):
+    # Rendered search page: result count, listing cards, pagination and the "Son" link
+    total_pages = max(1, math.ceil(total / LISTINGS_PER_PAGE))
+    options = "".join(f'<option value="{path}?page={p}">{p}</option>' for p in range(1, total_pages + 1))
+    return (
+        f'<html><head><title>Kıbrıs Emlak</title></head><body>'
+        f'<span class="count_label">{format_count(total)} Sonuç Bulundu</span>'
+        f'<div class="results">{search_results_fragment(listing_ids, slug)}</div>'
+        f'<select class="pagination">{options}</select><span id="page_number">{page}</span>'
+        f'<a href="{path}?page={total_pages}" class="page-link">Son</a></body></html>'
+    )
+
+class MockSite:
+    # Content and fault injection of the mock site; thread-safe (the server handles
+    # every request in its own thread)
+    def __init__(self, total=3000, pages_dir=None, listings_dir=None, latency=0.05, jitter=0.5,
+                 error_rate=0.0, block_rate=0.0, block_after=None, block_for=30.0,
+                 faults_everywhere=False, padding_kb=120, seed=101):
+        self.total = total
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.block_after = block_after
+        self.block_for = block_for
+        self.faults_everywhere = faults_everywhere
+        self.padding_kb = padding_kb
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.listing_requests = 0
+        self.blocked_since = None
+        self.search_pages = self._load_search_pages(pages_dir) if pages_dir else {}
+        self.listings = self._load_listings(listings_dir) if listings_dir else {}
+        self.corpus_total = self._corpus_total()
+
+    def _load_search_pages(self, pages_dir):
+        # {page: {"playwright": (directory, name), "api": ...}} of the saved search pages
+        pages = {}
+        for name in storage.list_html(pages_dir):
+            match = SEARCH_PAGE_NAME.match(name)
+            if match:
+                pages.setdefault(int(match.group(1)), {})[match.group(2)] = (pages_dir, name)
+        return pages
+
+    def _load_listings(self, listings_dir):
+        # {listing id: (directory, name)} of the saved listings (per-target subfolders included)
+        listings = {}
+        for root, dirs, _ in os.walk(listings_dir):
+            dirs[:] = sorted(d for d in dirs if d not in storage.STORE_DIRS)
+            for name in storage.list_html(root):
+                if name[:-len(".html")].isdigit():
+                    listings.setdefault(name[:-len(".html")], (root, name))
+        return listings
+
+    def _corpus_total(self):
+        # Result count of the saved corpus: the count on page 1, else 30 per saved page
+        if not self.search_pages:
+            return None
+        first = self.search_pages.get(1, {}).get("playwright")
+        if first:
+            match = COUNT_TEXT.search(storage.read_html(*first) or "")
+            if match:
+                return int(match.group(1).replace(".", ""))
+        return LISTINGS_PER_PAGE * max(self.search_pages)
+
+    def reset(self):
+        # Clears the counters and any --block-after block (between benchmark runs)
+        with self.lock:
+            self.counters = {}
+            self.listing_requests = 0
+            self.blocked_since = None
+
+    def count(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, listing_requests=self.listing_requests)
+
+    def delay(self):
+        # Seconds to wait before answering: lognormal around latency (jitter = sigma)
+        if self.latency <= 0:
+            return 0.0
+        with self.lock:
+            factor = self.rng.lognormvariate(0, self.jitter) if self.jitter > 0 else 1.0
+        return self.latency * factor
+
+    def fault(self, listing):
+        # "block", "error" or None for the next response
+        if not listing and not self.faults_everywhere:
+            return None
+        with self.lock:
+            if listing:
+                self.listing_requests += 1
+            now = time.time()
+            if self.block_after is not None and self.listing_requests > self.block_after:
+                if self.blocked_since is None:
+                    self.blocked_since = now
+                if now - self.blocked_since < self.block_for:
+                    return "block"
+            if self.block_rate and self.rng.random() < self.block_rate:
+                return "block"
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return "error"
+        return None
+
+    def target_ids(self, key, page):
+        # Listing IDs of a synthetic result page; every target (key) has its own ID range
+        first = (page - 1) * LISTINGS_PER_PAGE
+        if first >= self.total:
+            return []
+        offset = (zlib.crc32(key.encode("utf-8")) % 90 + 10) * 1000000
+        return [str(offset + n) for n in range(first, min(first + LISTINGS_PER_PAGE, self.total))]
+
+    def rewrite(self, html, base_url):
+        # Saved pages link to the live site; point absolute links at the mock
+        return html.replace(LIVE_DOMAIN, base_url)
+
+    def search_page(self, property_type, city, page, base_url):
+        path = f"/kibris/{property_type}/{city}"
+        if self.search_pages:
+            saved = self.search_pages.get(page, {}).get("playwright")
+            if saved:
+                return self.rewrite(storage.read_html(*saved), base_url)
+            return synthetic_search_page([], city, page, self.corpus_total, path)
+        key = self.search_key(property_type, city)
+        return synthetic_search_page(self.target_ids(key, page), city, page, self.total, path)
+
+    def api_response(self, params, base_url):
+        # JSON with the result count and the page's listing cards
+        page = int(params.get("page", ["1"])[0] or 1)
+        if self.search_pages:
+            saved = self.search_pages.get(page, {})
+            if "api" in saved:
+                return self.rewrite(storage.read_html(*saved["api"]), base_url)
+            fragment = ""
+            if "playwright" in saved:
+                html = storage.read_html(*saved["playwright"])
+                links = sorted(set(re.findall(config.get_listing_pattern(), html)))
+                fragment = "".join(f'<a href="{link}"></a>' for link in links)
+            return json.dumps({"count": self.corpus_total, "html": fragment})
+        city = params.get("city", [""])[0]
+        key = self.api_key(params)
+        return json.dumps({"count": self.total, "html": search_results_fragment(self.target_ids(key, page), city)})
+
+    def listing_page(self, listing_id, base_url):
+        saved = self.listings.get(listing_id)
+        if saved:
+            html = storage.read_html(*saved)
+            if html:
+                return self.rewrite(html, base_url)
+        return synthetic_listing_page(listing_id, base_url, self.padding_kb)
+
+    def search_key(self, property_type, city):
+        # Same key for a target's search pages and its API requests
+        codes = config.PROPERTY_CONFIGS.get(property_type)
+        if codes is None:
+            return f"{city}/{property_type}"
+        return f"{city}/{codes['sale']}/{codes['type']}/{','.join(str(s) for s in codes['subtype'])}"
+
+    def api_key(self, params):
+        subtypes = [value for name, values in sorted(params.items()) if name.startswith("property_subtype") for value in values]
+        return f"{params.get('city', [''])[0]}/{params.get('s_r', [''])[0]}/{params.get('property_type', [''])[0]}/{','.join(subtypes)}"
+
+    def respond(self, method, path, body, base_url):
+        # (status, content type, text) for one request
+        parsed = urlparse(path)
+        if method == "GET" and parsed.path == "/_stats":
+            return 200, "application/json", json.dumps(self.stats())
+        api = method == "POST" and parsed.path == urlparse(config.API_URL).path
+        listing_match = LISTING_PATH.match(parsed.path) if method == "GET" else None
+        search_match = SEARCH_PATH.match(parsed.path) if method == "GET" and not listing_match else None
+        kind = "api" if api else "listing" if listing_match else "search" if search_match else "other"
+        self.count(kind)
+
+        fault = self.fault(kind == "listing")
+        if fault == "block":
+            self.count("blocked")
+            return 403, "text/html", f"<html><body><h1>{config.BLOCK_PHRASES[0]}</h1>" \
+                                     f"<p>{config.BLOCK_PHRASES[1]} 101evler.com</p></body></html>"
+        if fault == "error":
+            self.count("errors")
+            return 503, "text/html", "<html><body>Service Unavailable</body></html>"
+
+        if api:
+            return 200, "application/json", self.api_response(parse_qs(body), base_url)
+        if search_match:
+            page = int(parse_qs(parsed.query).get("page", ["1"])[0] or 1)
+            return 200, "text/html", self.search_page(search_match.group(1), search_match.group(2), page, base_url)
+        if listing_match:
+            return 200, "text/html", self.listing_page(listing_match.group(1), base_url)
+        self.count("not_found")
+        return 404, "text/html", "<html><body>Sayfa bulunamadı</body></html>"
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+
+    def do_GET(self):
+        self.handle_request("GET", "")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.handle_request("POST", self.rfile.read(length).decode("utf-8", "replace"))
+
+    def handle_request(self, method, body):
+        site = self.server.site
+        status, content_type, text = site.respond(method, self.path, body, self.server.base_url)
+        time.sleep(site.delay())
+        data = text.encode("utf-8")
+        etag = '"' + hashlib.md5(data).hexdigest() + '"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 200:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(site, host="127.0.0.1", port=0):
+    # Serves site in a background thread; returns the server (server.base_url,
+    # stop with server.shutdown())
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.site = site
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock of the 101evler.com pages the scraper requests")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8101)
+    parser.add_argument('--total', type=int, default=3000, help='Synthetic listings per target')
+    parser.add_argument('--pages', default=None, help='Serve saved search pages from this folder')
+    parser.add_argument('--listings', default=None, help='Serve saved listings from this folder')
+    parser.add_argument('--latency', type=float, default=0.05, help='Median response delay (seconds)')
+    parser.add_argument('--jitter', type=float, default=0.5, help='Spread of the delay (lognormal sigma, 0 = fixed)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of listing requests answered with HTTP 503')
+    parser.add_argument('--block-rate', type=float, default=0.0, help='Share of listing requests answered with a block page')
+    parser.add_argument('--block-after', type=int, default=None, help='Block every request once this many listings were requested')
+    parser.add_argument('--block-for', type=float, default=30.0, help='How long the --block-after block lasts (seconds)')
+    parser.add_argument('--faults-everywhere', action='store_true', help='Inject errors and blocks on search pages and the API too')
+    parser.add_argument('--padding-kb', type=int, default=120, help='Boilerplate size of synthetic listing pages')
+    args = parser.parse_args()
+
+    site = MockSite(
+        total=args.total, pages_dir=args.pages, listings_dir=args.listings,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        block_rate=args.block_rate, block_after=args.block_after, block_for=args.block_for,
+        faults_everywhere=args.faults_everywhere, padding_kb=args.padding_kb,
+    )
+    server = start_server(site, args.host, args.port)
+    if site.search_pages:
+        print(f"Serving {len(site.search_pages)} saved search pages and {len(site.listings)} saved listings")
+    else:
+        print(f"Serving {args.total} synthetic listings per target")
+    print(f"Mock site at {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Requests: {site.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Refresh scheduler for main.py --refresh: ranks the saved listings of a folder by how
+# likely they changed since they were last fetched, so a fixed daily request budget
+# (REFRESH_DAILY_BUDGET) goes to the refreshes most likely to find a new price first.
+#
+# A listing changes at an estimated rate (changes per day) of
+#     (changes + 1) / (observed days + REFRESH_PRIOR_DAYS)
+# where changes are the re-fetches that found new content (frontier checks/changes)
+# and observed days the time between its discovery and its last fetch; without any
+# history that is one change per REFRESH_PRIOR_DAYS. The rate is raised for listings
+# the site shows as recently updated (update_date) or new (listing_date) in the
+# extracted CSV, and lowered for listings that have not been on a search page for
+# REFRESH_SEEN_DAYS (probably taken down). The score is the probability that at
+# least one change happened since the last fetch: 1 - exp(-rate * days since).
+# Listings fetched within REFRESH_MIN_INTERVAL are not refreshed.
+#
+# Usage: python scheduler.py [output_dir]   -> prints the refresh plan and budget
+import csv
+import datetime
+import math
+import os
+import sys
+import time
+import config
+from extract_data import OUTPUT_FILE, get_property_id_from_filename, parse_listing_date
+from frontier import Frontier
+
+DAY = 86400
+RECENT_UPDATE_FACTOR = 2.0  # update_date within REFRESH_RECENT_UPDATE_DAYS
+NEW_LISTING_FACTOR = 1.5  # listing_date within REFRESH_NEW_LISTING_DAYS
+UNLISTED_FACTOR = 0.3  # not seen on a search page for REFRESH_SEEN_DAYS
+
+def parse_date(text):
+    # Epoch seconds (local midnight) of a listing_date / update_date value, None if unknown
+    date = parse_listing_date(text)
+    return datetime.datetime.combine(date, datetime.time()).timestamp() if date else None
+
+def load_listing_dates(csv_path=None):
+    # {listing_id: (listing_date, update_date)} from the extracted CSV (epoch seconds
+    # or None); empty if there is no CSV yet
+    csv_path = csv_path or OUTPUT_FILE
+    dates = {}
+    if not os.path.exists(csv_path):
+        return dates
+    try:
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                listing_id = get_property_id_from_filename(row.get('source_file') or '') or row.get('property_id')
+                if listing_id:
+                    dates[str(listing_id)] = (parse_date(row.get('listing_date')), parse_date(row.get('update_date')))
+    except Exception as e:
+        print(f"Error reading listing dates from {csv_path}: {e}")
+    return dates
+
+def change_rate(discovered_at, last_fetch, last_seen, checks, changes, dates, now):
+    # Estimated changes per day (see the top of this file)
+    observed_days = max((last_fetch or now) - (discovered_at or last_fetch or now), 0) / DAY
+    rate = (changes + 1) / (observed_days + config.REFRESH_PRIOR_DAYS)
+    listing_date, update_date = dates or (None, None)
+    if update_date is not None and now - update_date <= config.REFRESH_RECENT_UPDATE_DAYS * DAY:
+        rate *= RECENT_UPDATE_FACTOR
+    if listing_date is not None and now - listing_date <= config.REFRESH_NEW_LISTING_DAYS * DAY:
+        rate *= NEW_LISTING_FACTOR
+    if last_seen is not None and now - last_seen > config.REFRESH_SEEN_DAYS * DAY:
+        rate *= UNLISTED_FACTOR
+    return rate
+
+def score_listing(candidate, dates, now):
+    # Probability that a saved listing changed since its last fetch (0 if it was
+    # fetched within REFRESH_MIN_INTERVAL); candidate is a row of
+    # Frontier.refresh_candidates
+    listing_id, _, discovered_at, last_fetch, last_seen, checks, changes = candidate
+    elapsed = now - (last_fetch or 0)
+    if last_fetch is not None and elapsed < config.REFRESH_MIN_INTERVAL:
+        return 0.0
+    rate = change_rate(discovered_at, last_fetch, last_seen, checks, changes, dates.get(listing_id), now)
+    return 1 - math.exp(-rate * elapsed / DAY)
+
+def today(now=None):
+    return datetime.date.fromtimestamp(time.time() if now is None else now).isoformat()
+
+def remaining_budget(frontier, now=None):
+    # Refresh requests left today (None = unlimited)
+    if config.REFRESH_DAILY_BUDGET is None:
+        return None
+    return max(config.REFRESH_DAILY_BUDGET - frontier.budget_used(today(now)), 0)
+
+def plan_refresh(frontier, output_dir, limit=None, dates=None, now=None):
+    # [(score, listing_id, url)] of the saved listings of a folder worth refreshing,
+    # best first, at most limit of them (None = all); url may be None for listings
+    # imported without a known URL
+    now = time.time() if now is None else now
+    dates = load_listing_dates() if dates is None else dates
+    plan = []
+    for candidate in frontier.refresh_candidates(output_dir):
+        score = score_listing(candidate, dates, now)
+        if score > 0:
+            plan.append((score, candidate[0], candidate[1]))
+    plan.sort(key=lambda item: (-item[0], item[1]))
+    return plan if limit is None else plan[:limit]
+
+if __name__ == "__main__":
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else config.OUTPUT_DIR
+    if not os.path.exists(config.FRONTIER_DB):
+        print(f"{config.FRONTIER_DB} bulunamadı")
+        sys.exit(1)
+    frontier = Frontier(config.FRONTIER_DB, resume=False)
+    budget = remaining_budget(frontier)
+    plan = plan_refresh(frontier, output_dir)
+    print(f"{len(plan)} saved listings in '{output_dir}' are due for a refresh; "
+          + ("no daily budget limit" if budget is None else f"{budget} of {config.REFRESH_DAILY_BUDGET} requests left today"))
+    for score, listing_id, url in plan[:budget if budget is not None else 50]:
+        print(f"  {score:.3f}  {listing_id}  {url or ''}")
+    frontier.close()
@@ -0,0 +1,623 @@
+# Storage for saved HTML pages (listings and search pages).
+#
+# HTML_STORAGE selects how pages are written:
+#   "compressed" (default)  every distinct page content is stored once as a compressed
+#                           blob named after its SHA-256 (<dir>/blobs/ab/abcdef....zst)
+#   "segments"              pages are appended as length-prefixed records to rolling
+#                           segment files (<dir>/segments/segment-00001.seg), so a
+#                           folder holds a handful of large files instead of one file
+#                           per listing
+#   "files"                 one plain .html file per page (the original layout)
+# In the first two modes an append-only index (<dir>/index.jsonl) maps page names such
+# as 123456.html to their content (hash, codec and, for segments, segment/offset/length,
+# so any page is read with a single positioned read). Identical re-fetches (and
+# identical pages) share their stored content, so they cost nothing.
+# zstd is used when the zstandard package is installed, gzip otherwise.
+#
+# Reads work for every layout, so folders written by older versions keep working; a
+# plain file is removed once its page has been written to the store.
+#
+# Segment record: RECORD_HEADER (magic, header length, payload length), a JSON header
+# ({"name", "hash", "codec", "size"}) and the compressed payload. Records describe
+# themselves, so the index can be rebuilt from the segments (see reindex below).
+#
+# Command line:
+#   python storage.py convert listings [--to segments]   # convert folders (recursively)
+#   python storage.py reindex listings                   # rebuild index.jsonl from segments
+#   python storage.py stats listings
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOB_DIR = "blobs"
+SEGMENT_DIR = "segments"
+INDEX_FILENAME = "index.jsonl"
+TEMP_DIR = ".tmp"
+STORE_DIRS = (BLOB_DIR, SEGMENT_DIR, TEMP_DIR)
+STALE_TEMP_SECONDS = 600
+MODES = ("compressed", "segments", "files")
+
+RECORD_MAGIC = b"HREC"
+RECORD_HEADER = struct.Struct(">4sII")  # magic, JSON header length, payload length
+
+def resolve_codec(codec=None):
+    # "zst" or "gz" for a STORAGE_COMPRESSION setting ("auto", "zstd", "gzip")
+    codec = codec or config.STORAGE_COMPRESSION
+    if codec in ("auto", "zstd", "zst"):
+        if zstandard is not None:
+            return "zst"
+        if codec != "auto":
+            print("zstandard package not installed, using gzip compression")
+        return "gz"
+    if codec in ("gzip", "gz"):
+        return "gz"
+    raise ValueError(f"Unknown compression: {codec} (expected 'auto', 'zstd' or 'gzip')")
+
+def compress(data, codec):
+    if codec == "zst":
+        return zstandard.ZstdCompressor(level=config.STORAGE_COMPRESSION_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+def decompress(data, codec):
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard package is needed to read .zst pages")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def segment_number(segment):
+    # segment-00012.seg -> 12
+    return int(segment.split("-")[1].split(".")[0])
+
+def scan_records(data, start=0):
+    # Walks the records of a segment's bytes (usually a memory map) from start and
+    # yields (header, payload offset, payload length); stops at a torn record left
+    # by an interrupted write
+    position = start
+    while position + RECORD_HEADER.size <= len(data):
+        magic, header_length, payload_length = RECORD_HEADER.unpack_from(data, position)
+        payload_offset = position + RECORD_HEADER.size + header_length
+        if magic != RECORD_MAGIC or payload_offset + payload_length > len(data):
+            break
+        yield json.loads(data[position + RECORD_HEADER.size:payload_offset]), payload_offset, payload_length
+        position = payload_offset + payload_length
+
+def iter_segment_records(path, start=0):
+    # scan_records over a memory-mapped segment file
+    if os.path.getsize(path) <= start:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield from scan_records(data, start)
+
+class HtmlStore:
+    # Pages of one folder. The index is replayed on open (last line per name wins)
+    # and appended to on every write; plain files are read too.
+    # put() may be called from several threads (see PageWriter): compression runs
+    # outside the lock, everything touching files or the index inside it. Pages are
+    # written to a temp file and renamed into place, so a crash never leaves a
+    # truncated page behind; sync() makes the writes since the last call durable.
+    def __init__(self, directory, mode=None, codec=None):
+        self.directory = directory
+        self.mode = mode or config.HTML_STORAGE
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown HTML_STORAGE: {self.mode} (expected one of {MODES})")
+        self.codec = resolve_codec(codec) if self.mode != "files" else None
+        self.index_path = os.path.join(directory, INDEX_FILENAME)
+        self.segment_dir = os.path.join(directory, SEGMENT_DIR)
+        self.entries = {}
+        self._by_hash = {}
+        self._index_file = None
+        self._segment_file = None
+        self._segment = None
+        self._segment_size = 0
+        self._read_fds = {}
+        self._lock = threading.RLock()
+        self._unsynced = set()
+        self._remove_stale_temp_files()
+        lines = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of an interrupted write
+                    lines += 1
+                    if entry.get("deleted"):
+                        self.entries.pop(entry["name"], None)
+                    else:
+                        self._add_entry(entry)
+        if lines > 2 * len(self.entries) + 1000:
+            self._compact()
+
+    def _add_entry(self, entry):
+        self.entries[entry["name"]] = entry
+        self._by_hash[entry["hash"]] = entry
+
+    def blob_path(self, digest, codec):
+        return os.path.join(self.directory, BLOB_DIR, digest[:2], f"{digest}.{codec}")
+
+    def _legacy_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _temp_path(self):
+        temp_dir = os.path.join(self.directory, TEMP_DIR)
+        os.makedirs(temp_dir, exist_ok=True)
+        return os.path.join(temp_dir, f"{uuid.uuid4().hex}.tmp")
+
+    def _write_atomic(self, path, data):
+        # Temp file + rename: readers see the old content or the whole new content
+        temp_path = self._temp_path()
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._unsynced.add(path)
+
+    def _remove_stale_temp_files(self):
+        # Temp files of writes that never finished (crash, kill). Recent ones may
+        # belong to another process writing right now and are left alone.
+        temp_dir = os.path.join(self.directory, TEMP_DIR)
+        if not os.path.isdir(temp_dir):
+            return
+        cutoff = time.time() - STALE_TEMP_SECONDS
+        for filename in os.listdir(temp_dir):
+            path = os.path.join(temp_dir, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _append_index(self, entry):
+        if self._index_file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._index_file = open(self.index_path, 'a', encoding='utf-8')
+        self._index_file.write(json.dumps(entry) + "\n")
+        self._index_file.flush()
+
+    def _compact(self):
+        # Rewrites the index with one line per name
+        temp_path = self._temp_path()
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.index_path)
+
+    def put(self, name, html):
+        # Stores a page; returns (digest, stored) where stored is False when the
+        # content was already in the store (nothing but an index line written)
+        data = html.encode('utf-8')
+        digest = content_hash(data)
+        if self.mode == "files":
+            return self._put_file(name, data, digest)
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry["hash"] == digest:
+                return digest, False
+            known = digest in self._by_hash
+        payload = None if known else compress(data, self.codec)
+        with self._lock:
+            # Same content stored before (under any name, maybe by another thread
+            # meanwhile): point at it
+            existing = self._by_hash.get(digest)
+            stored = existing is None
+            if stored:
+                if payload is None:
+                    payload = compress(data, self.codec)
+                if self.mode == "segments":
+                    location = self._append_record(name, digest, data, payload)
+                else:
+                    location = self._write_blob(digest, payload)
+            else:
+                location = {key: existing[key] for key in ("codec", "segment", "offset", "length") if key in existing}
+            entry = {"name": name, "hash": digest, "size": len(data)}
+            entry.update(location)
+            self._add_entry(entry)
+            self._append_index(entry)
+            legacy_path = self._legacy_path(name)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+        return digest, stored
+
+    def _write_blob(self, digest, payload):
+        path = self.blob_path(digest, self.codec)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_atomic(path, payload)
+        return {"codec": self.codec}
+
+    def _open_segment(self):
+        # Continues the newest segment. A torn record at its end (left by an
+        # interrupted write) is cut off, so sequential scans never stop early.
+        os.makedirs(self.segment_dir, exist_ok=True)
+        segments = sorted(f for f in os.listdir(self.segment_dir) if f.endswith(".seg"))
+        self._segment = segments[-1] if segments else "segment-00001.seg"
+        path = os.path.join(self.segment_dir, self._segment)
+        indexed_end = max(
+            (entry["offset"] + entry["length"] for entry in self.entries.values()
+             if entry.get("segment") == self._segment),
+            default=0,
+        )
+        if os.path.exists(path):
+            valid_end = indexed_end
+            for _, offset, length in iter_segment_records(path, indexed_end):
+                valid_end = offset + length
+            if os.path.getsize(path) > valid_end:
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_end)
+        self._segment_file = open(path, 'ab')
+        self._segment_size = self._segment_file.tell()
+
+    def _append_record(self, name, digest, data, payload):
+        if self._segment_file is None:
+            self._open_segment()
+        header = json.dumps({"name": name, "hash": digest, "codec": self.codec, "size": len(data)}).encode('utf-8')
+        record_size = RECORD_HEADER.size + len(header) + len(payload)
+        if self._segment_size and self._segment_size + record_size > config.SEGMENT_MAX_MB * 1024 * 1024:
+            # Roll over to a new segment
+            os.fsync(self._segment_file.fileno())
+            self._segment_file.close()
+            self._segment = f"segment-{segment_number(self._segment) + 1:05d}.seg"
+            self._segment_file = open(os.path.join(self.segment_dir, self._segment), 'ab')
+            self._segment_size = 0
+        offset = self._segment_size + RECORD_HEADER.size + len(header)
+        self._segment_file.write(RECORD_HEADER.pack(RECORD_MAGIC, len(header), len(payload)) + header + payload)
+        self._segment_file.flush()
+        self._segment_size += record_size
+        return {"codec": self.codec, "segment": self._segment, "offset": offset, "length": len(payload)}
+
+    def _put_file(self, name, data, digest):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._write_atomic(self._legacy_path(name), data)
+            if self.entries.pop(name, None) is not None:
+                self._append_index({"name": name, "deleted": True})
+        return digest, True
+
+    def sync(self):
+        # fsyncs the index, the open segment and the files renamed into place since
+        # the last call (plus their folders, so the renames are durable too)
+        with self._lock:
+            for handle in (self._index_file, self._segment_file):
+                if handle is not None:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+            paths, self._unsynced = self._unsynced, set()
+        directories = set()
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            directories.add(os.path.dirname(path))
+        if hasattr(os, "O_DIRECTORY"):
+            for directory in directories:
+                fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+    def is_complete(self, name):
+        # False for a plain file cut short by a crash in the old, non-atomic layout
+        # (no closing </html>); pages in the store are always written whole
+        if name in self.entries:
+            return True
+        try:
+            with open(self._legacy_path(name), 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 1024))
+                return b"</html>" in f.read().lower()
+        except OSError:
+            return False
+
+    def _read_segment(self, segment, offset, length):
+        # One positioned read; file descriptors stay open for later reads
+        fd = self._read_fds.get(segment)
+        if fd is None:
+            fd = self._read_fds[segment] = os.open(os.path.join(self.segment_dir, segment), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        if hasattr(os, "pread"):
+            return os.pread(fd, length, offset)
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.read(fd, length)
+
+    def get(self, name):
+        # Page content, or None if the page is not stored
+        entry = self.entries.get(name)
+        if entry is not None:
+            if "segment" in entry:
+                payload = self._read_segment(entry["segment"], entry["offset"], entry["length"])
+            else:
+                with open(self.blob_path(entry["hash"], entry["codec"]), 'rb') as f:
+                    payload = f.read()
+            return decompress(payload, entry["codec"]).decode('utf-8')
+        legacy_path = self._legacy_path(name)
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        return None
+
+    def get_hash(self, name):
+        entry = self.entries.get(name)
+        return entry["hash"] if entry else None
+
+    def __contains__(self, name):
+        return name in self.entries or os.path.exists(self._legacy_path(name))
+
+    def names(self, suffix=".html"):
+        # Names of all stored pages, including plain files of the old layout
+        names = {name for name in self.entries if name.endswith(suffix)}
+        if os.path.isdir(self.directory):
+            names.update(
+                filename for filename in os.listdir(self.directory)
+                if filename.endswith(suffix) and os.path.isfile(self._legacy_path(filename))
+            )
+        return names
+
+    def iter_pages(self):
+        # Yields (name, html) for every page: segments are scanned sequentially through
+        # a memory map (records that were overwritten later are skipped), then the
+        # pages stored as blobs or plain files
+        seen = set()
+        if os.path.isdir(self.segment_dir):
+            if self._segment_file is not None:
+                self._segment_file.flush()
+            for segment in sorted(f for f in os.listdir(self.segment_dir) if f.endswith(".seg")):
+                path = os.path.join(self.segment_dir, segment)
+                with open(path, 'rb') as f:
+                    if os.path.getsize(path) == 0:
+                        continue
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        for header, offset, length in scan_records(data):
+                            entry = self.entries.get(header["name"])
+                            if entry is None or entry.get("segment") != segment or entry.get("offset") != offset:
+                                continue
+                            seen.add(header["name"])
+                            yield header["name"], decompress(data[offset:offset + length], header["codec"]).decode('utf-8')
+        for name in sorted(self.names() - seen):
+            yield name, self.get(name)
+
+    def close(self):
+        self.sync()
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._segment_file = None
+        for fd in self._read_fds.values():
+            os.close(fd)
+        self._read_fds.clear()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_store(directory):
+    # Store of a folder (one shared instance per folder and process)
+    key = os.path.abspath(directory)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = HtmlStore(directory)
+    return store
+
+def close_stores():
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+class PageWriter:
+    # Writes pages from async code without blocking the event loop: compression and
+    # disk I/O run on a small thread pool, at most max_pending writes are waiting at a
+    # time (callers wait for a slot, so a slow disk slows the crawl down instead of
+    # piling pages up in memory), and the stores are fsynced in batches - every
+    # fsync_every writes or fsync_interval seconds - rather than once per page.
+    # write() returns once the page is renamed into place, so callers may record it
+    # as saved right after.
+    def __init__(self, threads=None, max_pending=None, fsync_every=None, fsync_interval=None):
+        self.threads = threads or config.WRITER_THREADS
+        self.max_pending = max_pending or config.WRITER_MAX_PENDING
+        self.fsync_every = fsync_every or config.FSYNC_EVERY
+        self.fsync_interval = fsync_interval if fsync_interval is not None else config.FSYNC_INTERVAL
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="page-writer")
+        self._slots = None
+        self._dirty = set()
+        self._since_sync = 0
+        self._last_sync = time.monotonic()
+        self._sync_task = None
+        self.written = 0
+
+    async def write(self, directory, name, html):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            store = await loop.run_in_executor(self.executor, open_store, directory)
+            result = await loop.run_in_executor(self.executor, store.put, name, html)
+        self.written += 1
+        self._dirty.add(store)
+        self._since_sync += 1
+        if self._since_sync >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._schedule_sync()
+        return result
+
+    def _schedule_sync(self):
+        if self._sync_task is not None and not self._sync_task.done():
+            return
+        stores, self._dirty = self._dirty, set()
+        self._since_sync = 0
+        self._last_sync = time.monotonic()
+        loop = asyncio.get_running_loop()
+        self._sync_task = loop.run_in_executor(self.executor, self._sync_stores, stores)
+
+    def _sync_stores(self, stores):
+        for store in stores:
+            try:
+                store.sync()
+            except OSError as e:
+                print(f"fsync failed for {store.directory}: {e}")
+
+    async def close(self):
+        # Waits for the writes in flight, then fsyncs everything written
+        if self._slots is not None:
+            for _ in range(self.max_pending):
+                await self._slots.acquire()
+        if self._sync_task is not None:
+            await self._sync_task
+        stores, self._dirty = self._dirty, set()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._sync_stores, stores)
+        self.executor.shutdown(wait=True)
+
+_writer = None
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = PageWriter()
+    return _writer
+
+async def write_html_async(directory, name, html):
+    # write_html for async code (see PageWriter)
+    return await get_writer().write(directory, name, html)
+
+async def close_writer():
+    global _writer
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
+
+def write_html(directory, name, html):
+    return open_store(directory).put(name, html)
+
+def read_html(directory, name):
+    return open_store(directory).get(name)
+
+def has_html(directory, name):
+    return name in open_store(directory)
+
+def list_html(directory):
+    # Sorted page names of a folder
+    return sorted(open_store(directory).names())
+
+def find_store_dirs(root):
+    # root and every subfolder holding pages (per-target folders), skipping the
+    # store's own blob/segment folders
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in STORE_DIRS and d != "failed")
+        if INDEX_FILENAME in files or any(f.endswith(".html") for f in files):
+            yield directory
+
+def convert(directory, mode):
+    # Rewrites every page of a folder in the given mode, then removes what the old
+    # layout left behind (plain files, blobs or segments). Returns the page count.
+    source = HtmlStore(directory, mode=mode)
+    pages = sorted(source.names())
+    target_dir = directory + ".converting"
+    shutil.rmtree(target_dir, ignore_errors=True)
+    target = HtmlStore(target_dir, mode=mode)
+    for name in pages:
+        target.put(name, source.get(name))
+    target.close()
+    source.close()
+    # Swap in the new layout; other files in the folder (validators.json, ...) stay
+    for name in pages:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+    for store_dir in STORE_DIRS:
+        shutil.rmtree(os.path.join(directory, store_dir), ignore_errors=True)
+        if os.path.exists(os.path.join(target_dir, store_dir)):
+            os.replace(os.path.join(target_dir, store_dir), os.path.join(directory, store_dir))
+    if mode == "files":
+        for name in pages:
+            os.replace(os.path.join(target_dir, name), os.path.join(directory, name))
+        if os.path.exists(os.path.join(directory, INDEX_FILENAME)):
+            os.remove(os.path.join(directory, INDEX_FILENAME))
+    else:
+        os.replace(os.path.join(target_dir, INDEX_FILENAME), os.path.join(directory, INDEX_FILENAME))
+    shutil.rmtree(target_dir, ignore_errors=True)
+    return len(pages)
+
+def reindex(directory):
+    # Rebuilds index.jsonl from the records in the segments, e.g. after the index lost
+    # lines in a crash. Every record is applied in write order on top of the existing
+    # index, so the newest record of each page wins.
+    store = HtmlStore(directory, mode="segments")
+    entries = dict(store.entries)
+    segment_dir = os.path.join(directory, SEGMENT_DIR)
+    segments = sorted(f for f in os.listdir(segment_dir) if f.endswith(".seg")) if os.path.isdir(segment_dir) else []
+    for segment in segments:
+        for header, offset, length in iter_segment_records(os.path.join(segment_dir, segment)):
+            entries[header["name"]] = dict(header, segment=segment, offset=offset, length=length)
+    store.close()
+    store.entries = entries
+    store._compact()
+    return len(entries)
+
+def folder_stats(directory):
+    store = HtmlStore(directory)
+    total = {"pages": len(store.names()), "plain": 0, "blobs": 0, "segments": 0, "bytes": 0}
+    for name in store.names():
+        entry = store.entries.get(name)
+        if entry is None:
+            total["plain"] += 1
+        elif "segment" in entry:
+            total["segments"] += 1
+        else:
+            total["blobs"] += 1
+    for root, _, files in os.walk(directory):
+        total["bytes"] += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    store.close()
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Page storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Convert folders to another layout")
+    convert_parser.add_argument("path", nargs="?", default=config.OUTPUT_DIR)
+    convert_parser.add_argument("--to", choices=MODES, default="segments")
+    reindex_parser = subparsers.add_parser("reindex", help="Rebuild index.jsonl from the segment files")
+    reindex_parser.add_argument("path", nargs="?", default=config.OUTPUT_DIR)
+    stats_parser = subparsers.add_parser("stats", help="Show pages per layout and disk usage")
+    stats_parser.add_argument("path", nargs="?", default=config.OUTPUT_DIR)
+    args = parser.parse_args()
+
+    for directory in list(find_store_dirs(args.path)):
+        if args.command == "convert":
+            count = convert(directory, args.to)
+            print(f"{directory}: {count} pages converted to '{args.to}'")
+        elif args.command == "reindex":
+            print(f"{directory}: index rebuilt with {reindex(directory)} pages")
+        else:
+            stats = folder_stats(directory)
+            print(f"{directory}: {stats['pages']} pages ({stats['segments']} in segments, "
+                  f"{stats['blobs']} blobs, {stats['plain']} plain files), {stats['bytes'] / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()